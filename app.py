@@ -6,6 +6,18 @@ from dotenv import load_dotenv
 import os
 
 from models import db
+from database import engine_options, install_statement_timeout, replica_router, REPLICA_BIND
+from auth import account_cache
+from cache import response_cache
+from passwords import password_hasher
+from media import media_pipeline
+from reports import report_jobs
+import notifications
+import stats
+import dedupe
+import archive
+from live import live_events
+from metrics import metrics
 from routes import register_routes
 
 
@@ -15,15 +27,67 @@ app = Flask(__name__)
 
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 0)) or None
+app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW')) if os.getenv('DB_MAX_OVERFLOW') else None
+app.config['DB_POOL_TIMEOUT'] = int(os.getenv('DB_POOL_TIMEOUT', 0)) or None
+app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', 1800))
+app.config['DB_POOL_PRE_PING'] = os.getenv('DB_POOL_PRE_PING', '1') not in ('0', 'false', 'no')
+app.config['DB_STATEMENT_TIMEOUT_MS'] = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+app.config['EXPORT_STATEMENT_TIMEOUT_MS'] = int(os.getenv('EXPORT_STATEMENT_TIMEOUT_MS', 0))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+if os.getenv('SQLALCHEMY_REPLICA_URI'):
+    # Binds do not inherit SQLALCHEMY_ENGINE_OPTIONS, so the replica gets its own copy.
+    replica_uri = os.getenv('SQLALCHEMY_REPLICA_URI')
+    app.config['SQLALCHEMY_BINDS'] = {
+        REPLICA_BIND: {'url': replica_uri, **engine_options(app.config)}
+    }
+app.config['REPLICA_STICKY_SECONDS'] = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or None
+app.config['ACCOUNT_CACHE_TTL'] = int(os.getenv('ACCOUNT_CACHE_TTL', 60))
+app.config['MEDIA_STORAGE_ROOT'] = os.getenv('MEDIA_STORAGE_ROOT')
+app.config['REPORT_STORAGE_ROOT'] = os.getenv('REPORT_STORAGE_ROOT')
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 50 * 1024 * 1024))
+app.config['TWILIO_ACCOUNT_SID'] = os.getenv('TWILIO_ACCOUNT_SID')
+app.config['TWILIO_AUTH_TOKEN'] = os.getenv('TWILIO_AUTH_TOKEN')
+app.config['TWILIO_FROM_NUMBER'] = os.getenv('TWILIO_FROM_NUMBER')
+app.config['LIVE_EVENTS_PORT'] = os.getenv('LIVE_EVENTS_PORT')
+app.config['LIVE_EVENTS_REDIS_URL'] = os.getenv('LIVE_EVENTS_REDIS_URL')
+app.config['RESPONSE_CACHE_URL'] = os.getenv('RESPONSE_CACHE_URL')
+app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', '1') not in ('0', 'false', 'no')
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+app.config['SLOW_QUERY_MS'] = int(os.getenv('SLOW_QUERY_MS', 250))
+app.config['PROFILE_SLOW_REQUEST_MS'] = int(os.getenv('PROFILE_SLOW_REQUEST_MS', 0)) or None
+app.config['PROFILE_DIR'] = os.getenv('PROFILE_DIR')
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 180))
 
 db.init_app(app)
+with app.app_context():
+    for engine in db.engines.values():
+        install_statement_timeout(engine, app.config['DB_STATEMENT_TIMEOUT_MS'])
+metrics.init_app(app)
 migrate = Migrate(app, db)
 jwt = JWTManager(app)
+response_cache.init_app(app)
+replica_router.init_app(app)
+account_cache.init_app(app)
+media_pipeline.init_app(app)
+report_jobs.init_app(app)
+notifications.init_app(app)
+stats.init_app(app)
+dedupe.init_app(app)
+archive.init_app(app)
+live_events.init_app(app)
+password_hasher.init_app(app)
 
 register_routes(app)
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+    # Only the reloader's child serves requests, so only it runs the feed.
+    if app.config['LIVE_EVENTS_PORT'] and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        live_events.start(app.config.get('LIVE_EVENTS_HOST', '127.0.0.1'), int(app.config['LIVE_EVENTS_PORT']))
     app.run(debug=True)
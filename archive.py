@@ -0,0 +1,99 @@
+import time
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import delete, insert, select, update
+from cache import response_cache
+from models import db, ArchivedMedia, ArchivedRecord, Media, Record, RecordFingerprint, \
+    RecordLSHBucket, RecordStatusHistory
+
+SETTLED_STATUSES = ('resolved', 'rejected')
+ARCHIVE_AFTER_DAYS = 180
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def _candidates(cutoff, batch_size):
+    """Settled records created before ``cutoff`` whose status has not changed since.
+
+    Rows already claimed by another archiver are skipped rather than waited
+    on, so two runs can share the work.
+    """
+    recently_changed = select(RecordStatusHistory.id).where(
+        RecordStatusHistory.record_id == Record.id,
+        RecordStatusHistory.changed_at >= cutoff
+    ).exists()
+    return (select(Record.id)
+            .where(Record.status.in_(SETTLED_STATUSES), Record.created_at < cutoff, ~recently_changed)
+            .order_by(Record.created_at, Record.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True))
+
+
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move one batch of settled records and their media to the archive tables.
+
+    Copy and delete share one transaction, so an interrupted run leaves every
+    record either hot or archived, never both; running again picks up
+    whatever still matches. Returns the number of records moved.
+    """
+    ids = db.session.execute(_candidates(cutoff, batch_size)).scalars().all()
+    if not ids:
+        return 0
+    now = datetime.utcnow()
+    record_columns = [column.name for column in Record.__table__.c]
+    media_columns = [column.name for column in Media.__table__.c]
+    db.session.execute(insert(ArchivedRecord).from_select(
+        record_columns + ['archived_at'],
+        select(*Record.__table__.c, db.literal(now)).where(Record.id.in_(ids))
+    ))
+    db.session.execute(insert(ArchivedMedia).from_select(
+        media_columns, select(*Media.__table__.c).where(Media.record_id.in_(ids))
+    ))
+    db.session.execute(delete(Media).where(Media.record_id.in_(ids)))
+    db.session.execute(delete(RecordLSHBucket).where(RecordLSHBucket.record_id.in_(ids)))
+    db.session.execute(delete(RecordFingerprint).where(RecordFingerprint.record_id.in_(ids)))
+    db.session.execute(
+        update(Record).where(Record.duplicate_of_id.in_(ids), Record.id.not_in(ids))
+        .values(duplicate_of_id=None).execution_options(synchronize_session=False)
+    )
+    db.session.execute(delete(Record).where(Record.id.in_(ids)).execution_options(synchronize_session=False))
+    db.session.commit()
+    response_cache.invalidate('records', *(f'record:{id}' for id in ids))
+    return len(ids)
+
+
+def archive(cutoff, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None, pause=0, progress=None):
+    """Run ``archive_batch`` until nothing is left, or for ``max_batches``."""
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(cutoff, batch_size)
+        if not count:
+            break
+        moved += count
+        batches += 1
+        if progress is not None:
+            progress(moved)
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+def init_app(app):
+    @app.cli.command('archive-records')
+    @click.option('--older-than-days', type=int, default=None,
+                  help='Archive settled records created more than this many days ago.')
+    @click.option('--batch-size', default=ARCHIVE_BATCH_SIZE)
+    @click.option('--max-batches', type=int, default=None, help='Stop after this many batches.')
+    @click.option('--pause', type=float, default=0, help='Seconds to sleep between batches.')
+    def archive_records(older_than_days, batch_size, max_batches, pause):
+        """Move resolved and rejected records into the archive tables.
+
+        Safe to interrupt and rerun; each batch commits on its own.
+        """
+        if older_than_days is None:
+            older_than_days = app.config.get('ARCHIVE_AFTER_DAYS', ARCHIVE_AFTER_DAYS)
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        started = time.perf_counter()
+        moved = archive(cutoff, batch_size, max_batches, pause,
+                        progress=lambda total: click.echo(f'Archived {total} records'))
+        click.echo(f'Done: {moved} records archived from before {cutoff:%Y-%m-%d} '
+                   f'in {time.perf_counter() - started:.1f}s')
@@ -0,0 +1,112 @@
+from functools import wraps
+from flask import g, make_response
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from cache import LRUBackend
+from models import db, NormalUser, Administrator
+
+ACCOUNT_MODELS = {'user': NormalUser, 'admin': Administrator}
+
+
+class AccountCache:
+    """Short-lived cache of account rows keyed by (role, id).
+
+    Entries are detached copies of the rows and are merged into the current
+    session without a SELECT; mapper events evict them whenever a row
+    changes, once the change has committed. The instance a miss loads stays
+    in the session untouched.
+    """
+
+    def __init__(self):
+        self.backend = LRUBackend()
+        self.ttl = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('ACCOUNT_CACHE_TTL', 60)
+        self.backend = LRUBackend(app.config.get('ACCOUNT_CACHE_SIZE', 4096))
+
+    def get(self, role, id):
+        model = ACCOUNT_MODELS[role]
+        if not self.ttl:
+            return db.session.get(model, id)
+        cached = self.backend.get((role, id))
+        if cached is not None:
+            return db.session.merge(cached, load=False)
+        account = db.session.get(model, id)
+        if account is not None:
+            self.backend.set((role, id), _detached_copy(account), self.ttl)
+        return account
+
+    def evict(self, role, id):
+        self.backend.delete((role, id))
+
+
+def _detached_copy(account):
+    mapper = inspect(account).mapper
+    copy = mapper.class_(**{attr.key: getattr(account, attr.key) for attr in mapper.column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+account_cache = AccountCache()
+
+
+def _evict_listener(role):
+    # Flush runs before commit: a request reading the account in between
+    # would cache the old row again, so evictions wait for the commit.
+    def queue_eviction(mapper, connection, target):
+        inspect(target).session.info.setdefault('evicted_accounts', set()).add((role, target.id))
+    return queue_eviction
+
+
+for _role, _model in ACCOUNT_MODELS.items():
+    db.event.listen(_model, 'after_update', _evict_listener(_role))
+    db.event.listen(_model, 'after_delete', _evict_listener(_role))
+
+
+@db.event.listens_for(Session, 'after_commit')
+def _evict_committed(session):
+    for role, id in session.info.pop('evicted_accounts', ()):
+        account_cache.evict(role, id)
+
+
+@db.event.listens_for(Session, 'after_rollback')
+def _forget_evictions(session):
+    session.info.pop('evicted_accounts', None)
+
+
+class Principal:
+    __slots__ = ('id', 'role', '_user')
+
+    def __init__(self, id, role):
+        self.id = id
+        self.role = role
+        self._user = None
+
+    @property
+    def user(self):
+        if self._user is None:
+            self._user = account_cache.get(self.role, self.id)
+        return self._user
+
+
+def current_principal():
+    """The authenticated caller, decoded from the JWT once per request."""
+    principal = g.get('principal')
+    if principal is None:
+        identity = get_jwt_identity()
+        principal = g.principal = Principal(identity['id'], identity['role'])
+    return principal
+
+
+def role_required(*roles, error='Unauthorized'):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()
+            if current_principal().role not in roles:
+                return make_response({'error': error}, 403)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,505 @@
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import requests
+
+SCENARIOS = ['signup', 'login', 'create_record', 'get_record', 'list_records', 'edit_record',
+             'delete_record', 'update_status', 'stats', 'count_records', 'list_archived', 'search']
+# Common words from the Faker text seed.py writes, alone and in pairs, so
+# result sets range from a handful of rows to a large share of the table.
+SEARCH_TERMS = ['market', 'water', 'police', 'money', 'school', 'hospital', 'road', 'court',
+                'public health', 'police officer', 'land court', 'security service']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load-test a running Jiseti server.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario and level")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--output", default=None, help="write results to this JSON file")
+    parser.add_argument("--compare", default=None, help="earlier results file to diff against")
+    parser.add_argument("--page-sizes", nargs="+", type=int, default=None,
+                        help="also compare full and lean (fields=) record pages at these sizes")
+    parser.add_argument("--ingest", type=int, default=None, metavar="ROWS",
+                        help="also compare writing ROWS records one POST /records at a time "
+                             "with writing them through POST /records/bulk")
+    parser.add_argument("--stats-sources", type=int, default=None, metavar="SAMPLES",
+                        help="instead of load-testing --url, time the /stats summary from the "
+                             "record_stats aggregates against a live GROUP BY, in-process")
+    parser.add_argument("--bulk-status", type=int, default=None, metavar="IDS",
+                        help="also time one POST /records/status over IDS freshly created records")
+    parser.add_argument("--sync", action="store_true",
+                        help="also drain GET /records/changes from scratch and time caught-up polls")
+    parser.add_argument("--dedupe", type=int, default=None, metavar="SAMPLES",
+                        help="instead of load-testing --url, time duplicate-detection signing and "
+                             "bucket lookups for SAMPLES stored records, in-process")
+    parser.add_argument("--dedupe-rebuild", action="store_true",
+                        help="with --dedupe, also time a full rebuild-duplicates run")
+    parser.add_argument("--auth-overhead", type=int, default=None, metavar="SAMPLES",
+                        help="instead of load-testing --url, time the /records write endpoints "
+                             "in-process with the account cache off and on")
+    return parser.parse_args()
+
+
+class Client:
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.local = threading.local()
+
+    @property
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def call(self, method, path, token=None, **kwargs):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return self.session.request(method, self.url + path, headers=headers, **kwargs)
+
+    def account(self, role, password):
+        email = f'bench-{role}-{uuid.uuid4().hex[:12]}@example.org'
+        self.call('POST', '/signup', json={'name': 'Bench', 'email': email, 'password': password,
+                                           'role': role, 'admin_number': email})
+        response = self.call('POST', '/login', json={'email': email, 'password': password, 'role': role})
+        return email, response.json()['access_token']
+
+
+class Bench:
+    """Prepares fixtures for each scenario and returns one callable per request."""
+
+    def __init__(self, client, password):
+        self.client = client
+        self.password = password
+        self.user_email, self.user_token = client.account('user', password)
+        _, self.admin_token = client.account('admin', password)
+
+    def _create_records(self, count, batch_size=10000):
+        ids = []
+        for start in range(0, count, batch_size):
+            items = [{'type': 'red-flag', 'title': f'bench {i}', 'description': 'benchmark record',
+                      'latitude': -1.29, 'longitude': 36.82} for i in range(start, min(count, start + batch_size))]
+            response = self.client.call('POST', '/records/bulk', self.user_token, json=items)
+            response.raise_for_status()
+            ids += [result['id'] for result in response.json()['results']]
+        return ids
+
+    def prepare(self, scenario, count):
+        c = self.client
+        if scenario == 'signup':
+            return lambda i: c.call('POST', '/signup', json={
+                'name': 'Bench', 'email': f'bench-{uuid.uuid4().hex}@example.org', 'password': self.password})
+        if scenario == 'login':
+            return lambda i: c.call('POST', '/login', json={'email': self.user_email, 'password': self.password})
+        if scenario == 'create_record':
+            return lambda i: c.call('POST', '/records', self.user_token, json={
+                'type': 'red-flag', 'title': f'bench {i}', 'description': 'benchmark record',
+                'latitude': -1.29 + random.uniform(-0.1, 0.1), 'longitude': 36.82 + random.uniform(-0.1, 0.1)})
+        if scenario == 'list_records':
+            return lambda i: c.call('GET', f'/records?page={i % 20 + 1}&per_page=20', self.user_token)
+        if scenario in ('count_records', 'list_archived'):
+            # Exact totals over the hot table, or over hot and archived rows;
+            # the nonce keeps the response cache from answering.
+            archived = '&include_archived=1' if scenario == 'list_archived' else ''
+            return lambda i: c.call('GET', f'/records?page={i % 20 + 1}&per_page=20&count=exact{archived}'
+                                           f'&nonce={uuid.uuid4().hex}', self.user_token)
+        if scenario == 'search':
+            # Ranked full-text search; the nonce keeps the response cache from answering.
+            return lambda i: c.call('GET', f'/records/search?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}'
+                                           f'&page={i % 5 + 1}&per_page=20&nonce={uuid.uuid4().hex}',
+                                    self.user_token)
+        if scenario == 'stats':
+            # Vary the range so the response cache does not serve every call.
+            return lambda i: c.call('GET', f'/stats?from=2000-01-{i % 28 + 1:02d}', self.admin_token)
+        ids = self._create_records(count)
+        if scenario == 'get_record':
+            # The nonce keeps the response cache from answering.
+            return lambda i: c.call('GET', f'/records/{ids[i % len(ids)]}?nonce={uuid.uuid4().hex}',
+                                    self.user_token)
+        if scenario == 'edit_record':
+            return lambda i: c.call('PATCH', f'/records/{ids[i % len(ids)]}', self.user_token,
+                                    json={'title': f'edited {i}'})
+        if scenario == 'delete_record':
+            return lambda i: c.call('DELETE', f'/records/{ids[i]}', self.user_token)
+        if scenario == 'update_status':
+            statuses = ['under investigation', 'resolved', 'rejected']
+            return lambda i: c.call('PATCH', f'/records/{ids[i % len(ids)]}/status', self.admin_token,
+                                    json={'status': statuses[i % 3]})
+        raise ValueError(scenario)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_level(action, requests_count, concurrency):
+    latencies, errors, shed = [], 0, 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors, shed
+        started = time.perf_counter()
+        try:
+            status = action(i).status_code
+        except requests.RequestException:
+            status = None
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            # 503s are requests the server turned away rather than queued
+            # (login and signup past the hashing pool's cap), not failures.
+            shed += status == 503
+            errors += status is None or (status >= 400 and status != 503)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests_count)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'requests': requests_count,
+        'errors': errors,
+        'shed': shed,
+        'throughput_rps': round(requests_count / wall, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+    }
+
+
+PROJECTIONS = {
+    'full': '',
+    'lean': '&fields=id,title,status,latitude,longitude',
+}
+
+
+def projection_report(bench, page_sizes, samples=50):
+    """Latency and payload bytes per page for the full and the lean record shape."""
+    c = bench.client
+    bench._create_records(max(page_sizes) * 5)
+    report = []
+    print(f"\n{'per_page':>8} {'shape':<6} {'p50 ms':>8} {'mean ms':>8} {'bytes':>9}")
+    for per_page in page_sizes:
+        for shape, params in PROJECTIONS.items():
+            latencies, sizes = [], []
+            for i in range(samples):
+                # The nonce keeps the response cache from answering.
+                path = f'/records?per_page={per_page}&page={i % 5 + 1}&count=none{params}&nonce={uuid.uuid4().hex}'
+                started = time.perf_counter()
+                response = c.call('GET', path, bench.user_token)
+                latencies.append(time.perf_counter() - started)
+                sizes.append(len(response.content))
+            latencies.sort()
+            row = {'per_page': per_page, 'shape': shape,
+                   'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                   'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+                   'bytes': round(statistics.fmean(sizes))}
+            report.append(row)
+            print(f"{per_page:>8} {shape:<6} {row['p50_ms']:>8} {row['mean_ms']:>8} {row['bytes']:>9}")
+    return report
+
+
+def ingest_report(bench, rows, batch_sizes=(100, 1000)):
+    """Rows per second for per-item POST /records and for /records/bulk batches."""
+    c = bench.client
+
+    def item():
+        # Unrelated text each time, so duplicate detection stays out of the numbers.
+        return {'type': 'red-flag', 'title': uuid.uuid4().hex, 'description': uuid.uuid4().hex,
+                'latitude': -1.29 + random.uniform(-0.1, 0.1), 'longitude': 36.82 + random.uniform(-0.1, 0.1)}
+
+    modes = {'per-item': [('/records', item()) for _ in range(rows)]}
+    for size in batch_sizes:
+        modes[f'bulk x{size}'] = [('/records/bulk', [item() for _ in range(min(size, rows - start))])
+                                  for start in range(0, rows, size)]
+    report = []
+    print(f"\n{'mode':<12} {'rows':>7} {'requests':>8} {'seconds':>8} {'rows/s':>9} {'errors':>6}")
+    for mode, calls in modes.items():
+        errors = 0
+        started = time.perf_counter()
+        for path, body in calls:
+            errors += c.call('POST', path, bench.user_token, json=body).status_code >= 400
+        elapsed = time.perf_counter() - started
+        row = {'mode': mode, 'rows': rows, 'requests': len(calls), 'seconds': round(elapsed, 2),
+               'rows_per_s': round(rows / elapsed, 1), 'errors': errors}
+        report.append(row)
+        print(f"{mode:<12} {rows:>7} {row['requests']:>8} {row['seconds']:>8} {row['rows_per_s']:>9} {errors:>6}")
+    return report
+
+
+def bulk_status_report(bench, count):
+    """Time POST /records/status over ``count`` ids: a change, then a no-op repeat."""
+    ids = bench._create_records(count)
+    report = []
+    print(f"\n{'status':<20} {'ids':>7} {'updated':>8} {'seconds':>8}")
+    for status in ('under investigation', 'under investigation'):
+        started = time.perf_counter()
+        response = bench.client.call('POST', '/records/status', bench.admin_token,
+                                     json={'status': status, 'ids': ids})
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        row = dict(response.json(), ids=count, seconds=round(elapsed, 2))
+        report.append(row)
+        print(f"{status:<20} {count:>7} {row['updated']:>8} {row['seconds']:>8}")
+    return report
+
+
+def sync_report(bench, fields='id,status,updated_at', limit=1000, polls=50):
+    """A full initial sync through GET /records/changes, then caught-up polls with its token."""
+    c = bench.client
+    params = {'fields': fields, 'limit': limit}
+    batches = changes = size = 0
+    token = None
+    started = time.perf_counter()
+    while True:
+        response = c.call('GET', '/records/changes', bench.user_token,
+                          params=dict(params, since=token) if token else params)
+        response.raise_for_status()
+        body = response.json()
+        batches += 1
+        changes += len(body['changes']) + len(body['deleted'])
+        size += len(response.content)
+        token = body['next_token']
+        if not body['has_more']:
+            break
+    initial = {'phase': 'initial', 'batches': batches, 'changes': changes,
+               'seconds': round(time.perf_counter() - started, 2), 'bytes': size}
+
+    latencies, sizes = [], []
+    for _ in range(polls):
+        started = time.perf_counter()
+        response = c.call('GET', '/records/changes', bench.user_token, params=dict(params, since=token))
+        latencies.append(time.perf_counter() - started)
+        sizes.append(len(response.content))
+    latencies.sort()
+    caught_up = {'phase': 'caught-up poll', 'polls': polls, 'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                 'p99_ms': round(percentile(latencies, 99) * 1000, 2), 'bytes': round(statistics.fmean(sizes))}
+    print(f"\nsync (fields={fields}, limit={limit}):")
+    print(f"  initial: {changes} changes in {batches} batches, {initial['seconds']} s, {size} bytes")
+    print(f"  caught-up poll: p50 {caught_up['p50_ms']} ms, p99 {caught_up['p99_ms']} ms, "
+          f"{caught_up['bytes']} bytes")
+    return [initial, caught_up]
+
+
+def auth_overhead_report(samples):
+    """Per-request cost of resolving the caller on the /records write endpoints.
+
+    Runs in-process against the app's configured database with the account
+    cache off (every request SELECTs the account row) and on, alternating
+    request by request so both see the same table sizes, and reports
+    latency and SQL statements per request for each.
+    """
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import event
+    from app import app
+    from auth import account_cache
+    from models import db, NormalUser
+
+    def item():
+        # Unrelated text each time, so duplicate detection stays out of the numbers.
+        return {'type': 'red-flag', 'title': uuid.uuid4().hex, 'description': uuid.uuid4().hex}
+
+    endpoints = {'POST /records': ('/records', item), 'POST /records/bulk': ('/records/bulk', lambda: [item()])}
+    modes = {'off': 0, 'on': 60}
+    with app.app_context():
+        user = NormalUser(name='Bench', email=f'bench-{uuid.uuid4().hex[:12]}@example.org', password='x')
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': f"Bearer {create_access_token(identity={'id': user.id, 'role': 'user'})}"}
+        engine = db.engine
+    client = app.test_client()
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    report = []
+    print(f"\n{'endpoint':<18} {'cache':<5} {'p50 ms':>8} {'mean ms':>8} {'queries':>8}")
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        for endpoint, (path, body) in endpoints.items():
+            latencies = {mode: [] for mode in modes}
+            queries = dict.fromkeys(modes, 0)
+            for i in range(samples + 1):
+                for mode, ttl in modes.items():
+                    account_cache.ttl = ttl
+                    statements.clear()
+                    started = time.perf_counter()
+                    client.post(path, json=body(), headers=headers)
+                    if i:  # the first round warms the cache and the connection pool
+                        latencies[mode].append(time.perf_counter() - started)
+                        queries[mode] += len(statements)
+            for mode in modes:
+                values = sorted(latencies[mode])
+                row = {'endpoint': endpoint, 'cache': mode,
+                       'p50_ms': round(percentile(values, 50) * 1000, 3),
+                       'mean_ms': round(statistics.fmean(values) * 1000, 3),
+                       'queries': round(queries[mode] / samples, 2)}
+                report.append(row)
+                print(f"{endpoint:<18} {mode:<5} {row['p50_ms']:>8} {row['mean_ms']:>8} {row['queries']:>8}")
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return report
+
+
+def stats_sources_report(samples):
+    """Time stats.summary() over record_stats against the same summary
+    computed with live GROUP BYs over records and records_archive, in-process
+    against the app's configured database."""
+    from sqlalchemy import func, literal
+    import stats
+    from app import app
+    from models import db, ArchivedRecord, Record
+
+    def live_summary(day_from=None):
+        sources = []
+        for model in (Record, ArchivedRecord):
+            query = db.select(model.created_at, model.status, model.type, model.geohash)
+            if day_from:
+                query = query.where(model.created_at >= day_from)
+            sources.append(query)
+        rows = db.union_all(*sources).subquery()
+        columns = {
+            'by_status': func.coalesce(rows.c.status, literal('')),
+            'by_type': rows.c.type,
+            'by_region': func.coalesce(func.substr(rows.c.geohash, 1, stats.REGION_PRECISION), literal('')),
+            'by_day': func.date(rows.c.created_at),
+        }
+        return {name: db.session.execute(db.select(column, func.count()).group_by(column)).all()
+                for name, column in columns.items()}
+
+    sources = {'aggregates': stats.summary, 'live': live_summary}
+    ranges = {'all time': None, 'last 90 days': (datetime.utcnow() - timedelta(days=90)).date()}
+    report = []
+    print(f"\n{'source':<11} {'range':<13} {'p50 ms':>9} {'mean ms':>9}")
+    with app.app_context():
+        for label, day_from in ranges.items():
+            for source, summarize in sources.items():
+                summarize(day_from)  # warm the page cache
+                latencies = []
+                for _ in range(samples):
+                    started = time.perf_counter()
+                    summarize(day_from)
+                    latencies.append(time.perf_counter() - started)
+                latencies.sort()
+                row = {'source': source, 'range': label,
+                       'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                       'mean_ms': round(statistics.fmean(latencies) * 1000, 2)}
+                report.append(row)
+                print(f"{source:<11} {label:<13} {row['p50_ms']:>9} {row['mean_ms']:>9}")
+    return report
+
+
+def dedupe_report(samples, rebuild=False):
+    """Per-record cost of duplicate detection on the app's configured database.
+
+    Signs the title and description of ``samples`` random stored records and
+    looks their band keys up in the LSH buckets, the two steps link_records
+    adds to every create. With ``rebuild`` it also times rebuild(), which
+    rewrites every fingerprint and link.
+    """
+    from sqlalchemy import func
+    import dedupe
+    from app import app
+    from models import db, Record
+
+    report = []
+    with app.app_context():
+        rows = db.session.execute(
+            db.select(Record.title, Record.description, Record.created_at).order_by(func.random()).limit(samples)
+        ).all()
+        timings = {'sign': [], 'lookup': []}
+        for row in rows:
+            started = time.perf_counter()
+            keys = dedupe.band_keys(dedupe.signature(row.title, row.description))
+            timings['sign'].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            dedupe._stored_candidates(set(keys), row.created_at - dedupe.WINDOW)
+            timings['lookup'].append(time.perf_counter() - started)
+        print(f"\n{'step':<8} {'samples':>8} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+        for step, values in timings.items():
+            values.sort()
+            row = {'step': step, 'samples': len(values),
+                   'p50_ms': round(percentile(values, 50) * 1000, 3),
+                   'p99_ms': round(percentile(values, 99) * 1000, 3),
+                   'mean_ms': round(statistics.fmean(values) * 1000, 3)}
+            report.append(row)
+            print(f"{step:<8} {len(values):>8} {row['p50_ms']:>8} {row['p99_ms']:>8} {row['mean_ms']:>8}")
+        if rebuild:
+            started = time.perf_counter()
+            processed, linked = dedupe.rebuild()
+            elapsed = time.perf_counter() - started
+            report.append({'step': 'rebuild', 'records': processed, 'linked': linked,
+                           'seconds': round(elapsed, 1)})
+            print(f"rebuild: {processed} records, {linked} linked, {elapsed:.1f} s")
+    return report
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['scenario'], r['concurrency']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {baseline_path}:")
+    for r in results:
+        old = baseline.get((r['scenario'], r['concurrency']))
+        if old:
+            print(f"  {r['scenario']:<14} c={r['concurrency']:<4} "
+                  f"rps {old['throughput_rps']:>9} -> {r['throughput_rps']:<9} "
+                  f"p99 {old['p99_ms']:>8}ms -> {r['p99_ms']}ms")
+
+
+def main():
+    args = parse_args()
+    in_process = {
+        'auth_overhead': auth_overhead_report,
+        'stats_sources': stats_sources_report,
+        'dedupe': lambda samples: dedupe_report(samples, args.dedupe_rebuild),
+    }
+    for name, run_report in in_process.items():
+        if getattr(args, name):
+            report = run_report(getattr(args, name))
+            if args.output:
+                with open(args.output, 'w') as f:
+                    json.dump({'started_at': datetime.utcnow().isoformat(), name: report}, f, indent=2)
+            return
+    client = Client(args.url)
+    bench = Bench(client, args.password)
+    results = []
+    print(f"{'scenario':<14} {'conc':>4} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'shed':>6} {'errors':>6}")
+    for scenario in args.scenarios:
+        for concurrency in args.concurrency:
+            action = bench.prepare(scenario, args.requests)
+            result = dict(run_level(action, args.requests, concurrency), scenario=scenario)
+            results.append(result)
+            print(f"{scenario:<14} {concurrency:>4} {result['throughput_rps']:>9} {result['p50_ms']:>8} "
+                  f"{result['p95_ms']:>8} {result['p99_ms']:>8} {result['shed']:>6} {result['errors']:>6}")
+
+    projections = projection_report(bench, args.page_sizes) if args.page_sizes else None
+    ingest = ingest_report(bench, args.ingest) if args.ingest else None
+    bulk_status = bulk_status_report(bench, args.bulk_status) if args.bulk_status else None
+    sync = sync_report(bench) if args.sync else None
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'url': args.url, 'started_at': datetime.utcnow().isoformat(),
+                       'results': results, 'projections': projections, 'ingest': ingest,
+                       'bulk_status': bulk_status, 'sync': sync}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
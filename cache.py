@@ -0,0 +1,159 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from flask import g, request, make_response
+
+
+class LRUBackend:
+    """In-process LRU with per-entry TTL.
+
+    Version counters live outside the LRU so they are never evicted; losing a
+    counter would make old entries look current again.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        # Counters restart at zero with the process; the epoch keeps versions
+        # from before a restart distinct from the ones after it.
+        self.epoch = uuid.uuid4().hex[:8]
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+
+class RedisBackend:
+    """Shared backend for multi-process deployments; any client exposing the
+    redis-py get/set/incr API works, which keeps it easy to fake locally."""
+
+    epoch = 'shared'
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=int(ttl))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def counter(self, key):
+        return int(self.client.get(key) or 0)
+
+    def incr(self, key):
+        self.client.incr(key)
+
+
+class ResponseCache:
+    def __init__(self, app=None, backend=None):
+        self.backend = backend
+        self.ttl = 30
+        self.enabled = True
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', 30)
+        if self.backend is None:
+            url = app.config.get('RESPONSE_CACHE_URL')
+            if url:
+                import redis
+                self.backend = RedisBackend(redis.Redis.from_url(url))
+            else:
+                self.backend = LRUBackend(app.config.get('RESPONSE_CACHE_SIZE', 1024))
+        app.extensions['response_cache'] = self
+
+    def invalidate(self, *scopes):
+        for scope in scopes:
+            self.backend.incr(f'version:{scope}')
+        self.stats['invalidations'] += 1
+
+    def version(self, scope):
+        return f'{self.backend.epoch}.{self.backend.counter(f"version:{scope}")}'
+
+    def _key(self, scopes):
+        versions = ','.join(f'{scope}={self.version(scope)}' for scope in scopes)
+        args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        # Replica reads may lag a write that already bumped the version, so
+        # they get entries of their own that primary readers never see.
+        source = 'replica' if g.get('db_read_replica') else 'primary'
+        return f'response:{request.endpoint}:{source}:{versions}:{args}'
+
+    def cached(self, *scope_templates):
+        """Cache a JSON view until one of its version scopes is invalidated.
+
+        Scope templates are formatted with the view arguments, e.g.
+        ``'record:{id}'``. The ETag is derived from the versioned key, so a
+        matching If-None-Match is answered before touching the database.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+                scopes = [template.format(**kwargs) for template in scope_templates]
+                key = self._key(scopes)
+                etag = hashlib.sha1(key.encode()).hexdigest()
+                if etag in request.if_none_match:
+                    self.stats['not_modified'] += 1
+                    response = make_response('', 304)
+                    response.set_etag(etag)
+                    return response
+
+                body = self.backend.get(key)
+                if body is not None:
+                    self.stats['hits'] += 1
+                    response = make_response(body, 200)
+                    response.mimetype = 'application/json'
+                    response.headers['X-Cache'] = 'HIT'
+                else:
+                    self.stats['misses'] += 1
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    self.backend.set(key, response.get_data(), self.ttl)
+                    response.headers['X-Cache'] = 'MISS'
+                response.set_etag(etag)
+                return response
+            return wrapper
+        return decorator
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,180 @@
+import time
+from functools import wraps
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from cache import LRUBackend, RedisBackend
+
+REPLICA_BIND = 'replica'
+
+
+def engine_options(config):
+    """Keyword arguments for ``create_engine()`` built from the app config.
+
+    Pool sizing is only passed through when set, so SQLite's default pools
+    keep working locally.
+    """
+    options = {
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+    }
+    for key, option in (('DB_POOL_SIZE', 'pool_size'), ('DB_MAX_OVERFLOW', 'max_overflow'),
+                        ('DB_POOL_TIMEOUT', 'pool_timeout')):
+        if config.get(key) is not None:
+            options[option] = config[key]
+    return options
+
+
+def install_statement_timeout(engine, default_ms):
+    """Enforce ``default_ms`` on statements run while serving a request.
+
+    Migrations, CLI maintenance jobs and other code outside a request get
+    no limit, so a backfill or index build on a large table is not killed
+    halfway. Any statement can still override the limit with the
+    ``statement_timeout`` execution option (milliseconds, 0 for none); on
+    PostgreSQL the override lasts until the end of the transaction.
+
+    PostgreSQL gets the limit as a session setting, issued on checkout only
+    when it differs from what the connection already has. SQLite has no
+    such setting, so a progress handler interrupts any statement that runs
+    past its deadline. The handler is per connection, so while a streamed
+    statement's cursor is open, statements run in between put its deadline
+    back once they have executed; the outer cursor keeps its own limit.
+    """
+    dialect = engine.dialect.name
+
+    def current_default():
+        return default_ms if has_request_context() else 0
+
+    if dialect == 'postgresql':
+        @event.listens_for(engine, 'checkout')
+        def apply_default(dbapi_connection, connection_record, connection_proxy):
+            timeout = int(current_default() or 0)
+            if connection_record.info.get('statement_timeout') != timeout:
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f'SET statement_timeout = {timeout}')
+                # Committed, or returning the connection would roll the SET back.
+                dbapi_connection.commit()
+                connection_record.info['statement_timeout'] = timeout
+
+    if dialect == 'sqlite':
+        @event.listens_for(engine, 'connect')
+        def add_progress_handler(dbapi_connection, connection_record):
+            info = connection_record.info
+
+            def past_deadline():
+                deadline = info.get('deadline')
+                return deadline is not None and time.monotonic() > deadline
+            dbapi_connection.set_progress_handler(past_deadline, 10000)
+
+        @event.listens_for(engine, 'commit')
+        @event.listens_for(engine, 'rollback')
+        def clear_deadline(conn):
+            conn.connection.info.pop('deadline', None)
+            conn.connection.info.pop('streaming', None)
+
+        def restore_deadline(conn, context):
+            if hasattr(context, '_outer_deadline'):
+                conn.connection.info['deadline'] = context._outer_deadline
+                del context._outer_deadline
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def end_statement(conn, cursor, statement, parameters, context, executemany):
+            restore_deadline(conn, context)
+
+        @event.listens_for(engine, 'handle_error')
+        def end_failed_statement(exception_context):
+            if exception_context.connection is not None:
+                restore_deadline(exception_context.connection, exception_context.execution_context)
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def apply_timeout(conn, cursor, statement, parameters, context, executemany):
+        override = context.execution_options.get('statement_timeout') if context else None
+        if dialect == 'sqlite':
+            info = conn.connection.info
+            timeout = current_default() if override is None else override
+            if context is not None and info.get('streaming'):
+                context._outer_deadline = info.get('deadline')
+            info['deadline'] = time.monotonic() + timeout / 1000 if timeout else None
+            if context is not None and context.execution_options.get('stream_results'):
+                info['streaming'] = True
+        elif dialect == 'postgresql' and override is not None:
+            # A separate cursor, since server-side cursors only execute once.
+            with conn.connection.dbapi_connection.cursor() as setter:
+                setter.execute(f'SET LOCAL statement_timeout = {int(override)}')
+
+
+class RoutingSession(Session):
+    """Sends reads to the replica bind while the request is marked read-only.
+
+    Flushes always go to the primary, so a handler that turns out to write
+    stays correct; it just loses the offload.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and g and g.get('db_read_replica'):
+            engines = self._db.engines
+            if REPLICA_BIND in engines:
+                return engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Read-replica routing with read-your-writes stickiness.
+
+    After a caller's successful write, their reads stay on the primary for
+    ``REPLICA_STICKY_SECONDS`` so they never see the replica lag behind
+    their own change. The sticky marks get a store of their own, so cached
+    responses can never evict them: the response cache's Redis when the
+    deployment shares one, an in-process LRU sized for
+    ``REPLICA_STICKY_SIZE`` concurrent writers otherwise.
+    """
+
+    def __init__(self, app=None, store=None):
+        self.store = store
+        self.sticky_seconds = 10
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = REPLICA_BIND in (app.config.get('SQLALCHEMY_BINDS') or {})
+        self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 10)
+        if self.store is None:
+            cache_backend = app.extensions['response_cache'].backend
+            if isinstance(cache_backend, RedisBackend):
+                self.store = RedisBackend(cache_backend.client)
+            else:
+                self.store = LRUBackend(app.config.get('REPLICA_STICKY_SIZE', 65536))
+        if self.enabled:
+            app.after_request(self._mark_writer)
+        app.extensions['replica_router'] = self
+
+    @staticmethod
+    def _key():
+        try:
+            identity = get_jwt_identity()
+        except RuntimeError:
+            return None
+        return f'replica-sticky:{identity["role"]}:{identity["id"]}' if identity else None
+
+    def _mark_writer(self, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            key = self._key()
+            if key is not None:
+                self.store.set(key, 1, self.sticky_seconds)
+        return response
+
+    def read_only(self, view):
+        """Route a read-only view's queries to the replica when it is safe."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.enabled:
+                key = self._key()
+                g.db_read_replica = key is None or self.store.get(key) is None
+            return view(*args, **kwargs)
+        return wrapper
+
+
+replica_router = ReplicaRouter()
@@ -0,0 +1,257 @@
+import hashlib
+import random
+import re
+import struct
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import bindparam, delete, func, insert, select, tuple_, update
+from geo import haversine_km
+from models import db, Record, RecordFingerprint, RecordLSHBucket
+from queries import records_by_id
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 2
+MAX_WORDS = 500
+SIMILARITY_THRESHOLD = 0.7
+RADIUS_KM = 2.0
+WINDOW = timedelta(hours=72)
+REBUILD_CHUNK_SIZE = 1000
+
+_PRIME = (1 << 31) - 1
+_rng = random.Random(20240521)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_SIGNATURE = struct.Struct(f'<{NUM_PERM}I')
+
+
+def shingles(title, description):
+    """Hashed word bigrams of the normalised title and description."""
+    words = re.findall(r'\w+', f'{title} {description}'.lower())[:MAX_WORDS]
+    if len(words) < SHINGLE_SIZE:
+        return {zlib.crc32(' '.join(words).encode())}
+    return {zlib.crc32(' '.join(words[i:i + SHINGLE_SIZE]).encode())
+            for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature(title, description):
+    hashes = shingles(title, description)
+    return tuple(min([(a * h + b) % _PRIME for h in hashes]) for a, b in _PERMUTATIONS)
+
+
+def band_keys(sig):
+    """(band, bucket) pairs; records sharing any pair become candidates.
+
+    With 16 bands of 4 rows a pair at 0.7 similarity collides in at least
+    one band ~99% of the time, and a pair at 0.3 only ~12%.
+    """
+    keys = []
+    for band in range(BANDS):
+        rows = sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(struct.pack(f'<H{ROWS_PER_BAND}I', band, *rows), digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, 'little', signed=True)))
+    return keys
+
+
+def similarity(a, b):
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def _close(item, candidate):
+    if abs(item.created_at - candidate['created_at']) > WINDOW:
+        return False
+    if None in (item.latitude, item.longitude, candidate['latitude'], candidate['longitude']):
+        return True
+    return haversine_km(item.latitude, item.longitude,
+                        candidate['latitude'], candidate['longitude']) <= RADIUS_KM
+
+
+def _stored_candidates(keys, since):
+    """Indexed records sharing any of ``keys``, one query for the whole batch."""
+    if not keys:
+        return {}
+    wanted = set(keys)
+    rows = db.session.execute(
+        select(RecordLSHBucket.band, RecordLSHBucket.bucket, Record.id, Record.duplicate_of_id,
+               Record.latitude, Record.longitude, Record.created_at, RecordFingerprint.signature)
+        .join(Record, Record.id == RecordLSHBucket.record_id)
+        .join(RecordFingerprint, RecordFingerprint.record_id == Record.id)
+        .where(RecordLSHBucket.bucket.in_({bucket for _, bucket in wanted}), Record.created_at >= since)
+    ).mappings()
+    found = defaultdict(list)
+    for row in rows:
+        key = (row['band'], row['bucket'])
+        if key in wanted:
+            found[key].append(dict(row, signature=_SIGNATURE.unpack(row['signature'])))
+    return found
+
+
+def link_records(items):
+    """Fingerprint ``items`` and return {record id: canonical record id}.
+
+    ``items`` need id, title, description, latitude, longitude and
+    created_at, and should come in creation order. Candidates come from the
+    LSH buckets only, so the cost per record is a handful of index probes no
+    matter how large the table is; items in the same batch are matched
+    against each other too. Fingerprints are written inside the caller's
+    transaction.
+    """
+    items = list(items)
+    if not items:
+        return {}
+    signatures = [signature(item.title, item.description) for item in items]
+    keys = [band_keys(sig) for sig in signatures]
+    stored = _stored_candidates({key for item_keys in keys for key in item_keys},
+                                min(item.created_at for item in items) - WINDOW)
+
+    links = {}
+    batch = defaultdict(list)
+    for item, sig, item_keys in zip(items, signatures, keys):
+        best, best_score = None, SIMILARITY_THRESHOLD
+        seen = set()
+        for key in item_keys:
+            for candidate in stored.get(key, []) + batch.get(key, []):
+                if candidate['id'] in seen or candidate['id'] == item.id:
+                    continue
+                seen.add(candidate['id'])
+                score = similarity(sig, candidate['signature'])
+                if score >= best_score and _close(item, candidate):
+                    best, best_score = candidate, score
+        canonical = None
+        if best is not None:
+            canonical = best['duplicate_of_id'] or best['id']
+            links[item.id] = canonical
+        entry = {'id': item.id, 'duplicate_of_id': canonical, 'latitude': item.latitude,
+                 'longitude': item.longitude, 'created_at': item.created_at, 'signature': sig}
+        for key in item_keys:
+            batch[key].append(entry)
+
+    db.session.execute(insert(RecordFingerprint), [
+        {'record_id': item.id, 'signature': _SIGNATURE.pack(*sig)} for item, sig in zip(items, signatures)
+    ])
+    db.session.execute(insert(RecordLSHBucket), [
+        {'band': band, 'bucket': bucket, 'record_id': item.id}
+        for item, item_keys in zip(items, keys) for band, bucket in item_keys
+    ])
+    return links
+
+
+def apply_links(links, touch=True):
+    """Store {record id: canonical id}; ``touch=False`` keeps ``updated_at``
+    and ``sync_seq`` as they are, for maintenance writes the sync feed
+    should not report."""
+    if links:
+        records = Record.__table__
+        stmt = update(records).where(records.c.id == bindparam('record_id')) \
+            .values(duplicate_of_id=bindparam('canonical'))
+        if not touch:
+            stmt = stmt.values(updated_at=records.c.updated_at, sync_seq=records.c.sync_seq)
+        db.session.execute(stmt, [
+            {'record_id': record_id, 'canonical': canonical} for record_id, canonical in links.items()
+        ])
+
+
+def _forget(record_ids):
+    db.session.execute(delete(RecordLSHBucket).where(RecordLSHBucket.record_id.in_(record_ids)))
+    db.session.execute(delete(RecordFingerprint).where(RecordFingerprint.record_id.in_(record_ids)))
+
+
+def record_added(record):
+    """Fingerprint a flushed record and link it to its canonical report."""
+    record.duplicate_of_id = link_records([record]).get(record.id)
+
+
+def record_changed(record):
+    """Refresh the fingerprint after an edit; existing links are kept."""
+    _forget([record.id])
+    link_records([record])
+
+
+def record_removed(record):
+    """Drop the fingerprint and detach any duplicates pointing at ``record``."""
+    _forget([record.id])
+    db.session.execute(
+        update(Record).where(Record.duplicate_of_id == record.id).values(duplicate_of_id=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def duplicate_clusters(page, per_page):
+    """Return (clusters, total) for canonical records with the most duplicates first."""
+    size = func.count(Record.id).label('size')
+    grouped = (db.session.query(Record.duplicate_of_id, size)
+               .filter(Record.duplicate_of_id.isnot(None))
+               .group_by(Record.duplicate_of_id))
+    total = grouped.order_by(None).count()
+    rows = grouped.order_by(size.desc(), Record.duplicate_of_id).limit(per_page) \
+        .offset((page - 1) * per_page).all()
+    canonical_ids = [canonical_id for canonical_id, _ in rows]
+    canonical = records_by_id(canonical_ids)
+    members = defaultdict(list)
+    for record_id, canonical_id in db.session.query(Record.id, Record.duplicate_of_id) \
+            .filter(Record.duplicate_of_id.in_(canonical_ids)).order_by(Record.id):
+        members[canonical_id].append(record_id)
+    return [{
+        'canonical': canonical[canonical_id].to_dict() if canonical_id in canonical else {'id': canonical_id},
+        'duplicate_count': count,
+        'duplicate_ids': members[canonical_id],
+    } for canonical_id, count in rows], total
+
+
+def rebuild(chunk_size=REBUILD_CHUNK_SIZE):
+    """Re-fingerprint every record in creation order and relink duplicates.
+
+    Links are recomputed from scratch without touching ``sync_seq``; only
+    records whose link ends up different are bumped at the end, so a rebuild
+    does not send the whole table to every sync client.
+    """
+    previous = dict(db.session.execute(
+        select(Record.id, Record.duplicate_of_id).where(Record.duplicate_of_id.isnot(None))
+    ).all())
+    db.session.execute(delete(RecordLSHBucket))
+    db.session.execute(delete(RecordFingerprint))
+    db.session.execute(
+        update(Record).where(Record.duplicate_of_id.isnot(None))
+        .values(duplicate_of_id=None, updated_at=Record.updated_at, sync_seq=Record.sync_seq)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    stmt = select(Record.id, Record.title, Record.description, Record.latitude, Record.longitude,
+                  Record.created_at).where(Record.created_at.isnot(None)) \
+        .order_by(Record.created_at, Record.id).limit(chunk_size)
+    processed = 0
+    current = {}
+    last = None
+    while True:
+        page = stmt if last is None else stmt.where(tuple_(Record.created_at, Record.id) > last)
+        rows = db.session.execute(page).all()
+        if not rows:
+            break
+        links = link_records(rows)
+        apply_links(links, touch=False)
+        db.session.commit()
+        current.update(links)
+        processed += len(rows)
+        last = (rows[-1].created_at, rows[-1].id)
+
+    changed = sorted(record_id for record_id in previous.keys() | current.keys()
+                     if previous.get(record_id) != current.get(record_id))
+    for start in range(0, len(changed), chunk_size):
+        db.session.execute(
+            update(Record).where(Record.id.in_(changed[start:start + chunk_size]))
+            .values(updated_at=datetime.utcnow()).execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    return processed, len(current)
+
+
+def init_app(app):
+    @app.cli.command('rebuild-duplicates')
+    @click.option('--chunk-size', default=REBUILD_CHUNK_SIZE)
+    def rebuild_duplicates(chunk_size):
+        """Recompute similarity fingerprints and duplicate links for all records."""
+        processed, linked = rebuild(chunk_size)
+        click.echo(f'Fingerprinted {processed} records, {linked} linked as duplicates')
@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import select
+from models import db, ArchivedMedia, Media
+from queries import apply_record_filters, record_source
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_COLUMNS = ('id', 'type', 'title', 'description', 'status', 'latitude', 'longitude',
+                  'normal_user_id', 'created_at')
+CSV_HEADER = EXPORT_COLUMNS + ('image_urls', 'video_urls')
+
+
+def record_chunks(filters, include_archived=False):
+    """Yield lists of plain row dicts with their media attached.
+
+    Rows come off a server-side cursor ``EXPORT_CHUNK_SIZE`` at a time and
+    are never hydrated into ORM objects; each chunk's media is fetched with
+    one ``record_id IN (...)`` query per media table, so memory depends on
+    the chunk size alone.
+    """
+    model = record_source(include_archived, filters)
+    media_models = (Media, ArchivedMedia) if include_archived else (Media,)
+    timeout = current_app.config.get('EXPORT_STATEMENT_TIMEOUT_MS', 0)
+    stmt = apply_record_filters(select(*(getattr(model, c) for c in EXPORT_COLUMNS)), filters, model)
+    result = db.session.execute(stmt.execution_options(
+        stream_results=True, yield_per=EXPORT_CHUNK_SIZE, statement_timeout=timeout
+    ))
+    for partition in result.mappings().partitions():
+        rows = [dict(row) for row in partition]
+        media = defaultdict(list)
+        for media_model in media_models:
+            for m in db.session.execute(
+                select(media_model.id, media_model.image_url, media_model.video_url,
+                       media_model.thumbnail_url, media_model.record_id)
+                .where(media_model.record_id.in_([row['id'] for row in rows]))
+                .order_by(media_model.id)
+                .execution_options(statement_timeout=timeout)
+            ).mappings():
+                media[m['record_id']].append(dict(m))
+        for row in rows:
+            row['created_at'] = row['created_at'].isoformat() if row['created_at'] else None
+            row['media'] = media.get(row['id'], [])
+        yield rows
+
+
+def ndjson_stream(filters, include_archived=False):
+    for rows in record_chunks(filters, include_archived):
+        yield ''.join(json.dumps(row) + '\n' for row in rows)
+
+
+def csv_stream(filters, include_archived=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    for rows in record_chunks(filters, include_archived):
+        for row in rows:
+            writer.writerow([row[c] for c in EXPORT_COLUMNS] + [
+                ' '.join(m['image_url'] for m in row['media'] if m['image_url']),
+                ' '.join(m['video_url'] for m in row['media'] if m['video_url']),
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,98 @@
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 12
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+MAX_COVER_CELLS = 32
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if longitude >= mid:
+                value, lng_lo = value * 2 + 1, mid
+            else:
+                value, lng_hi = value * 2, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                value, lat_lo = value * 2 + 1, mid
+            else:
+                value, lat_hi = value * 2, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def record_geohash(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    return encode_geohash(latitude, longitude)
+
+
+def cell_size(precision):
+    """Return (height, width) in degrees of a geohash cell."""
+    lat_bits = 5 * precision // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def _steps(lo, hi, step):
+    values = []
+    value = lo
+    while value < hi:
+        values.append(value)
+        value += step
+    values.append(hi)
+    return values
+
+
+def _cell_count(min_lat, min_lng, max_lat, max_lng, precision):
+    height, width = cell_size(precision)
+    return (math.ceil((max_lat - min_lat) / height) + 1) * (math.ceil((max_lng - min_lng) / width) + 1)
+
+
+def cover_precision(min_lat, min_lng, max_lat, max_lng, max_cells=MAX_COVER_CELLS):
+    """Finest precision whose cells cover the box in at most ``max_cells`` cells."""
+    precision = 1
+    while (precision < GEOHASH_PRECISION and
+           _cell_count(min_lat, min_lng, max_lat, max_lng, precision + 1) <= max_cells):
+        precision += 1
+    return precision
+
+
+def cover(min_lat, min_lng, max_lat, max_lng, precision=None):
+    """Return the geohash prefixes of every cell that intersects the box."""
+    if precision is None:
+        precision = cover_precision(min_lat, min_lng, max_lat, max_lng)
+    height, width = cell_size(precision)
+    return sorted({
+        encode_geohash(lat, lng, precision)
+        for lat in _steps(min_lat, max_lat, height)
+        for lng in _steps(min_lng, max_lng, width)
+    })
+
+
+def radius_bbox(latitude, longitude, radius_km):
+    dlat = radius_km / KM_PER_DEGREE
+    dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return (max(latitude - dlat, -90.0), max(longitude - dlng, -180.0),
+            min(latitude + dlat, 90.0), min(longitude + dlng, 180.0))
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
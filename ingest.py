@@ -0,0 +1,176 @@
+import json
+from collections import Counter
+from types import SimpleNamespace
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from geo import record_geohash
+from models import db, Record, Media
+import stats
+import dedupe
+
+BULK_MAX_ITEMS = 10000
+BULK_CHUNK_SIZE = 500
+MAX_LENGTHS = {'type': 20, 'title': 100, 'client_key': 64}
+MEDIA_FIELDS = ('image_url', 'video_url')
+MAX_MEDIA_PER_ITEM = 20
+MAX_MEDIA_URL_LENGTH = 2048
+
+
+def read_items(req):
+    """Parse a JSON array body or an NDJSON stream (one record per line)."""
+    if req.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        items = []
+        for line in req.stream:
+            if line.strip():
+                items.append(json.loads(line))
+                if len(items) > BULK_MAX_ITEMS:
+                    break
+        return items
+    items = req.get_json()
+    if not isinstance(items, list):
+        raise ValueError('Expected a JSON array of records')
+    return items
+
+
+def _item_errors(item):
+    if not isinstance(item, dict):
+        return ['must be an object']
+    errors = []
+    for field in ('type', 'title', 'description'):
+        if not isinstance(item.get(field), str) or not item[field].strip():
+            errors.append(f'{field} is required')
+    for field, limit in MAX_LENGTHS.items():
+        if isinstance(item.get(field), str) and len(item[field]) > limit:
+            errors.append(f'{field} must be at most {limit} characters')
+    if item.get('client_key') is not None and not isinstance(item['client_key'], str):
+        errors.append('client_key must be a string')
+    for field, bound in (('latitude', 90), ('longitude', 180)):
+        value = item.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                  or not -bound <= value <= bound):
+            errors.append(f'{field} must be a number between -{bound} and {bound}')
+    media = item.get('media', [])
+    if not isinstance(media, list) or not all(isinstance(m, dict) for m in media):
+        errors.append('media must be a list of objects')
+    elif len(media) > MAX_MEDIA_PER_ITEM:
+        errors.append(f'at most {MAX_MEDIA_PER_ITEM} media per record')
+    else:
+        for position, m in enumerate(media):
+            errors.extend(f'media[{position}].{error}' for error in _media_errors(m))
+    return errors
+
+
+def _media_errors(media):
+    errors = []
+    for field in MEDIA_FIELDS:
+        value = media.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, str) or not value.strip():
+            errors.append(f'{field} must be a non-empty string')
+        elif len(value) > MAX_MEDIA_URL_LENGTH:
+            errors.append(f'{field} must be at most {MAX_MEDIA_URL_LENGTH} characters')
+    if all(media.get(field) is None for field in MEDIA_FIELDS):
+        errors.append('image_url or video_url is required')
+    return errors
+
+
+def validate_items(items):
+    """Return {index: [errors]} for every invalid item; empty when all pass."""
+    errors = {}
+    if len(items) > BULK_MAX_ITEMS:
+        return {None: [f'at most {BULK_MAX_ITEMS} records per request']}
+    seen = set()
+    for index, item in enumerate(items):
+        item_errors = _item_errors(item)
+        key = item.get('client_key') if isinstance(item, dict) else None
+        if key is not None:
+            if key in seen:
+                item_errors.append('duplicate client_key in request')
+            seen.add(key)
+        if item_errors:
+            errors[index] = item_errors
+    return errors
+
+
+def _existing_keys(user_id, keys):
+    if not keys:
+        return {}
+    rows = db.session.query(Record.client_key, Record.id).filter(
+        Record.normal_user_id == user_id, Record.client_key.in_(keys)
+    )
+    return dict(rows)
+
+
+def _insert_chunk(user_id, chunk):
+    existing = _existing_keys(user_id, [item['client_key'] for _, item in chunk if item.get('client_key')])
+    results = {}
+    fresh = []
+    for index, item in chunk:
+        if item.get('client_key') in existing:
+            results[index] = {'index': index, 'status': 'duplicate', 'id': existing[item['client_key']]}
+        else:
+            fresh.append((index, item))
+    if not fresh:
+        return results
+
+    rows = [{
+        'type': item['type'],
+        'title': item['title'],
+        'description': item['description'],
+        'latitude': item.get('latitude'),
+        'longitude': item.get('longitude'),
+        'geohash': record_geohash(item.get('latitude'), item.get('longitude')),
+        'client_key': item.get('client_key'),
+        'normal_user_id': user_id,
+    } for _, item in fresh]
+    inserted = db.session.execute(
+        insert(Record).returning(Record.id, Record.created_at, sort_by_parameter_order=True), rows
+    ).all()
+    ids = [record_id for record_id, _ in inserted]
+    stats.adjust(Counter(
+        stats.bucket(created_at, 'draft', row['type'], row['geohash'])
+        for (_, created_at), row in zip(inserted, rows)
+    ))
+    links = dedupe.link_records(
+        SimpleNamespace(**row, id=record_id, created_at=created_at)
+        for (record_id, created_at), row in zip(inserted, rows)
+    )
+    dedupe.apply_links(links)
+
+    media_rows = [
+        {'image_url': m.get('image_url'), 'video_url': m.get('video_url'), 'record_id': record_id}
+        for record_id, (_, item) in zip(ids, fresh)
+        for m in item.get('media', [])
+    ]
+    if media_rows:
+        db.session.execute(insert(Media), media_rows)
+    for record_id, (index, _) in zip(ids, fresh):
+        results[index] = {'index': index, 'status': 'created', 'id': record_id,
+                          'duplicate_of_id': links.get(record_id)}
+    return results
+
+
+def ingest_records(user_id, items, chunk_size=BULK_CHUNK_SIZE):
+    """Insert validated ``items`` for ``user_id`` in chunked transactions.
+
+    Each chunk is one multi-row INSERT for records and one for media,
+    committed on its own. Items whose client_key already exists for this
+    user are reported as duplicates, so a retried sync is a no-op; a chunk
+    that loses a race with a concurrent retry is re-run once.
+    """
+    results = []
+    indexed = list(enumerate(items))
+    for start in range(0, len(indexed), chunk_size):
+        chunk = indexed[start:start + chunk_size]
+        for attempt in range(2):
+            try:
+                chunk_results = _insert_chunk(user_id, chunk)
+                db.session.commit()
+                break
+            except IntegrityError:
+                db.session.rollback()
+                if attempt:
+                    raise
+        results.extend(chunk_results[index] for index, _ in chunk)
+    return results
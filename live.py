@@ -0,0 +1,313 @@
+import asyncio
+import json
+import logging
+import re
+import threading
+from collections import deque
+import click
+import jwt as pyjwt
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15
+START_TIMEOUT_SECONDS = 10
+REDIS_STREAM = 'jiseti:record-events'
+EVENT_TYPES = ('record-created', 'record-updated', 'record-deleted', 'media-added', 'status-changed',
+               'statuses-changed')
+
+
+_EVENT_ID = re.compile(r'\d+(-\d+)?')
+
+
+def _order(event_id):
+    return tuple(int(part) for part in event_id.split('-'))
+
+
+def _valid_event_id(event_id):
+    """In-process ids are counters, Redis stream ids are ``ms-seq``."""
+    return _EVENT_ID.fullmatch(event_id) is not None
+
+
+class MemoryEventLog:
+    """Bounded, ordered buffer of recent events used for fan-out and replay."""
+
+    def __init__(self, maxlen=10000):
+        self.events = deque(maxlen=maxlen)
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.evicted = False
+
+    def append(self, event_type, data, event_id=None):
+        with self.lock:
+            if event_id is None:
+                self.seq += 1
+                event_id = str(self.seq)
+            if len(self.events) == self.events.maxlen:
+                self.evicted = True
+            event = {'id': event_id, 'type': event_type, 'data': data}
+            self.events.append(event)
+            return event
+
+    def last_id(self):
+        with self.lock:
+            return self.events[-1]['id'] if self.events else '0'
+
+    def after(self, last_id):
+        """Return (events newer than last_id, whether the buffer covers the gap).
+
+        Scans from the newest event backwards, so an up-to-date subscriber
+        costs O(new events) rather than O(buffer).
+        """
+        key = _order(last_id)
+        with self.lock:
+            if self.events and key > _order(self.events[-1]['id']):
+                return [], False
+            newer = []
+            for event in reversed(self.events):
+                if _order(event['id']) <= key:
+                    return newer[::-1], True
+                newer.append(event)
+            return newer[::-1], not self.evicted
+
+
+def record_event_data(record):
+    return {
+        'record_id': record.id,
+        'title': record.title,
+        'type': record.type,
+        'status': record.status,
+        'latitude': record.latitude,
+        'longitude': record.longitude,
+        'geohash': record.geohash,
+    }
+
+
+def bulk_status_event_data(records, status):
+    """One event for a chunk of records moved to ``status`` together."""
+    return {
+        'record_ids': [record.id for record in records],
+        'status': status,
+        'types': sorted({record.type for record in records}),
+    }
+
+
+def _matches(data, filters):
+    if 'record_ids' in data:
+        # A bulk summary is matched on what its records share; region
+        # subscribers get it regardless and refetch the ids they care about.
+        if filters.get('status') and data['status'] != filters['status']:
+            return False
+        return not filters.get('type') or filters['type'] in data['types']
+    for key in ('type', 'status'):
+        if filters.get(key) and data.get(key) != filters[key]:
+            return False
+    region = filters.get('region')
+    if region and not (data.get('geohash') or '').startswith(region):
+        return False
+    return True
+
+
+def _format(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n".encode()
+
+
+def _reset(event_id):
+    return f'id: {event_id}\nevent: reset\ndata: {{}}\n\n'.encode()
+
+
+class LiveEvents:
+    """Server-Sent Events feed of record changes.
+
+    Flask handlers call publish(); subscribers are served by a small aiohttp
+    app on its own event loop, so every idle connection is a coroutine
+    rather than a WSGI worker thread. Without LIVE_EVENTS_REDIS_URL events
+    fan out in-process; with it they go through a Redis stream, which every
+    node mirrors into its local buffer with a single XREAD loop and which
+    also serves Last-Event-ID replays older than that buffer.
+
+    Nothing is served until ``start()`` or ``serve()`` is called: importing
+    the app for a CLI command or a second worker must not bind the port.
+    Run ``flask serve-events`` as its own process when events go through
+    Redis, or call ``start()`` from a single-process entry point.
+    """
+
+    def __init__(self, app=None):
+        self.log = MemoryEventLog()
+        self.loop = None
+        self.redis = None
+        self.redis_url = None
+        self._tick = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.log = MemoryEventLog(app.config.get('LIVE_EVENTS_BUFFER', 10000))
+        self.secret = app.config.get('JWT_SECRET_KEY')
+        self.algorithm = app.config.get('JWT_ALGORITHM', 'HS256')
+        self.redis_url = app.config.get('LIVE_EVENTS_REDIS_URL')
+        if self.redis_url:
+            import redis
+            self.redis = redis.Redis.from_url(self.redis_url)
+        app.extensions['live_events'] = self
+
+        @app.cli.command('serve-events')
+        @click.option('--host', default=None)
+        @click.option('--port', type=int, default=None)
+        def serve_events(host, port):
+            """Serve the record events feed in the foreground."""
+            if not self.redis_url:
+                raise click.UsageError('LIVE_EVENTS_REDIS_URL is required: without it events only '
+                                       'reach a feed running inside the web process.')
+            port = port or app.config.get('LIVE_EVENTS_PORT')
+            if not port:
+                raise click.UsageError('Pass --port or set LIVE_EVENTS_PORT.')
+            self.serve(host or app.config.get('LIVE_EVENTS_HOST', '127.0.0.1'), int(port))
+
+    def publish(self, event_type, data):
+        if self.redis is not None:
+            self.redis.xadd(REDIS_STREAM, {'type': event_type, 'data': json.dumps(data)},
+                            maxlen=self.log.events.maxlen * 10, approximate=True)
+            return
+        self.log.append(event_type, data)
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        tick, self._tick = self._tick, asyncio.Event()
+        tick.set()
+
+    def _authorize(self, request):
+        auth = request.headers.get('Authorization', '')
+        token = auth[7:] if auth.startswith('Bearer ') else request.query.get('token')
+        if not token:
+            raise web.HTTPUnauthorized(text='Missing token')
+        try:
+            claims = pyjwt.decode(token, self.secret, algorithms=[self.algorithm])
+        except pyjwt.PyJWTError:
+            raise web.HTTPUnauthorized(text='Invalid token')
+        if claims.get('sub', {}).get('role') != 'admin':
+            raise web.HTTPForbidden(text='Unauthorized')
+
+    async def _replay(self, last_id):
+        if self.redis_url is None:
+            return None
+        rows = await self._aredis.xrange(REDIS_STREAM, min=f'({last_id}', count=self.log.events.maxlen)
+        return [{'id': rid.decode(), 'type': f[b'type'].decode(), 'data': json.loads(f[b'data'])}
+                for rid, f in rows]
+
+    async def stream(self, request):
+        self._authorize(request)
+        filters = {key: request.query.get(key) for key in ('type', 'status', 'region')}
+        last_id = request.headers.get('Last-Event-ID') or request.query.get('last_event_id')
+
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+        await response.prepare(request)
+        try:
+            if last_id is not None and not _valid_event_id(last_id):
+                # Not an id we ever issued: treat it like a gap we cannot replay.
+                last_id = self.log.last_id()
+                await response.write(_reset(last_id))
+            if last_id is None:
+                last_id = self.log.last_id()
+            while True:
+                tick = self._tick
+                events, complete = self.log.after(last_id)
+                if not complete:
+                    events = await self._replay(last_id)
+                    if events is None:
+                        # Gap is no longer buffered: the client must refetch.
+                        last_id = self.log.last_id()
+                        await response.write(_reset(last_id))
+                        continue
+                for event in events:
+                    last_id = event['id']
+                    if _matches(event['data'], filters):
+                        await response.write(_format(event))
+                if not events:
+                    try:
+                        await asyncio.wait_for(tick.wait(), HEARTBEAT_SECONDS)
+                    except asyncio.TimeoutError:
+                        await response.write(b': keep-alive\n\n')
+        except ConnectionResetError:
+            pass
+        return response
+
+    async def _mirror_redis(self):
+        from redis import asyncio as aioredis
+        self._aredis = aioredis.Redis.from_url(self.redis_url)
+        last_id = '$'
+        while True:
+            try:
+                batches = await self._aredis.xread({REDIS_STREAM: last_id}, block=5000, count=1000)
+            except Exception:
+                logger.exception('Redis event stream read failed')
+                await asyncio.sleep(1)
+                continue
+            for _, rows in batches:
+                for rid, fields in rows:
+                    last_id = rid.decode()
+                    self.log.append(fields[b'type'].decode(), json.loads(fields[b'data']), event_id=last_id)
+            if batches:
+                self._wake()
+
+    def web_app(self):
+        app = web.Application()
+        app.router.add_get('/records/events', self.stream)
+        return app
+
+    async def _listen(self, host, port):
+        self._tick = asyncio.Event()
+        runner = web.AppRunner(self.web_app())
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+        except BaseException:
+            await runner.cleanup()
+            raise
+        if self.redis_url:
+            asyncio.get_running_loop().create_task(self._mirror_redis())
+
+    def serve(self, host, port):
+        """Serve the feed on the calling thread until interrupted."""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._listen(host, port))
+        logger.info('Serving record events on %s:%s', host, port)
+        self.loop.run_forever()
+
+    def start(self, host, port, timeout=START_TIMEOUT_SECONDS):
+        """Serve the feed from a daemon thread running its own event loop.
+
+        Returns once the port is bound. A bind failure is raised here, and
+        TimeoutError if the server is not up within ``timeout`` seconds.
+        """
+        ready = threading.Event()
+        failure = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self._listen(host, port))
+            except BaseException as e:
+                failure.append(e)
+                loop.close()
+                ready.set()
+                return
+            self.loop = loop
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name='live-events', daemon=True).start()
+        if not ready.wait(timeout):
+            raise TimeoutError(f'Live events server did not start within {timeout}s')
+        if failure:
+            raise failure[0]
+
+
+live_events = LiveEvents()
@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from PIL import Image, ImageOps
+from cache import response_cache
+from models import db, Media, Record
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_SIZE = (320, 320)
+VIDEO_EXTENSIONS = {'video/mp4': '.mp4', 'video/quicktime': '.mov', 'video/webm': '.webm'}
+PUBLIC_PREFIXES = ('images/', 'thumbs/', 'videos/')
+
+
+class LocalStorage:
+    """Content-addressed files under ``root``; the reference storage backend.
+
+    Other backends (S3, GCS, ...) only need the same four methods.
+    """
+
+    def __init__(self, root, url_prefix):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip('/') + '/'
+        os.makedirs(os.path.join(root, 'tmp'), exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def url(self, key):
+        return self.url_prefix + key
+
+    def key_for_url(self, url):
+        if url and url.startswith(self.url_prefix):
+            return url[len(self.url_prefix):]
+        return None
+
+    def open(self, key, mode='rb'):
+        path = self._path(key)
+        if 'w' in mode:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(path, mode)
+
+    def write_stream(self, stream, key_for_hash):
+        """Copy ``stream`` to storage in fixed-size chunks while hashing it.
+
+        Returns (key, sha256, size). The file lands under the key derived from
+        its hash, so uploading the same bytes twice stores them once.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.root, 'tmp'))
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            content_hash = digest.hexdigest()
+            key = key_for_hash(content_hash)
+            if self.exists(key):
+                os.remove(tmp)
+            else:
+                os.makedirs(os.path.dirname(self._path(key)), exist_ok=True)
+                os.replace(tmp, self._path(key))
+            return key, content_hash, size
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+class MediaPipeline:
+    def __init__(self, app=None):
+        self.app = None
+        self.storage = None
+        self.executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.storage = LocalStorage(
+            app.config.get('MEDIA_STORAGE_ROOT') or os.path.join(app.instance_path, 'media'),
+            app.config.get('MEDIA_URL_PREFIX', '/media')
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config.get('MEDIA_WORKERS', 2), thread_name_prefix='media'
+        )
+        app.extensions['media_pipeline'] = self
+
+    def store_upload(self, file):
+        """Stream an uploaded FileStorage into storage and return Media column values."""
+        if file.mimetype in VIDEO_EXTENSIONS:
+            extension = VIDEO_EXTENSIONS[file.mimetype]
+            key, content_hash, size = self.storage.write_stream(
+                file.stream, lambda h: f'videos/{h}{extension}'
+            )
+            return {'content_hash': content_hash, 'size_bytes': size, 'video_url': self.storage.url(key)}
+        # Originals keep their EXIF (GPS, device) and are never served; only
+        # the re-encoded copy made by the worker is public.
+        key, content_hash, size = self.storage.write_stream(file.stream, lambda h: f'originals/{h}')
+        return {'content_hash': content_hash, 'size_bytes': size}
+
+    def submit(self, content_hash):
+        self.executor.submit(self._process_image, content_hash)
+
+    def _process_image(self, content_hash):
+        image_key, thumb_key = f'images/{content_hash}.jpg', f'thumbs/{content_hash}.jpg'
+        try:
+            with self.storage.open(f'originals/{content_hash}') as f, Image.open(f) as original:
+                image = ImageOps.exif_transpose(original)
+                if image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+                width, height = image.size
+                # Saving without exif= drops all metadata from the public copy.
+                with self.storage.open(image_key, 'wb') as out:
+                    image.save(out, 'JPEG', quality=90, optimize=True)
+                image.thumbnail(THUMBNAIL_SIZE)
+                with self.storage.open(thumb_key, 'wb') as out:
+                    image.save(out, 'JPEG', quality=80, optimize=True)
+        except Exception:
+            logger.exception('Could not process image %s', content_hash)
+            return
+
+        with self.app.app_context():
+            rows = Media.query.filter_by(content_hash=content_hash)
+            record_ids = {m.record_id for m in rows}
+            rows.update({
+                'image_url': self.storage.url(image_key),
+                'thumbnail_url': self.storage.url(thumb_key),
+                'width': width,
+                'height': height,
+            })
+            # A query-level UPDATE skips the Media mapper events, so touch the records here.
+            Record.query.filter(Record.id.in_(record_ids)).update(
+                {'updated_at': datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+        response_cache.invalidate('records', *(f'record:{record_id}' for record_id in record_ids))
+
+    def attach(self, record_id, file):
+        """Create the Media row for an upload, reusing processed output when
+        the same content was uploaded before."""
+        values = self.store_upload(file)
+        media = Media(record_id=record_id, **values)
+        processed = None
+        if 'video_url' not in values:
+            processed = Media.query.filter(
+                Media.content_hash == values['content_hash'], Media.thumbnail_url.isnot(None)
+            ).first()
+            if processed is not None:
+                media.image_url = processed.image_url
+                media.thumbnail_url = processed.thumbnail_url
+                media.width, media.height = processed.width, processed.height
+        db.session.add(media)
+        db.session.commit()
+        if 'video_url' not in values and processed is None:
+            self.submit(values['content_hash'])
+        return media
+
+
+media_pipeline = MediaPipeline()
@@ -0,0 +1,290 @@
+import bisect
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from flask import request
+from sqlalchemy import event
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class CounterMetric:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        for label_values, value in sorted(self.values.items()):
+            yield f'{self.name}{_labels(self.labels, label_values)} {value}'
+
+
+class HistogramMetric:
+    """Cumulative-bucket histogram in the Prometheus exposition layout."""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        names = self.labels + ('le',)
+        for label_values, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{_labels(names, label_values + (bound,))} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labels, label_values)} {total}'
+            yield f'{self.name}_count{_labels(self.labels, label_values)} {count}'
+
+
+class SamplingProfiler:
+    """Samples the stacks of in-flight request threads on a timer.
+
+    Stacks are kept in collapsed ``frame;frame;frame count`` form, which
+    flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, interval=0.005, directory='profiles'):
+        self.interval = interval
+        self.directory = directory
+        self.active = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self.thread.start()
+
+    def watch(self):
+        samples = Counter()
+        with self.lock:
+            self.active[threading.get_ident()] = samples
+        return samples
+
+    def unwatch(self):
+        with self.lock:
+            return self.active.pop(threading.get_ident(), None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def dump(self, samples, endpoint, duration):
+        path = os.path.join(self.directory,
+                            f'{time.strftime("%Y%m%dT%H%M%S")}-{endpoint}-{int(duration * 1000)}ms.folded')
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+
+class _RequestTally(threading.local):
+    started = None
+    queries = 0
+    query_time = 0.0
+
+
+class Metrics:
+    """Request, SQL and connection-pool instrumentation exposed as Prometheus text.
+
+    Nothing is hooked when ``METRICS_ENABLED`` is off, so the disabled cost is
+    a config lookup at startup. The profiler only runs when
+    ``PROFILE_SLOW_REQUEST_MS`` is set.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.slow_query_seconds = 0.25
+        self.profiler = None
+        self.profile_threshold = None
+        self._current = _RequestTally()
+        self.requests = CounterMetric('http_requests_total', 'Requests handled.', ('endpoint', 'method', 'status'))
+        self.latency = HistogramMetric('http_request_duration_seconds', 'Request latency.', ('endpoint', 'method'))
+        self.request_queries = HistogramMetric('http_request_db_queries', 'SQL statements per request.',
+                                               ('endpoint',), QUERY_COUNT_BUCKETS)
+        self.request_query_time = HistogramMetric('http_request_db_seconds', 'SQL time per request.', ('endpoint',))
+        self.queries = HistogramMetric('db_query_duration_seconds', 'SQL statement latency.')
+        self.slow_queries = CounterMetric('db_slow_queries_total', 'SQL statements over the slow-query threshold.')
+        self.pool_connect = HistogramMetric('db_pool_connect_seconds', 'Time to open a new database connection.')
+        self.pool_checkout = HistogramMetric('db_pool_checkout_seconds',
+                                             'Time a checked-out connection was held before checkin.')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['metrics'] = self
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        if not self.enabled:
+            return
+        self.slow_query_seconds = app.config.get('SLOW_QUERY_MS', 250) / 1000
+        threshold = app.config.get('PROFILE_SLOW_REQUEST_MS')
+        if threshold:
+            self.profile_threshold = threshold / 1000
+            directory = app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+            self.profiler = SamplingProfiler(app.config.get('PROFILE_INTERVAL_MS', 5) / 1000, directory)
+            self.profiler.start()
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        with app.app_context():
+            for engine in db.engines.values():
+                self.instrument_engine(engine)
+
+    def instrument_engine(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+        # Pool listeners registered through the engine carry over to the
+        # pool that dispose() recreates. There is no event for a checkout
+        # being requested, so pool pressure shows up as long holds (callers
+        # queue behind them) and as slow connects.
+        event.listen(engine, 'do_connect', self._connect_started)
+        event.listen(engine, 'connect', self._connected)
+        event.listen(engine, 'checkout', self._checked_out)
+        event.listen(engine, 'checkin', self._checked_in)
+
+    def _connect_started(self, dialect, connection_record, cargs, cparams):
+        connection_record.info['pool_connect_started_at'] = time.perf_counter()
+
+    def _connected(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop('pool_connect_started_at', None)
+        if started is not None:
+            self.pool_connect.observe(time.perf_counter() - started)
+
+    def _checked_out(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['pool_checked_out_at'] = time.perf_counter()
+
+    def _checked_in(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop('pool_checked_out_at', None)
+        if started is not None:
+            self.pool_checkout.observe(time.perf_counter() - started)
+
+    def _before_request(self):
+        # Per-request tallies live in a thread-local rather than ``g``; the
+        # cursor hooks run for every statement and the proxy lookup adds up.
+        current = self._current
+        current.started = time.perf_counter()
+        current.queries = 0
+        current.query_time = 0.0
+        if self.profiler is not None:
+            self.profiler.watch()
+
+    def _after_request(self, response):
+        current = self._current
+        started, current.started = current.started, None
+        if started is None:
+            return response
+        duration = time.perf_counter() - started
+        endpoint = request.endpoint or 'unmatched'
+        self.requests.inc(endpoint, request.method, response.status_code)
+        self.latency.observe(duration, endpoint, request.method)
+        self.request_queries.observe(current.queries, endpoint)
+        self.request_query_time.observe(current.query_time, endpoint)
+        if self.profiler is not None:
+            samples = self.profiler.unwatch()
+            if samples and duration >= self.profile_threshold:
+                path = self.profiler.dump(samples, endpoint, duration)
+                logger.warning('Slow request %s %s took %.3fs; stacks in %s',
+                               request.method, request.path, duration, path)
+        return response
+
+    # The start time rides on the execution context, which is discarded with
+    # the statement whether it succeeds or fails.
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._observe_statement(context, statement, parameters)
+
+    def _handle_error(self, exception_context):
+        # Failed statements (timeouts, deadlocks) are timed too; they are
+        # often the slowest ones.
+        self._observe_statement(exception_context.execution_context, exception_context.statement,
+                                exception_context.parameters)
+
+    def _observe_statement(self, context, statement, parameters):
+        started = getattr(context, '_metrics_started', None)
+        if started is None:
+            return
+        # A fetch can still fail after the statement ran; count it once.
+        context._metrics_started = None
+        duration = time.perf_counter() - started
+        self.queries.observe(duration)
+        current = self._current
+        if current.started is not None:
+            current.queries += 1
+            current.query_time += duration
+        if duration >= self.slow_query_seconds:
+            self.slow_queries.inc()
+            logger.warning('Slow query (%.3fs): %s %r', duration, statement, parameters)
+
+    def render(self, extra=None):
+        lines = []
+        for metric in (self.requests, self.latency, self.request_queries, self.request_query_time,
+                       self.queries, self.slow_queries, self.pool_connect, self.pool_checkout):
+            lines.extend(metric.render())
+        for name, (help, value) in (extra or {}).items():
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -1,205 +1,218 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from models import db, NormalUser, Administrator, Record, Media
-from dotenv import load_dotenv
+import argparse
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, inspect, select, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from geo import record_geohash
+from models import db
+import search  # noqa: F401  registers the full-text index DDL on create_all
 
 load_dotenv()
 
-SQLITE_DB_URL = "sqlite:///instance/jiseti.db"  
-POSTGRES_DB_URL = os.getenv("POSTGRES_DB_URL")
-
-if not POSTGRES_DB_URL:
-    raise ValueError("POSTGRES_DB_URL is not set in environment variables")
-
-print(f"SQLite URL: {SQLITE_DB_URL}")
-print(f"PostgreSQL URL: {POSTGRES_DB_URL}")
-
-
-sqlite_engine = create_engine(SQLITE_DB_URL)
-postgres_engine = create_engine(POSTGRES_DB_URL)
-
-
-with sqlite_engine.connect() as conn:
-    result = conn.execute(text("SELECT name FROM sqlite_master WHERE type='table';"))
-    tables = result.fetchall()
-    print("Available tables in SQLite:", [table[0] for table in tables])
-
-
-SQLiteSession = sessionmaker(bind=sqlite_engine)
-PostgresSession = sessionmaker(bind=postgres_engine)
-
-sqlite_session = SQLiteSession()
-postgres_session = PostgresSession()
-
-# --- Step 1: Create PostgreSQL Tables ---
-try:
-    print("Creating PostgreSQL tables...")
-    db.metadata.create_all(postgres_engine)
-    print("✅ PostgreSQL tables created successfully")
-except Exception as e:
-    print(f"❌ Error creating PostgreSQL tables: {e}")
-    exit(1)
-
-
-print("\nChecking existing data in PostgreSQL...")
-existing_users = postgres_session.query(NormalUser).count()
-existing_admins = postgres_session.query(Administrator).count()
-existing_records = postgres_session.query(Record).count()
-existing_media = postgres_session.query(Media).count()
-
-print(f"Existing data in PostgreSQL:")
-print(f"  - Normal Users: {existing_users}")
-print(f"  - Administrators: {existing_admins}")
-print(f"  - Records: {existing_records}")
-print(f"  - Media: {existing_media}")
-
-if existing_users > 0 or existing_admins > 0 or existing_records > 0 or existing_media > 0:
-    print("\n⚠️  PostgreSQL database already contains data!")
-    choice = input("Do you want to:\n1. Clear existing data and migrate (c)\n2. Skip duplicate records (s)\n3. Cancel migration (x)\nEnter choice (c/s/x): ").lower()
-    
-    if choice == 'c':
-        print("Clearing existing data...")
-        postgres_session.query(Media).delete()
-        postgres_session.query(Record).delete()
-        postgres_session.query(Administrator).delete()
-        postgres_session.query(NormalUser).delete()
-        postgres_session.commit()
-        print("✅ Existing data cleared")
-    elif choice == 's':
-        print("Will skip duplicate records during migration...")
-    else:
-        print("Migration cancelled.")
-        sqlite_session.close()
-        postgres_session.close()
-        exit(0)
-
-
-try:
-    total_migrated = 0
-    
-    
-    print("\nMigrating Normal Users...")
-    users = sqlite_session.query(NormalUser).all()
-    print(f"Found {len(users)} normal users")
-    
-    for user in users:
-        
-        existing_user = postgres_session.query(NormalUser).filter_by(id=user.id).first()
-        if existing_user and choice == 's':
-            print(f"  - Skipping user: {user.name} ({user.email}) - already exists")
-            continue
-            
-        new_user = NormalUser(
-            id=user.id,
-            name=user.name,
-            email=user.email,
-            password=user.password
-        )
-        postgres_session.add(new_user)
-        print(f"  - Migrating user: {user.name} ({user.email})")
-    
-    total_migrated += len(users)
-    
-    
-    print("\nMigrating Administrators...")
-    admins = sqlite_session.query(Administrator).all()
-    print(f"Found {len(admins)} administrators")
-    
-    for admin in admins:
-    
-        existing_admin = postgres_session.query(Administrator).filter_by(id=admin.id).first()
-        if existing_admin and choice == 's':
-            print(f"  - Skipping admin: {admin.name} ({admin.email}) - already exists")
-            continue
-            
-        new_admin = Administrator(
-            id=admin.id,
-            name=admin.name,
-            email=admin.email,
-            password=admin.password,
-            admin_number=admin.admin_number
-        )
-        postgres_session.add(new_admin)
-        print(f"  - Migrating admin: {admin.name} ({admin.email})")
-    
-    total_migrated += len(admins)
-    
-    
-    print("\nMigrating Records...")
-    records = sqlite_session.query(Record).all()
-    print(f"Found {len(records)} records")
-    
-    for record in records:
-        
-        existing_record = postgres_session.query(Record).filter_by(id=record.id).first()
-        if existing_record and choice == 's':
-            print(f"  - Skipping record: {record.title} - already exists")
-            continue
-            
-        new_record = Record(
-            id=record.id,
-            type=record.type,
-            title=record.title,
-            description=record.description,
-            status=record.status,
-            latitude=record.latitude,
-            longitude=record.longitude,
-            created_at=record.created_at,
-            normal_user_id=record.normal_user_id
-        )
-        postgres_session.add(new_record)
-        print(f"  - Migrating record: {record.title}")
-    
-    total_migrated += len(records)
-    
-    
-    print("\nMigrating Media...")
-    media_items = sqlite_session.query(Media).all()
-    print(f"Found {len(media_items)} media items")
-    
-    for media in media_items:
-    
-        existing_media = postgres_session.query(Media).filter_by(id=media.id).first()
-        if existing_media and choice == 's':
-            print(f"  - Skipping media: {media.id} - already exists")
-            continue
-            
-        new_media = Media(
-            id=media.id,
-            image_url=media.image_url,
-            video_url=media.video_url,
-            record_id=media.record_id
-        )
-        postgres_session.add(new_media)
-        print(f"  - Migrating media: {media.id}")
-    
-    total_migrated += len(media_items)
-    
-    print(f"\nTotal items to migrate: {total_migrated}")
-
-except Exception as e:
-    print(f"❌ Error during data migration: {e}")
-    postgres_session.rollback()
-    sqlite_session.close()
-    postgres_session.close()
-    exit(1)
-
-
-try:
-    postgres_session.commit()
-    print("\n✅ Data migration completed successfully!")
-    print(f"📊 Summary:")
-    print(f"  - {len([u for u in users if not (postgres_session.query(NormalUser).filter_by(id=u.id).first() and choice == 's')])} normal users migrated")
-    print(f"  - {len([a for a in admins if not (postgres_session.query(Administrator).filter_by(id=a.id).first() and choice == 's')])} administrators migrated") 
-    print(f"  - {len([r for r in records if not (postgres_session.query(Record).filter_by(id=r.id).first() and choice == 's')])} records migrated")
-    print(f"  - {len([m for m in media_items if not (postgres_session.query(Media).filter_by(id=m.id).first() and choice == 's')])} media items migrated")
-    
-except Exception as e:
-    print(f"❌ Error during commit: {e}")
-    postgres_session.rollback()
-    
-finally:
-    sqlite_session.close()
-    postgres_session.close()
-    print("\n🔒 Database connections closed")
\ No newline at end of file
+DEFAULT_SQLITE_URL = "sqlite:///instance/jiseti.db"
+DEFAULT_CHECKPOINT = ".migration_checkpoint.json"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk copy the Jiseti SQLite database into PostgreSQL.")
+    parser.add_argument("--source", default=DEFAULT_SQLITE_URL, help="source database URL")
+    parser.add_argument("--target", default=os.getenv("POSTGRES_DB_URL"),
+                        help="target database URL (default: $POSTGRES_DB_URL)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows per INSERT/commit")
+    parser.add_argument("--workers", type=int, default=4, help="tables copied in parallel")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="progress file used to resume")
+    parser.add_argument("--truncate", action="store_true",
+                        help="empty the target tables first instead of skipping rows that already exist")
+    parser.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+    args = parser.parse_args()
+    if not args.target:
+        parser.error("--target or POSTGRES_DB_URL is required")
+    return args
+
+
+class Checkpoint:
+    """Last copied primary key per table, flushed after every committed chunk.
+
+    Keys are stored as JSON lists, one value per primary-key column, with
+    dates and timestamps in ISO format.
+    """
+
+    def __init__(self, path, restart=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {}
+        if not restart and os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def last_key(self, table):
+        """The last copied key of ``table`` as a tuple, or None to start from the top."""
+        saved = self.state.get(table.name, {})
+        if "last_key" in saved:
+            values = saved["last_key"]
+        elif "last_id" in saved:
+            # Checkpoints written before composite keys were supported.
+            values = [saved["last_id"]]
+        else:
+            return None
+        return tuple(_from_json(column, value) for column, value in zip(table.primary_key.columns, values))
+
+    def copied(self, table):
+        return self.state.get(table.name, {}).get("copied", 0)
+
+    def save(self, table, last_key, copied):
+        with self.lock:
+            self.state[table.name] = {"last_key": [_to_json(value) for value in last_key], "copied": copied}
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.state, f)
+            os.replace(tmp, self.path)
+
+    def clear(self):
+        with self.lock:
+            self.state = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def _to_json(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _from_json(column, value):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if value is not None and python_type in (date, datetime):
+        return python_type.fromisoformat(value)
+    return value
+
+
+def dependency_levels(tables):
+    """Group tables so each level only references tables in earlier levels."""
+    levels, placed = [], set()
+    remaining = list(tables)
+    while remaining:
+        level = [t for t in remaining
+                 if all(fk.column.table.name in placed or fk.column.table is t for fk in t.foreign_keys)]
+        if not level:
+            raise RuntimeError("Circular foreign keys between: " + ", ".join(t.name for t in remaining))
+        levels.append(level)
+        placed.update(t.name for t in level)
+        remaining = [t for t in remaining if t not in level]
+    return levels
+
+
+def insert_ignoring_conflicts(table, dialect_name):
+    pk = [c.name for c in table.primary_key.columns]
+    if dialect_name == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing(index_elements=pk)
+    if dialect_name == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing(index_elements=pk)
+    raise RuntimeError(f"Unsupported target dialect: {dialect_name}")
+
+
+def copy_table(table, source, target, checkpoint, chunk_size):
+    """Stream ``table`` from source to target in primary-key order.
+
+    Pages seek on the whole primary key, so tables with composite keys are
+    copied completely too.
+
+    Each chunk is one multi-row INSERT ... ON CONFLICT DO NOTHING committed
+    on its own, followed by a checkpoint, so a failure only loses the chunk
+    in flight and a rerun picks up where it stopped.
+    """
+    source_columns = {c["name"] for c in inspect(source).get_columns(table.name)}
+    columns = [c for c in table.columns if c.name in source_columns]
+    pk = list(table.primary_key.columns)
+    key = tuple_(*pk)
+    fill_geohash = table.name == "records" and "geohash" not in source_columns
+    stmt = insert_ignoring_conflicts(table, target.dialect.name)
+
+    last_key, copied = checkpoint.last_key(table), checkpoint.copied(table)
+    started = time.perf_counter()
+    chunk_rows = 0
+    with source.connect() as src:
+        while True:
+            query = select(*columns).order_by(*pk).limit(chunk_size)
+            if last_key is not None:
+                query = query.where(key > last_key)
+            rows = src.execute(query).mappings().all()
+            if not rows:
+                break
+            rows = [dict(row) for row in rows]
+            if fill_geohash:
+                for row in rows:
+                    row["geohash"] = record_geohash(row.get("latitude"), row.get("longitude"))
+            with target.begin() as dst:
+                dst.execute(stmt, rows)
+            last_key = tuple(rows[-1][column.name] for column in pk)
+            copied += len(rows)
+            chunk_rows += len(rows)
+            checkpoint.save(table, last_key, copied)
+    elapsed = time.perf_counter() - started
+    rate = chunk_rows / elapsed if elapsed else 0
+    print(f"  - {table.name}: {chunk_rows} rows in {elapsed:.1f}s ({rate:,.0f} rows/s), {copied} total")
+    return chunk_rows
+
+
+def reset_sequences(target, tables):
+    if target.dialect.name != "postgresql":
+        return
+    with target.begin() as conn:
+        for table in tables:
+            # Only tables whose key comes from a sequence; composite and
+            # copied keys have none.
+            pk = table.autoincrement_column
+            if pk is None:
+                continue
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', '{pk.name}'), "
+                f"COALESCE(MAX({pk.name}), 1), MAX({pk.name}) IS NOT NULL) FROM {table.name}"
+            ))
+
+
+def main():
+    args = parse_args()
+    source = create_engine(args.source)
+    target = create_engine(args.target, pool_size=args.workers, max_overflow=args.workers)
+    checkpoint = Checkpoint(args.checkpoint, restart=args.restart)
+
+    source_tables = set(inspect(source).get_table_names())
+    tables = [t for t in db.metadata.sorted_tables if t.name in source_tables]
+    print(f"Source: {source.url!r}\nTarget: {target.url!r}")
+    print("Tables to copy:", [t.name for t in tables])
+
+    db.metadata.create_all(target)
+    if args.truncate:
+        print("Emptying target tables...")
+        with target.begin() as conn:
+            if target.dialect.name == "postgresql":
+                conn.execute(text("TRUNCATE " + ", ".join(t.name for t in tables) + " RESTART IDENTITY CASCADE"))
+            else:
+                for table in reversed(tables):
+                    conn.execute(table.delete())
+        checkpoint.clear()
+
+    started = time.perf_counter()
+    total = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for level in dependency_levels(tables):
+            print(f"\nCopying {', '.join(t.name for t in level)}...")
+            futures = [pool.submit(copy_table, t, source, target, checkpoint, args.chunk_size) for t in level]
+            total += sum(f.result() for f in futures)
+
+    reset_sequences(target, tables)
+    elapsed = time.perf_counter() - started
+    print(f"\n✅ Copied {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+    checkpoint.clear()
+
+
+if __name__ == "__main__":
+    main()
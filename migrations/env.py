@@ -45,6 +45,20 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# Full-text search objects that search.py creates with raw DDL and keeps out
+# of the models: the FTS5 table with its shadow tables on SQLite, and the
+# generated tsvector column and its GIN index on PostgreSQL. Autogenerate
+# would otherwise emit DROPs for them.
+SEARCH_INDEX_PREFIX = 'records_fts'
+SEARCH_INDEX_OBJECTS = {('column', 'search_vector'), ('index', 'ix_records_search_vector')}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and name.startswith(SEARCH_INDEX_PREFIX):
+        return False
+    return (type_, name) not in SEARCH_INDEX_OBJECTS
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -65,7 +79,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +108,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
@@ -0,0 +1,37 @@
+"""add record stats
+
+Revision ID: 0b94e2d7c615
+Revises: f3a8d6c27e10
+Create Date: 2026-10-18 19:37:52.104288
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b94e2d7c615'
+down_revision = 'f3a8d6c27e10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('record_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('type', sa.String(length=20), nullable=False),
+    sa.Column('region', sa.String(length=12), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status', 'type', 'region')
+    )
+    op.execute("""
+        INSERT INTO record_stats (day, status, type, region, count)
+        SELECT date(created_at), coalesce(status, ''), type, coalesce(substr(geohash, 1, 3), ''), count(id)
+        FROM records
+        GROUP BY date(created_at), coalesce(status, ''), type, coalesce(substr(geohash, 1, 3), '')
+    """)
+
+
+def downgrade():
+    op.drop_table('record_stats')
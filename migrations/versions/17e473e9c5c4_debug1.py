@@ -1,81 +0,0 @@
-<<<<<<<< HEAD:migrations/versions/9b3a08bec938_.py
-"""empty message
-
-Revision ID: 9b3a08bec938
-Revises: 
-Create Date: 2025-07-17 14:15:16.007750
-========
-"""debug1
-
-Revision ID: 17e473e9c5c4
-Revises: 
-Create Date: 2025-07-17 14:07:38.646771
->>>>>>>> 2b230936415657c9160cd508f58d4b131ff484cc:migrations/versions/17e473e9c5c4_debug1.py
-
-"""
-from alembic import op
-import sqlalchemy as sa
-
-
-# revision identifiers, used by Alembic.
-<<<<<<<< HEAD:migrations/versions/9b3a08bec938_.py
-revision = '9b3a08bec938'
-========
-revision = '17e473e9c5c4'
->>>>>>>> 2b230936415657c9160cd508f58d4b131ff484cc:migrations/versions/17e473e9c5c4_debug1.py
-down_revision = None
-branch_labels = None
-depends_on = None
-
-
-def upgrade():
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.create_table('administrators',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('name', sa.String(length=80), nullable=False),
-    sa.Column('email', sa.String(length=120), nullable=False),
-    sa.Column('password', sa.String(length=100), nullable=False),
-    sa.Column('admin_number', sa.String(length=50), nullable=False),
-    sa.PrimaryKeyConstraint('id'),
-    sa.UniqueConstraint('admin_number'),
-    sa.UniqueConstraint('email')
-    )
-    op.create_table('normal_users',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('name', sa.String(length=80), nullable=False),
-    sa.Column('email', sa.String(length=120), nullable=False),
-    sa.Column('password', sa.String(length=100), nullable=False),
-    sa.PrimaryKeyConstraint('id'),
-    sa.UniqueConstraint('email')
-    )
-    op.create_table('records',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('type', sa.String(length=20), nullable=False),
-    sa.Column('title', sa.String(length=100), nullable=False),
-    sa.Column('description', sa.Text(), nullable=False),
-    sa.Column('status', sa.String(length=50), nullable=True),
-    sa.Column('latitude', sa.Float(), nullable=True),
-    sa.Column('longitude', sa.Float(), nullable=True),
-    sa.Column('created_at', sa.DateTime(), nullable=True),
-    sa.Column('normal_user_id', sa.Integer(), nullable=False),
-    sa.ForeignKeyConstraint(['normal_user_id'], ['normal_users.id'], ),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_table('media',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('image_url', sa.String(), nullable=True),
-    sa.Column('video_url', sa.String(), nullable=True),
-    sa.Column('record_id', sa.Integer(), nullable=False),
-    sa.ForeignKeyConstraint(['record_id'], ['records.id'], ),
-    sa.PrimaryKeyConstraint('id')
-    )
-    # ### end Alembic commands ###
-
-
-def downgrade():
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_table('media')
-    op.drop_table('records')
-    op.drop_table('normal_users')
-    op.drop_table('administrators')
-    # ### end Alembic commands ###
@@ -0,0 +1,29 @@
+"""add record listing indexes
+
+Revision ID: 4f2a9c1d8e57
+Revises: 9b3a08bec938
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4f2a9c1d8e57'
+down_revision = '9b3a08bec938'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_records_created_at', 'records', ['created_at'])
+    op.create_index('ix_records_status_created_at', 'records', ['status', 'created_at'])
+    op.create_index('ix_records_type_created_at', 'records', ['type', 'created_at'])
+    op.create_index('ix_records_normal_user_id_created_at', 'records', ['normal_user_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_records_normal_user_id_created_at', table_name='records')
+    op.drop_index('ix_records_type_created_at', table_name='records')
+    op.drop_index('ix_records_status_created_at', table_name='records')
+    op.drop_index('ix_records_created_at', table_name='records')
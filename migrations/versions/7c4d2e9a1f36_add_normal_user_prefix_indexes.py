@@ -0,0 +1,27 @@
+"""add normal user prefix indexes
+
+Revision ID: 7c4d2e9a1f36
+Revises: 0b94e2d7c615
+Create Date: 2026-10-18 20:14:05.662917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4d2e9a1f36'
+down_revision = '0b94e2d7c615'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    collate = ' COLLATE "C"' if op.get_bind().dialect.name == 'postgresql' else ''
+    op.create_index('ix_normal_users_lower_name', 'normal_users', [sa.text(f'lower(name){collate}')])
+    op.create_index('ix_normal_users_lower_email', 'normal_users', [sa.text(f'lower(email){collate}')])
+
+
+def downgrade():
+    op.drop_index('ix_normal_users_lower_email', table_name='normal_users')
+    op.drop_index('ix_normal_users_lower_name', table_name='normal_users')
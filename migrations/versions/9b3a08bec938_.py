@@ -1,16 +1,8 @@
-<<<<<<<< HEAD:migrations/versions/9b3a08bec938_.py
 """empty message
 
 Revision ID: 9b3a08bec938
 Revises: 
 Create Date: 2025-07-17 14:15:16.007750
-========
-"""debug1
-
-Revision ID: 17e473e9c5c4
-Revises: 
-Create Date: 2025-07-17 14:07:38.646771
->>>>>>>> 2b230936415657c9160cd508f58d4b131ff484cc:migrations/versions/17e473e9c5c4_debug1.py
 
 """
 from alembic import op
@@ -18,11 +10,7 @@ import sqlalchemy as sa
 
 
 # revision identifiers, used by Alembic.
-<<<<<<<< HEAD:migrations/versions/9b3a08bec938_.py
 revision = '9b3a08bec938'
-========
-revision = '17e473e9c5c4'
->>>>>>>> 2b230936415657c9160cd508f58d4b131ff484cc:migrations/versions/17e473e9c5c4_debug1.py
 down_revision = None
 branch_labels = None
 depends_on = None
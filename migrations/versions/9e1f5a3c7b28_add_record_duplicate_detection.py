@@ -0,0 +1,49 @@
+"""add record duplicate detection
+
+Revision ID: 9e1f5a3c7b28
+Revises: 7c4d2e9a1f36
+Create Date: 2026-10-18 21:02:44.183570
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e1f5a3c7b28'
+down_revision = '7c4d2e9a1f36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite cannot add a constraint in place, and batch mode would
+        # rebuild records without its full-text triggers.
+        op.add_column('records', sa.Column('duplicate_of_id', sa.Integer(), nullable=True))
+    else:
+        op.add_column('records', sa.Column('duplicate_of_id', sa.Integer(),
+                                           sa.ForeignKey('records.id', ondelete='SET NULL'), nullable=True))
+    op.create_index('ix_records_duplicate_of_id', 'records', ['duplicate_of_id'])
+    op.create_table('record_fingerprints',
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.Column('signature', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['record_id'], ['records.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('record_id')
+    )
+    op.create_table('record_lsh_buckets',
+    sa.Column('bucket', sa.BigInteger(), nullable=False),
+    sa.Column('band', sa.SmallInteger(), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['record_id'], ['records.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('bucket', 'band', 'record_id')
+    )
+    op.create_index('ix_record_lsh_buckets_record_id', 'record_lsh_buckets', ['record_id'])
+
+
+def downgrade():
+    op.drop_index('ix_record_lsh_buckets_record_id', table_name='record_lsh_buckets')
+    op.drop_table('record_lsh_buckets')
+    op.drop_table('record_fingerprints')
+    op.drop_index('ix_records_duplicate_of_id', table_name='records')
+    op.drop_column('records', 'duplicate_of_id')
@@ -0,0 +1,50 @@
+"""add record geohash
+
+Revision ID: a83d5e0f6c21
+Revises: 4f2a9c1d8e57
+Create Date: 2026-10-18 11:04:57.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from geo import record_geohash
+
+
+# revision identifiers, used by Alembic.
+revision = 'a83d5e0f6c21'
+down_revision = '4f2a9c1d8e57'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 5000
+
+
+def upgrade():
+    op.add_column('records', sa.Column('geohash', sa.String(length=12), nullable=True))
+    op.create_index('ix_records_geohash', 'records', ['geohash'])
+
+    records = sa.table('records', sa.column('id', sa.Integer), sa.column('latitude', sa.Float),
+                       sa.column('longitude', sa.Float), sa.column('geohash', sa.String))
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(records.c.id, records.c.latitude, records.c.longitude)
+            .where(records.c.id > last_id, records.c.latitude.isnot(None),
+                   records.c.longitude.isnot(None))
+            .order_by(records.c.id).limit(BACKFILL_BATCH)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            records.update().where(records.c.id == sa.bindparam('record_id'))
+            .values(geohash=sa.bindparam('hash')),
+            [{'record_id': r.id, 'hash': record_geohash(r.latitude, r.longitude)} for r in rows]
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    op.drop_index('ix_records_geohash', table_name='records')
+    op.drop_column('records', 'geohash')
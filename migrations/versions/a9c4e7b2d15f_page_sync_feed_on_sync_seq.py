@@ -0,0 +1,49 @@
+"""page the sync feed on a commit-ordered sync_seq
+
+Revision ID: a9c4e7b2d15f
+Revises: e4b9f2a6c813
+Create Date: 2026-10-18 23:58:12.604831
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c4e7b2d15f'
+down_revision = 'e4b9f2a6c813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN rather than batch mode, which would rebuild records
+    # and drop the SQLite full-text triggers.
+    op.add_column('records', sa.Column('sync_seq', sa.BigInteger(), nullable=True))
+    op.add_column('records_archive', sa.Column('sync_seq', sa.BigInteger(), nullable=True))
+    op.add_column('record_tombstones', sa.Column('sync_seq', sa.BigInteger(), nullable=True))
+    # Existing rows share one number below anything written afterwards;
+    # clients holding an old updated_at token get a 400 and resync.
+    if op.get_bind().dialect.name == 'postgresql':
+        seq = 'pg_current_xact_id()::text::bigint'
+    else:
+        seq = '1'
+    for table in ('records', 'records_archive', 'record_tombstones'):
+        op.execute(f'UPDATE {table} SET sync_seq = {seq}')
+    op.drop_index('ix_records_updated_at_id', table_name='records')
+    op.drop_index('ix_record_tombstones_deleted_at_record_id', table_name='record_tombstones')
+    op.create_index('ix_records_sync_seq_id', 'records', ['sync_seq', 'id'])
+    op.create_index('ix_records_archive_sync_seq', 'records_archive', ['sync_seq'])
+    op.create_index('ix_record_tombstones_sync_seq_record_id', 'record_tombstones', ['sync_seq', 'record_id'])
+
+
+def downgrade():
+    op.drop_index('ix_record_tombstones_sync_seq_record_id', table_name='record_tombstones')
+    op.drop_index('ix_records_archive_sync_seq', table_name='records_archive')
+    op.drop_index('ix_records_sync_seq_id', table_name='records')
+    op.create_index('ix_record_tombstones_deleted_at_record_id', 'record_tombstones',
+                    ['deleted_at', 'record_id'])
+    op.create_index('ix_records_updated_at_id', 'records', ['updated_at', 'id'])
+    op.drop_column('record_tombstones', 'sync_seq')
+    op.drop_column('records_archive', 'sync_seq')
+    op.drop_column('records', 'sync_seq')
@@ -0,0 +1,35 @@
+"""add record status history
+
+Revision ID: b2d8e6f4a913
+Revises: 9e1f5a3c7b28
+Create Date: 2026-10-18 21:48:19.507731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d8e6f4a913'
+down_revision = '9e1f5a3c7b28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('record_status_history',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.Column('old_status', sa.String(length=50), nullable=True),
+    sa.Column('new_status', sa.String(length=50), nullable=False),
+    sa.Column('changed_by', sa.Integer(), nullable=True),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_record_status_history_record_id_changed_at', 'record_status_history',
+                    ['record_id', 'changed_at'])
+
+
+def downgrade():
+    op.drop_index('ix_record_status_history_record_id_changed_at', table_name='record_status_history')
+    op.drop_table('record_status_history')
@@ -0,0 +1,34 @@
+"""add record full text search
+
+Revision ID: c5e19b7a2f04
+Revises: a83d5e0f6c21
+Create Date: 2026-10-18 13:26:10.447385
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import drop_search_index, install_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e19b7a2f04'
+down_revision = 'a83d5e0f6c21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    install_search_index(bind)
+    if bind.dialect.name == 'sqlite':
+        bind.execute(sa.text("INSERT INTO records_fts(records_fts) VALUES ('rebuild')"))
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_records_search_vector', table_name='records')
+        op.drop_column('records', 'search_vector')
+    else:
+        drop_search_index(bind)
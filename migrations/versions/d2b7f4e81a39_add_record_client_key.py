@@ -0,0 +1,27 @@
+"""add record client key
+
+Revision ID: d2b7f4e81a39
+Revises: c5e19b7a2f04
+Create Date: 2026-10-18 15:02:33.581026
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2b7f4e81a39'
+down_revision = 'c5e19b7a2f04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('records', sa.Column('client_key', sa.String(length=64), nullable=True))
+    op.create_index('uq_records_normal_user_id_client_key', 'records',
+                    ['normal_user_id', 'client_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_records_normal_user_id_client_key', table_name='records')
+    op.drop_column('records', 'client_key')
@@ -0,0 +1,60 @@
+"""add record archive tables
+
+Revision ID: d7a3c1e5b846
+Revises: b2d8e6f4a913
+Create Date: 2026-10-18 22:41:07.318254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3c1e5b846'
+down_revision = 'b2d8e6f4a913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('records_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('type', sa.String(length=20), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('geohash', sa.String(length=12), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('client_key', sa.String(length=64), nullable=True),
+    sa.Column('duplicate_of_id', sa.Integer(), nullable=True),
+    sa.Column('normal_user_id', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_records_archive_created_at', 'records_archive', ['created_at'])
+    op.create_index('ix_records_archive_normal_user_id_created_at', 'records_archive',
+                    ['normal_user_id', 'created_at'])
+    op.create_table('media_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('image_url', sa.String(), nullable=True),
+    sa.Column('video_url', sa.String(), nullable=True),
+    sa.Column('thumbnail_url', sa.String(), nullable=True),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=True),
+    sa.Column('width', sa.Integer(), nullable=True),
+    sa.Column('height', sa.Integer(), nullable=True),
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['record_id'], ['records_archive.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_media_archive_record_id'), 'media_archive', ['record_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_media_archive_record_id'), table_name='media_archive')
+    op.drop_table('media_archive')
+    op.drop_index('ix_records_archive_normal_user_id_created_at', table_name='records_archive')
+    op.drop_index('ix_records_archive_created_at', table_name='records_archive')
+    op.drop_table('records_archive')
@@ -0,0 +1,43 @@
+"""add record updated_at and tombstones for the sync feed
+
+Revision ID: e4b9f2a6c813
+Revises: d7a3c1e5b846
+Create Date: 2026-10-18 23:27:45.902116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b9f2a6c813'
+down_revision = 'd7a3c1e5b846'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN rather than batch mode, which would rebuild records
+    # and drop the SQLite full-text triggers.
+    op.add_column('records', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column('records_archive', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE records SET updated_at = created_at')
+    op.execute('UPDATE records_archive SET updated_at = created_at')
+    op.create_index('ix_records_updated_at_id', 'records', ['updated_at', 'id'])
+    op.create_table('record_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.Column('normal_user_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_record_tombstones_deleted_at_record_id', 'record_tombstones',
+                    ['deleted_at', 'record_id'])
+
+
+def downgrade():
+    op.drop_index('ix_record_tombstones_deleted_at_record_id', table_name='record_tombstones')
+    op.drop_table('record_tombstones')
+    op.drop_index('ix_records_updated_at_id', table_name='records')
+    op.drop_column('records_archive', 'updated_at')
+    op.drop_column('records', 'updated_at')
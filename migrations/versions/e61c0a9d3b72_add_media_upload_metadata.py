@@ -0,0 +1,36 @@
+"""add media upload metadata
+
+Revision ID: e61c0a9d3b72
+Revises: d2b7f4e81a39
+Create Date: 2026-10-18 16:48:19.226741
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e61c0a9d3b72'
+down_revision = 'd2b7f4e81a39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('media', sa.Column('thumbnail_url', sa.String(), nullable=True))
+    op.add_column('media', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('media', sa.Column('size_bytes', sa.BigInteger(), nullable=True))
+    op.add_column('media', sa.Column('width', sa.Integer(), nullable=True))
+    op.add_column('media', sa.Column('height', sa.Integer(), nullable=True))
+    op.create_index('ix_media_content_hash', 'media', ['content_hash'])
+    op.create_index('ix_media_record_id', 'media', ['record_id'])
+
+
+def downgrade():
+    op.drop_index('ix_media_record_id', table_name='media')
+    op.drop_index('ix_media_content_hash', table_name='media')
+    op.drop_column('media', 'height')
+    op.drop_column('media', 'width')
+    op.drop_column('media', 'size_bytes')
+    op.drop_column('media', 'content_hash')
+    op.drop_column('media', 'thumbnail_url')
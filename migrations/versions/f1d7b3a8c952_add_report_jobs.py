@@ -0,0 +1,33 @@
+"""add report_jobs
+
+Revision ID: f1d7b3a8c952
+Revises: a9c4e7b2d15f
+Create Date: 2026-10-19 00:31:40.117302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1d7b3a8c952'
+down_revision = 'a9c4e7b2d15f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('report_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('cache_key', sa.String(length=120), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_report_jobs_created_at'), 'report_jobs', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_report_jobs_created_at'), table_name='report_jobs')
+    op.drop_table('report_jobs')
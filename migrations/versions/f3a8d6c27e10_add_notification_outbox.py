@@ -0,0 +1,42 @@
+"""add notification outbox
+
+Revision ID: f3a8d6c27e10
+Revises: e61c0a9d3b72
+Create Date: 2026-10-18 18:20:04.671930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8d6c27e10'
+down_revision = 'e61c0a9d3b72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('normal_users', sa.Column('phone', sa.String(length=20), nullable=True))
+    op.create_table('outbox_messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('channel', sa.String(length=20), nullable=False),
+    sa.Column('recipient', sa.String(length=120), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('record_id', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_messages_status_next_attempt_at', 'outbox_messages',
+                    ['status', 'next_attempt_at'])
+
+
+def downgrade():
+    op.drop_index('ix_outbox_messages_status_next_attempt_at', table_name='outbox_messages')
+    op.drop_table('outbox_messages')
+    op.drop_column('normal_users', 'phone')
@@ -1,7 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from geo import record_geohash
+from database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class NormalUser(db.Model):
     __tablename__ = 'normal_users'
@@ -10,9 +14,19 @@ class NormalUser(db.Model):
     name = db.Column(db.String(80), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(100), nullable=False)
+    phone = db.Column(db.String(20))
 
     records = db.relationship('Record', backref='normal_user', lazy=True, cascade="all, delete-orphan")
 
+    # Prefix search compares lower(column) against a range. Postgres needs
+    # the index in the "C" collation for that range to be a true prefix match.
+    __table_args__ = (
+        db.Index('ix_normal_users_lower_name', db.func.lower(name)).ddl_if(dialect='sqlite'),
+        db.Index('ix_normal_users_lower_name', db.func.lower(name).collate('C')).ddl_if(dialect='postgresql'),
+        db.Index('ix_normal_users_lower_email', db.func.lower(email)).ddl_if(dialect='sqlite'),
+        db.Index('ix_normal_users_lower_email', db.func.lower(email).collate('C')).ddl_if(dialect='postgresql'),
+    )
+
     def __repr__(self):
         return f"<NormalUser {self.name}>"
 
@@ -28,8 +42,42 @@ class Administrator(db.Model):
     def __repr__(self):
         return f"<Administrator {self.name}, AdminNumber={self.admin_number}>"
 
+class next_sync_seq(FunctionElement):
+    """Change number for the sync feed, evaluated inside the writing statement.
+
+    Postgres uses the writing transaction's id: anything below the oldest
+    transaction still running (see ``sync.safe_horizon``) is committed and
+    can never be joined by another row. SQLite serialises writers, so one
+    past the highest number ever handed out, read under the write lock, is
+    already greater than anything a reader has seen.
+    """
+    type = db.BigInteger()
+    inherit_cache = True
+
+@compiles(next_sync_seq, 'postgresql')
+def _next_sync_seq_postgresql(element, compiler, **kw):
+    return 'pg_current_xact_id()::text::bigint'
+
+@compiles(next_sync_seq)
+def _next_sync_seq(element, compiler, **kw):
+    # Archived rows and tombstones keep their numbers, so the maximum
+    # never goes backwards when a record leaves ``records``.
+    return ('(SELECT COALESCE(MAX(seq), 0) + 1 FROM ('
+            'SELECT MAX(sync_seq) AS seq FROM records '
+            'UNION ALL SELECT MAX(sync_seq) FROM records_archive '
+            'UNION ALL SELECT MAX(sync_seq) FROM record_tombstones))')
+
 class Record(db.Model):
     __tablename__ = 'records'
+    __table_args__ = (
+        db.Index('ix_records_created_at', 'created_at'),
+        db.Index('ix_records_status_created_at', 'status', 'created_at'),
+        db.Index('ix_records_type_created_at', 'type', 'created_at'),
+        db.Index('ix_records_normal_user_id_created_at', 'normal_user_id', 'created_at'),
+        db.Index('ix_records_geohash', 'geohash'),
+        db.Index('ix_records_sync_seq_id', 'sync_seq', 'id'),
+        db.Index('uq_records_normal_user_id_client_key', 'normal_user_id', 'client_key', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(20), nullable=False)
@@ -38,7 +86,14 @@ class Record(db.Model):
     status = db.Column(db.String(50), default="draft")
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Both bumped by every UPDATE, including set-based ones, and by media
+    # changes; the sync feed in sync.py pages on (sync_seq, id).
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_seq = db.Column(db.BigInteger, default=next_sync_seq(), onupdate=next_sync_seq())
+    client_key = db.Column(db.String(64))
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey('records.id', ondelete='SET NULL'), index=True)
 
     normal_user_id = db.Column(db.Integer, db.ForeignKey('normal_users.id'), nullable=False)
 
@@ -55,21 +110,187 @@ class Record(db.Model):
             "longitude": self.longitude,
             "normal_user_id": self.normal_user_id,
             "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "duplicate_of_id": self.duplicate_of_id,
             "media": [m.to_dict() for m in self.media]
         }
 
+@db.event.listens_for(Record, 'before_insert')
+@db.event.listens_for(Record, 'before_update')
+def _set_record_geohash(mapper, connection, record):
+    record.geohash = record_geohash(record.latitude, record.longitude)
+
 class Media(db.Model):
     __tablename__ = 'media'
 
     id = db.Column(db.Integer, primary_key=True)
     image_url = db.Column(db.String, nullable=True)
     video_url = db.Column(db.String, nullable=True)
-    record_id = db.Column(db.Integer, db.ForeignKey("records.id"), nullable=False)
+    thumbnail_url = db.Column(db.String, nullable=True)
+    content_hash = db.Column(db.String(64), index=True)
+    size_bytes = db.Column(db.BigInteger)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    record_id = db.Column(db.Integer, db.ForeignKey("records.id"), nullable=False, index=True)
 
     def to_dict(self):
         return {
             "id": self.id,
             "image_url": self.image_url,
             "video_url": self.video_url,
+            "thumbnail_url": self.thumbnail_url,
+            "size_bytes": self.size_bytes,
+            "width": self.width,
+            "height": self.height,
             "record_id": self.record_id
         }
+
+@db.event.listens_for(Media, 'after_insert')
+@db.event.listens_for(Media, 'after_update')
+def _touch_media_record(mapper, connection, media):
+    # Media is part of the record's representation, so it counts as a change.
+    connection.execute(
+        Record.__table__.update().where(Record.__table__.c.id == media.record_id)
+        .values(updated_at=datetime.utcnow())
+    )
+
+class OutboxMessage(db.Model):
+    __tablename__ = 'outbox_messages'
+    __table_args__ = (
+        db.Index('ix_outbox_messages_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    channel = db.Column(db.String(20), nullable=False, default="sms")
+    recipient = db.Column(db.String(120), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    record_id = db.Column(db.Integer)
+
+    def __repr__(self):
+        return f"<OutboxMessage {self.id} {self.channel}:{self.recipient} {self.status}>"
+
+class RecordStat(db.Model):
+    __tablename__ = 'record_stats'
+
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    type = db.Column(db.String(20), primary_key=True)
+    region = db.Column(db.String(12), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RecordStat {self.day} {self.status}/{self.type}/{self.region}={self.count}>"
+
+class RecordFingerprint(db.Model):
+    __tablename__ = 'record_fingerprints'
+
+    record_id = db.Column(db.Integer, db.ForeignKey('records.id', ondelete='CASCADE'), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)
+
+class RecordLSHBucket(db.Model):
+    __tablename__ = 'record_lsh_buckets'
+
+    bucket = db.Column(db.BigInteger, primary_key=True)
+    band = db.Column(db.SmallInteger, primary_key=True)
+    record_id = db.Column(db.Integer, db.ForeignKey('records.id', ondelete='CASCADE'), primary_key=True,
+                          index=True)
+
+class RecordStatusHistory(db.Model):
+    """Append-only log of status changes; rows outlive the record they describe."""
+    __tablename__ = 'record_status_history'
+    __table_args__ = (
+        db.Index('ix_record_status_history_record_id_changed_at', 'record_id', 'changed_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    record_id = db.Column(db.Integer, nullable=False)
+    old_status = db.Column(db.String(50))
+    new_status = db.Column(db.String(50), nullable=False)
+    changed_by = db.Column(db.Integer)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "record_id": self.record_id,
+            "old_status": self.old_status,
+            "new_status": self.new_status,
+            "changed_by": self.changed_by,
+            "changed_at": self.changed_at.isoformat()
+        }
+
+class ArchivedRecord(db.Model):
+    """Cold copy of a settled record, moved out of ``records`` by archive.py.
+
+    Columns mirror ``records`` so the two tables can be read as one UNION ALL.
+    """
+    __tablename__ = 'records_archive'
+    __table_args__ = (
+        db.Index('ix_records_archive_created_at', 'created_at'),
+        db.Index('ix_records_archive_normal_user_id_created_at', 'normal_user_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    type = db.Column(db.String(20), nullable=False)
+    title = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(50))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    sync_seq = db.Column(db.BigInteger, index=True)
+    client_key = db.Column(db.String(64))
+    duplicate_of_id = db.Column(db.Integer)
+    normal_user_id = db.Column(db.Integer, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    media = db.relationship("ArchivedMedia", backref="record", cascade="all, delete-orphan")
+
+    to_dict = Record.to_dict
+
+class ArchivedMedia(db.Model):
+    __tablename__ = 'media_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    image_url = db.Column(db.String, nullable=True)
+    video_url = db.Column(db.String, nullable=True)
+    thumbnail_url = db.Column(db.String, nullable=True)
+    content_hash = db.Column(db.String(64))
+    size_bytes = db.Column(db.BigInteger)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    record_id = db.Column(db.Integer, db.ForeignKey("records_archive.id"), nullable=False, index=True)
+
+    to_dict = Media.to_dict
+
+class RecordTombstone(db.Model):
+    """Marks a deleted record for the sync feed. Archiving is not a deletion
+    and leaves no tombstone."""
+    __tablename__ = 'record_tombstones'
+    __table_args__ = (
+        db.Index('ix_record_tombstones_sync_seq_record_id', 'sync_seq', 'record_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    record_id = db.Column(db.Integer, nullable=False)
+    normal_user_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sync_seq = db.Column(db.BigInteger, default=next_sync_seq())
+
+class ReportJob(db.Model):
+    """State of a case-report render (see reports.py), shared by every worker."""
+    __tablename__ = 'report_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    cache_key = db.Column(db.String(120), nullable=False)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
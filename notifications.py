@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import func, insert, or_
+from auth import account_cache
+from models import db, NormalUser, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+STATUS_SMS = "Jiseti: your report #{id} \"{title}\" is now {status}."
+STATS_WINDOW_SECONDS = 3600
+
+
+def enqueue_status_change(record, new_status):
+    """Add an SMS for the reporter to the current session.
+
+    Nothing is sent here: the message is committed in the same transaction
+    as the status change and delivered later by OutboxDispatcher, so the
+    admin request never waits on the SMS provider and a rolled-back change
+    never notifies anyone.
+    """
+    reporter = account_cache.get('user', record.normal_user_id)
+    phone = reporter.phone if reporter is not None else None
+    if not phone:
+        return None
+    message = OutboxMessage(
+        channel='sms',
+        recipient=phone,
+        body=STATUS_SMS.format(id=record.id, title=record.title[:40], status=new_status),
+        record_id=record.id
+    )
+    db.session.add(message)
+    return message
+
+
+def enqueue_status_changes(records, new_status):
+    """Bulk form of ``enqueue_status_change``: one phone lookup and one
+    multi-row INSERT for a batch of records. Returns the number queued."""
+    phones = dict(db.session.query(NormalUser.id, NormalUser.phone).filter(
+        NormalUser.id.in_({record.normal_user_id for record in records}),
+        NormalUser.phone.isnot(None)
+    ))
+    rows = [{
+        'channel': 'sms',
+        'recipient': phones[record.normal_user_id],
+        'body': STATUS_SMS.format(id=record.id, title=record.title[:40], status=new_status),
+        'record_id': record.id,
+    } for record in records if phones.get(record.normal_user_id)]
+    if rows:
+        db.session.execute(insert(OutboxMessage), rows)
+    return len(rows)
+
+
+class ProviderError(Exception):
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class FakeSMSProvider:
+    """Offline provider for development and tests; ``fail`` lists recipients
+    that should raise."""
+
+    def __init__(self, latency=0.0, fail=()):
+        self.latency = latency
+        self.fail = set(fail)
+        self.sent = []
+
+    async def send(self, recipient, body):
+        await asyncio.sleep(self.latency)
+        if recipient in self.fail:
+            raise ProviderError(f'fake failure for {recipient}')
+        self.sent.append((recipient, body))
+
+
+class TwilioSMSProvider:
+    def __init__(self, account_sid, auth_token, from_number):
+        from twilio.http.async_http_client import AsyncTwilioHttpClient
+        from twilio.rest import Client
+        self.client = Client(account_sid, auth_token, http_client=AsyncTwilioHttpClient())
+        self.from_number = from_number
+
+    async def send(self, recipient, body):
+        from twilio.base.exceptions import TwilioRestException
+        try:
+            await self.client.messages.create_async(to=recipient, from_=self.from_number, body=body)
+        except TwilioRestException as e:
+            # 4xx means the request itself is bad (invalid number, opted out...)
+            raise ProviderError(str(e), permanent=400 <= e.status < 500 and e.status != 429)
+
+
+class OutboxDispatcher:
+    """Drains outbox_messages in batches.
+
+    A batch is claimed by moving it to 'sending' with a lease in
+    next_attempt_at (SKIP LOCKED on Postgres), so several dispatchers can run
+    side by side and a crashed one's batch is picked up once the lease ends.
+    Sends run concurrently up to ``concurrency``; failures back off
+    exponentially and are dead-lettered after ``max_attempts``.
+    """
+
+    def __init__(self, app, provider, batch_size=100, concurrency=10, max_attempts=5,
+                 backoff=30, lease=300):
+        self.app = app
+        self.provider = provider
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self.stats = {'sent': 0, 'retried': 0, 'dead': 0, 'batches': 0,
+                      'latency_sum': 0.0, 'latency_max': 0.0}
+
+    def _claim(self):
+        with self.app.app_context():
+            now = datetime.utcnow()
+            query = db.session.query(OutboxMessage).filter(
+                OutboxMessage.status.in_(('pending', 'sending')),
+                OutboxMessage.next_attempt_at <= now
+            ).order_by(OutboxMessage.id).limit(self.batch_size)
+            if db.engine.dialect.name == 'postgresql':
+                query = query.with_for_update(skip_locked=True)
+            messages = query.all()
+            for message in messages:
+                message.status = 'sending'
+                message.next_attempt_at = now + timedelta(seconds=self.lease)
+            claimed = [(m.id, m.recipient, m.body, m.created_at, m.attempts) for m in messages]
+            db.session.commit()
+            return claimed
+
+    def _finish(self, outcomes):
+        with self.app.app_context():
+            now = datetime.utcnow()
+            for message_id, attempts, error in outcomes:
+                message = db.session.get(OutboxMessage, message_id)
+                message.attempts = attempts
+                if error is None:
+                    message.status = 'sent'
+                    message.sent_at = now
+                    message.last_error = None
+                elif getattr(error, 'permanent', False) or attempts >= self.max_attempts:
+                    message.status = 'dead'
+                    message.last_error = str(error)
+                else:
+                    message.status = 'pending'
+                    message.last_error = str(error)
+                    message.next_attempt_at = now + timedelta(seconds=self.backoff * 2 ** (attempts - 1))
+            db.session.commit()
+
+    async def run_once(self):
+        claimed = await asyncio.to_thread(self._claim)
+        if not claimed:
+            return 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def deliver(message_id, recipient, body, created_at, attempts):
+            async with semaphore:
+                try:
+                    await self.provider.send(recipient, body)
+                    error = None
+                except Exception as e:
+                    error = e
+            return message_id, attempts + 1, error, created_at
+
+        results = await asyncio.gather(*(deliver(*message) for message in claimed))
+        await asyncio.to_thread(self._finish, [(m, a, e) for m, a, e, _ in results])
+
+        now = datetime.utcnow()
+        for _, attempts, error, created_at in results:
+            if error is None:
+                latency = (now - created_at).total_seconds()
+                self.stats['sent'] += 1
+                self.stats['latency_sum'] += latency
+                self.stats['latency_max'] = max(self.stats['latency_max'], latency)
+            elif getattr(error, 'permanent', False) or attempts >= self.max_attempts:
+                self.stats['dead'] += 1
+            else:
+                self.stats['retried'] += 1
+        self.stats['batches'] += 1
+        return len(claimed)
+
+    async def run_forever(self, poll_interval=1.0):
+        while True:
+            started = time.perf_counter()
+            count = await self.run_once()
+            if count:
+                logger.info('Dispatched %d messages in %.3fs (%s)', count,
+                            time.perf_counter() - started, self.stats)
+            if count < self.batch_size:
+                await asyncio.sleep(poll_interval)
+
+
+def _seconds_between(start, end):
+    if db.engine.dialect.name == 'postgresql':
+        return func.extract('epoch', end - start)
+    return (func.julianday(end) - func.julianday(start)) * 86400
+
+
+def outbox_stats(window_seconds=STATS_WINDOW_SECONDS):
+    """Queue depth plus delivery figures read back from outbox_messages.
+
+    Dispatchers run in their own processes, so everything here comes from
+    the rows they update: delivery latency (queued to sent) and retries
+    over messages sent in the last ``window_seconds``, and dead letters.
+    """
+    counts = dict(db.session.query(OutboxMessage.status, func.count(OutboxMessage.id))
+                  .group_by(OutboxMessage.status))
+    oldest = db.session.query(func.min(OutboxMessage.created_at)).filter(
+        or_(OutboxMessage.status == 'pending', OutboxMessage.status == 'sending')
+    ).scalar()
+    latency = _seconds_between(OutboxMessage.created_at, OutboxMessage.sent_at)
+    sent, latency_avg, latency_max, retried = db.session.query(
+        func.count(OutboxMessage.id), func.avg(latency), func.max(latency),
+        func.count(OutboxMessage.id).filter(OutboxMessage.attempts > 1)
+    ).filter(
+        OutboxMessage.status == 'sent',
+        OutboxMessage.sent_at >= datetime.utcnow() - timedelta(seconds=window_seconds)
+    ).one()
+    return {
+        'depth': counts.get('pending', 0) + counts.get('sending', 0),
+        'by_status': counts,
+        'oldest_pending_age_seconds': (datetime.utcnow() - oldest).total_seconds() if oldest else 0,
+        'dead': counts.get('dead', 0),
+        'delivery': {
+            'window_seconds': window_seconds,
+            'sent': sent,
+            'retried': retried,
+            'latency_avg_seconds': round(float(latency_avg), 3) if latency_avg is not None else None,
+            'latency_max_seconds': round(float(latency_max), 3) if latency_max is not None else None,
+        },
+    }
+
+
+def provider_from_config(config):
+    if config.get('TWILIO_ACCOUNT_SID'):
+        return TwilioSMSProvider(config['TWILIO_ACCOUNT_SID'], config['TWILIO_AUTH_TOKEN'],
+                                 config['TWILIO_FROM_NUMBER'])
+    return FakeSMSProvider()
+
+
+def init_app(app):
+    @app.cli.command('dispatch-notifications')
+    @click.option('--once', is_flag=True, help='Drain one batch and exit.')
+    @click.option('--fake', is_flag=True, help='Use the offline fake provider.')
+    @click.option('--batch-size', default=100)
+    @click.option('--concurrency', default=10)
+    def dispatch_notifications(once, fake, batch_size, concurrency):
+        """Deliver queued outbox messages."""
+        provider = FakeSMSProvider() if fake else provider_from_config(app.config)
+        dispatcher = OutboxDispatcher(app, provider, batch_size=batch_size, concurrency=concurrency)
+        if once:
+            click.echo(f'Dispatched {asyncio.run(dispatcher.run_once())} messages {dispatcher.stats}')
+        else:
+            asyncio.run(dispatcher.run_forever())
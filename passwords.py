@@ -0,0 +1,66 @@
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask_bcrypt import Bcrypt
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so a pool sized to the CPU count
+    keeps every core busy without letting a login burst queue unbounded work;
+    callers beyond ``max_pending`` get PasswordHasherBusy instead of waiting.
+    """
+
+    def __init__(self, app=None):
+        self.bcrypt = Bcrypt()
+        self.executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.bcrypt.init_app(app)
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        workers = app.config.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self.slots = threading.BoundedSemaphore(app.config.get('PASSWORD_HASH_MAX_PENDING', workers * 8))
+        self.wait_timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 5)
+        # Verified against when the account does not exist, so unknown emails
+        # take as long to reject as wrong passwords.
+        self.dummy_hash = self.bcrypt.generate_password_hash(os.urandom(16).hex()).decode()
+        app.extensions['password_hasher'] = self
+
+    def _run(self, fn, *args):
+        if not self.slots.acquire(timeout=self.wait_timeout):
+            raise PasswordHasherBusy()
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self.slots.release()
+
+    def hash(self, password):
+        return self._run(self.bcrypt.generate_password_hash, password).decode()
+
+    def verify(self, stored, password):
+        if stored is None:
+            self._run(self.bcrypt.check_password_hash, self.dummy_hash, password)
+            return False
+        if not stored.startswith(BCRYPT_PREFIXES):
+            # Accounts created before hashing was introduced; upgraded on login.
+            return hmac.compare_digest(stored.encode(), password.encode())
+        return self._run(self.bcrypt.check_password_hash, stored, password)
+
+    def needs_rehash(self, stored):
+        if not stored.startswith(BCRYPT_PREFIXES):
+            return True
+        return int(stored.split('$')[2]) != self.rounds
+
+
+password_hasher = PasswordHasher()
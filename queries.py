@@ -0,0 +1,269 @@
+import base64
+import math
+from datetime import datetime
+from sqlalchemy import and_, func, or_, select, text, tuple_, union_all
+from sqlalchemy.orm import aliased, load_only, selectinload, raiseload
+import geo
+from models import db, ArchivedRecord, NormalUser, Record
+
+MAX_PER_PAGE = 100
+COUNT_MODES = ('exact', 'estimate', 'none')
+SORT_ORDERS = ('-created_at', 'created_at')
+MAX_RADIUS_KM = 100.0
+MAX_BBOX_KM = 2 * MAX_RADIUS_KM
+CLUSTER_PRECISION_STEP = 1
+
+
+def parse_record_filters(args):
+    """Build the listing filters from query-string ``args``.
+
+    Every supported filter is served by one of the (column, created_at)
+    indexes on ``records``. Raises ValueError on malformed input.
+    """
+    filters = {}
+    for key in ('status', 'type'):
+        if args.get(key):
+            filters[key] = args[key]
+    if args.get('normal_user_id'):
+        filters['normal_user_id'] = int(args['normal_user_id'])
+    for key in ('created_from', 'created_to'):
+        if args.get(key):
+            filters[key] = datetime.fromisoformat(args[key])
+    sort = args.get('sort', '-created_at')
+    if sort not in SORT_ORDERS:
+        raise ValueError('Invalid sort order')
+    filters['sort'] = sort
+    return filters
+
+
+def apply_record_filters(query, filters, model=Record):
+    if 'ids' in filters:
+        query = query.filter(model.id.in_(filters['ids']))
+    for key in ('status', 'type', 'normal_user_id'):
+        if key in filters:
+            query = query.filter(getattr(model, key) == filters[key])
+    if 'created_from' in filters:
+        query = query.filter(model.created_at >= filters['created_from'])
+    if 'created_to' in filters:
+        query = query.filter(model.created_at < filters['created_to'])
+    if filters.get('sort', '-created_at') == 'created_at':
+        return query.order_by(model.created_at.asc(), model.id.asc())
+    return query.order_by(model.created_at.desc(), model.id.desc())
+
+
+def wants_archived(args):
+    return args.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+
+def record_source(include_archived=False, filters=None, cursor=None, limit=None):
+    """``Record``, or with ``include_archived`` an alias of it over
+    ``records UNION ALL records_archive`` that filters and keysets the same way.
+
+    ``filters``, ``cursor`` and ``limit`` are also applied inside each branch,
+    so both tables seek on their own indexes and hand the union at most
+    ``limit`` rows each; the caller still filters, orders and limits the
+    alias as usual. Raises ValueError on a malformed cursor.
+    """
+    if not include_archived:
+        return Record
+    filters = filters or {}
+    branches = []
+    for model in (Record, ArchivedRecord):
+        branch = select(*(model.__table__.c[column.name] for column in Record.__table__.c))
+        branch = after_cursor(apply_record_filters(branch, filters, model), cursor,
+                              filters.get('sort', '-created_at'), model)
+        if limit is not None:
+            branch = branch.limit(limit)
+        branches.append(select(*branch.subquery().c))
+    return aliased(Record, union_all(*branches).subquery('records_all'))
+
+
+def record_listing_query(filters=None):
+    # Media is fetched with one extra SELECT ... WHERE record_id IN (...) per
+    # page; any other relationship touched while serializing raises instead
+    # of silently issuing one query per row.
+    query = Record.query.options(
+        selectinload(Record.media),
+        raiseload('*')
+    )
+    return apply_record_filters(query, filters or {})
+
+
+def projected_listing_query(fields, filters=None, model=Record):
+    """Listing query returning plain rows of ``fields`` (requested fields
+    first, then the keyset columns) with no ORM objects hydrated."""
+    columns = [getattr(model, name) for name in dict.fromkeys(fields + ('created_at', 'id'))]
+    return apply_record_filters(db.session.query(*columns), filters or {}, model)
+
+
+def find_record(id):
+    """The record with ``id``, hot or archived, or None."""
+    return db.session.get(Record, id) or db.session.get(ArchivedRecord, id)
+
+
+def records_by_id(ids):
+    if not ids:
+        return {}
+    return {rec.id: rec for rec in record_listing_query().filter(Record.id.in_(ids))}
+
+
+def clamp_per_page(per_page):
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+
+def encode_cursor(record):
+    raw = f"{record.created_at.isoformat()}|{record.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, record_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+def after_cursor(query, cursor, sort='-created_at', model=Record):
+    """Restrict ``query`` to the rows after ``cursor`` in ``sort`` order."""
+    if not cursor:
+        return query
+    created_at, record_id = decode_cursor(cursor)
+    key = tuple_(model.created_at, model.id)
+    if sort == 'created_at':
+        return query.filter(key > (created_at, record_id))
+    return query.filter(key < (created_at, record_id))
+
+
+def keyset_page(query, cursor, per_page, sort='-created_at', model=Record):
+    """Return (records, next_cursor) for the page after ``cursor``.
+
+    Seeks on (created_at, id) instead of using OFFSET, so every page costs the
+    same no matter how deep the client has scrolled.
+    """
+    query = after_cursor(query, cursor, sort, model)
+    rows = query.limit(per_page + 1).all()
+    next_cursor = encode_cursor(rows[per_page - 1]) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+
+def estimated_record_count():
+    if db.engine.dialect.name == 'postgresql':
+        estimate = db.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'records'::regclass")
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate
+    return db.session.query(func.max(Record.id)).scalar() or 0
+
+
+def parse_bbox(args):
+    min_lat, min_lng, max_lat, max_lng = (
+        float(args[key]) for key in ('min_lat', 'min_lng', 'max_lat', 'max_lng')
+    )
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValueError('Invalid bounding box')
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def _geohash_ranges(cells):
+    # Prefix matches written as ranges so both SQLite and Postgres can use
+    # the plain B-tree on records.geohash.
+    return or_(*[and_(Record.geohash >= cell, Record.geohash < cell + '~') for cell in cells])
+
+
+def _within_bbox(min_lat, min_lng, max_lat, max_lng):
+    cells = geo.cover(min_lat, min_lng, max_lat, max_lng)
+    return and_(
+        _geohash_ranges(cells),
+        Record.latitude.between(min_lat, max_lat),
+        Record.longitude.between(min_lng, max_lng)
+    ), len(cells[0])
+
+
+def bbox_span_km(min_lat, min_lng, max_lat, max_lng):
+    """Larger of the box's height and width in km, measured across its middle."""
+    middle = math.cos(math.radians((min_lat + max_lat) / 2))
+    return max(max_lat - min_lat, (max_lng - min_lng) * middle) * geo.KM_PER_DEGREE
+
+
+def _planar_distance(latitude, longitude):
+    """Squared equirectangular distance in degrees of arc, as SQL.
+
+    Plain arithmetic, so both SQLite and Postgres can order and limit by it;
+    within ``MAX_RADIUS_KM`` it ranks records the same way as the haversine
+    distance to well under a metre.
+    """
+    dlat = Record.latitude - latitude
+    dlng = (Record.longitude - longitude) * math.cos(math.radians(latitude))
+    return dlat * dlat + dlng * dlng
+
+
+def nearest_records(bbox, latitude, longitude, page, per_page, radius_km=None):
+    """Return (page of (distance_km, record), total) for records in ``bbox``.
+
+    Ranking, paging and counting happen in SQL, so only the requested
+    page of rows (and their media) ever reaches Python, however many
+    records the box holds.
+    """
+    condition, _ = _within_bbox(*bbox)
+    distance = _planar_distance(latitude, longitude)
+    if radius_km is not None:
+        condition = and_(condition, distance <= math.degrees(radius_km / geo.EARTH_RADIUS_KM) ** 2)
+    total = db.session.query(func.count(Record.id)).filter(condition).scalar()
+    window = db.session.query(Record.id, Record.latitude, Record.longitude).filter(condition) \
+        .order_by(distance, Record.id).offset((page - 1) * per_page).limit(per_page).all()
+    by_id = records_by_id([record_id for record_id, _, _ in window])
+    return [(geo.haversine_km(latitude, longitude, lat, lng), by_id[record_id])
+            for record_id, lat, lng in window], total
+
+
+def record_clusters(bbox, precision=None):
+    condition, cover_precision = _within_bbox(*bbox)
+    if precision is None:
+        precision = cover_precision + CLUSTER_PRECISION_STEP
+    precision = max(1, min(precision, geo.GEOHASH_PRECISION))
+    cell = func.substr(Record.geohash, 1, precision)
+    rows = db.session.query(
+        cell, func.count(Record.id), func.avg(Record.latitude), func.avg(Record.longitude)
+    ).filter(condition).group_by(cell).all()
+    return [
+        {'cell': c, 'count': count, 'latitude': lat, 'longitude': lng}
+        for c, count, lat, lng in rows
+    ]
+
+
+def _prefix_match(column, prefix):
+    """Case-insensitive prefix match served by the index on lower(column)."""
+    lowered = func.lower(column)
+    if db.engine.dialect.name == 'postgresql':
+        lowered = lowered.collate('C')
+    prefix = prefix.lower()
+    return and_(lowered >= prefix, lowered < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+def user_directory_page(q, after_id, per_page):
+    """Return (users, next_cursor) in id order, optionally matching a name or
+    email prefix. Seeks on the primary key, like ``keyset_page``."""
+    query = NormalUser.query.options(
+        load_only(NormalUser.id, NormalUser.name, NormalUser.email, NormalUser.phone)
+    ).order_by(NormalUser.id)
+    if q:
+        query = query.filter(or_(_prefix_match(NormalUser.name, q), _prefix_match(NormalUser.email, q)))
+    if after_id:
+        query = query.filter(NormalUser.id > after_id)
+    rows = query.limit(per_page + 1).all()
+    next_cursor = str(rows[per_page - 1].id) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+
+def record_counts_by_user(user_ids):
+    """Record totals for a page of users in one grouped query."""
+    if not user_ids:
+        return {}
+    return dict(
+        db.session.query(Record.normal_user_id, func.count(Record.id))
+        .filter(Record.normal_user_id.in_(user_ids))
+        .group_by(Record.normal_user_id)
+    )
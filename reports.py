@@ -0,0 +1,218 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+from reportlab.lib import colors
+from reportlab.platypus import Frame, Image, Paragraph, Spacer, Table, TableStyle
+from sqlalchemy import delete, func, select, update
+from export import record_chunks
+from media import media_pipeline
+from models import db, Record, ReportJob
+from queries import apply_record_filters
+from statuses import record_histories
+
+logger = logging.getLogger(__name__)
+
+MARGIN = 18 * mm
+THUMBNAIL_WIDTH = 60 * mm
+JOB_TTL = 24 * 3600
+
+
+class ReportJobs:
+    """Renders case-report PDFs on a small worker pool.
+
+    Job state lives in the ``report_jobs`` table, so any worker can answer
+    for a job another one accepted. Output files are named after the data
+    they were rendered from, read from the database (the record's
+    ``sync_seq``, or the highest ``sync_seq`` and row count of the filter
+    set), so an unchanged record or filter set is served from disk without
+    rendering again, whichever worker wrote last. Files are removed with the
+    last job that refers to them.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.root = app.config.get('REPORT_STORAGE_ROOT') or os.path.join(app.instance_path, 'reports')
+        os.makedirs(self.root, exist_ok=True)
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config.get('REPORT_WORKERS', 2), thread_name_prefix='reports'
+        )
+        app.extensions['report_jobs'] = self
+
+    def _cache_key(self, filters, record):
+        if record is not None:
+            return f'record-{record.id}-s{record.sync_seq}'
+        # A write to any matching record raises the highest sync_seq; a
+        # delete, or a record leaving the set, lowers the count.
+        version, count = db.session.execute(
+            apply_record_filters(select(func.max(Record.sync_seq), func.count(Record.id)), filters)
+            .order_by(None)
+        ).one()
+        payload = json.dumps(filters, sort_keys=True, default=str)
+        return f'records-{hashlib.sha1(payload.encode()).hexdigest()}-s{version or 0}-n{count}'
+
+    def _file(self, cache_key):
+        return os.path.join(self.root, f'{cache_key}.pdf')
+
+    def path(self, job):
+        return self._file(job.cache_key)
+
+    def submit(self, filters=None, record=None):
+        if record is not None:
+            filters = {'ids': [record.id]}
+        self._expire()
+        job = ReportJob(id=uuid.uuid4().hex, status='queued', cache_key=self._cache_key(filters, record))
+        if os.path.exists(self.path(job)):
+            job.status = 'done'
+        db.session.add(job)
+        db.session.commit()
+        if job.status == 'queued':
+            # A single record may already have been moved to the archive.
+            self.executor.submit(self._run, job.id, filters, record is not None)
+        return job
+
+    def get(self, job_id):
+        return db.session.get(ReportJob, job_id)
+
+    def _expire(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_TTL)
+        expired = set(db.session.scalars(select(ReportJob.cache_key).where(ReportJob.created_at < cutoff)))
+        if not expired:
+            return
+        db.session.execute(delete(ReportJob).where(ReportJob.created_at < cutoff))
+        # Newer jobs for the same data still serve the file.
+        kept = set(db.session.scalars(select(ReportJob.cache_key).where(ReportJob.cache_key.in_(expired))))
+        for cache_key in expired - kept:
+            try:
+                os.remove(self._file(cache_key))
+            except FileNotFoundError:
+                pass
+
+    def _set_status(self, job_id, status, error=None):
+        db.session.execute(update(ReportJob).where(ReportJob.id == job_id).values(status=status, error=error))
+        db.session.commit()
+
+    def _run(self, job_id, filters, include_archived=False):
+        with self.app.app_context():
+            self._set_status(job_id, 'running')
+            job = self.get(job_id)
+            tmp = f'{self.path(job)}.{job_id}.tmp'
+            try:
+                render_case_report(tmp, record_chunks(filters, include_archived))
+                os.replace(tmp, self.path(job))
+            except Exception as e:
+                logger.exception('Report %s failed', job_id)
+                db.session.rollback()
+                self._set_status(job_id, 'failed', str(e))
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            else:
+                self._set_status(job_id, 'done')
+
+
+HISTORY_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+
+def _history_table(history):
+    rows = [['Changed at', 'From', 'To', 'By admin']]
+    rows += [[entry.changed_at.strftime('%Y-%m-%d %H:%M'), entry.old_status or '', entry.new_status,
+              entry.changed_by if entry.changed_by is not None else ''] for entry in history]
+    return Table(rows, hAlign='LEFT', repeatRows=1, style=HISTORY_STYLE)
+
+
+def _record_flowables(row, styles, history=()):
+    story = [
+        Paragraph(f"#{row['id']} &mdash; {escape(row['title'])}", styles['Heading2']),
+        Paragraph(
+            f"<b>Type:</b> {escape(row['type'])} &nbsp; <b>Status:</b> {escape(row['status'] or '')} "
+            f"&nbsp; <b>Reported:</b> {row['created_at'] or ''} &nbsp; "
+            f"<b>Reporter:</b> {row['normal_user_id']}", styles['Normal']),
+    ]
+    if row['latitude'] is not None and row['longitude'] is not None:
+        story.append(Paragraph(f"<b>Location:</b> {row['latitude']:.5f}, {row['longitude']:.5f}",
+                               styles['Normal']))
+    story.append(Spacer(1, 3 * mm))
+    story.append(Paragraph(escape(row['description']).replace('\n', '<br/>'), styles['BodyText']))
+    for media in row['media']:
+        key = media_pipeline.storage.key_for_url(media.get('thumbnail_url'))
+        if key and media_pipeline.storage.exists(key):
+            with media_pipeline.storage.open(key) as f:
+                image = Image(io.BytesIO(f.read()))
+            image._restrictSize(THUMBNAIL_WIDTH, THUMBNAIL_WIDTH)
+            story.append(image)
+        else:
+            url = media.get('image_url') or media.get('video_url')
+            if url:
+                story.append(Paragraph(f"Evidence: {escape(url)}", styles['Normal']))
+    if history:
+        story.append(Spacer(1, 3 * mm))
+        story.append(Paragraph('<b>Status history</b>', styles['Normal']))
+        story.append(_history_table(history))
+    story.append(Spacer(1, 8 * mm))
+    return story
+
+
+def render_case_report(path, chunks):
+    """Lay records out page by page as their chunks arrive.
+
+    Flowables are placed into a frame directly on the canvas instead of
+    collecting one story for the whole document, so only the current chunk
+    of records (and their status history, fetched once per chunk) is held
+    in memory.
+    """
+    styles = getSampleStyleSheet()
+    width, height = A4
+    pdf = canvas.Canvas(path, pagesize=A4)
+    pdf.setTitle('Jiseti case report')
+
+    def new_frame():
+        pdf.setFont('Helvetica', 8)
+        pdf.drawRightString(width - MARGIN, MARGIN / 2, f'Jiseti case report - page {pdf.getPageNumber()}')
+        return Frame(MARGIN, MARGIN, width - 2 * MARGIN, height - 2 * MARGIN, showBoundary=0)
+
+    frame = new_frame()
+    empty = True
+    for rows in chunks:
+        histories = record_histories([row['id'] for row in rows])
+        for row in rows:
+            story = _record_flowables(row, styles, histories[row['id']])
+            while story:
+                flowable = story.pop(0)
+                if frame.add(flowable, pdf, trySplit=1):
+                    continue
+                parts = frame.split(flowable, pdf)
+                if parts:
+                    frame.add(parts[0], pdf, trySplit=1)
+                    story[:0] = parts[1:]
+                elif not frame._atTop:
+                    story.insert(0, flowable)
+                pdf.showPage()
+                frame = new_frame()
+            empty = False
+    if empty:
+        Frame(MARGIN, MARGIN, width - 2 * MARGIN, height - 2 * MARGIN).addFromList(
+            [Paragraph('No records matched this report.', styles['Normal'])], pdf)
+    pdf.save()
+
+
+report_jobs = ReportJobs()
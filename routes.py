@@ -1,6 +1,44 @@
-from flask import request, jsonify, make_response
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from models import db, NormalUser, Administrator, Record, Media
+from datetime import date
+from flask import (
+    request, jsonify, make_response, Response, abort, send_file, send_from_directory, stream_with_context
+)
+from flask_jwt_extended import create_access_token, jwt_required
+from models import db, NormalUser, Administrator, Record, Media, ArchivedRecord
+from auth import account_cache, current_principal, role_required
+from cache import response_cache
+from passwords import password_hasher, PasswordHasherBusy
+from export import csv_stream, ndjson_stream
+from geo import radius_bbox, record_geohash
+from ingest import ingest_records, read_items, validate_items
+from live import bulk_status_event_data, live_events, record_event_data
+from notifications import outbox_stats
+from media import PUBLIC_PREFIXES, VIDEO_EXTENSIONS, media_pipeline
+from reports import report_jobs
+from search import SearchUnavailable, search_records
+import stats
+import dedupe
+import sync
+from metrics import metrics
+from database import replica_router
+from queries import (
+    COUNT_MODES, MAX_BBOX_KM, MAX_RADIUS_KM, bbox_span_km, clamp_per_page, estimated_record_count,
+    find_record, keyset_page, nearest_records, parse_bbox, parse_record_filters, projected_listing_query,
+    record_clusters, record_counts_by_user, record_listing_query, record_source, records_by_id,
+    user_directory_page, wants_archived
+)
+from serializers import json_body, parse_projection, serialize_records
+from statuses import (
+    BULK_MAX_IDS, RECORD_STATUSES, bulk_change_status, change_status, record_history
+)
+
+
+def record_or_404(id):
+    """The record with ``id``, falling back to the archive once it has been moved there."""
+    record = find_record(id)
+    if record is None:
+        abort(404)
+    return record
+
 
 def register_routes(app):
 
@@ -8,6 +46,10 @@ def register_routes(app):
     def home():
         return make_response("<h1>Welcome to Jiseti</h1>", 200)
 
+    @app.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(error):
+        return make_response({'error': 'Server busy, try again'}, 503, {'Retry-After': '1'})
+
     @app.route('/signup', methods=['POST'])
     def signup():
         data = request.get_json()
@@ -19,7 +61,7 @@ def register_routes(app):
             new_admin = Administrator(
                 name=data['name'],
                 email=data['email'],
-                password=data['password'],
+                password=password_hasher.hash(data['password']),
                 admin_number=data['admin_number']
             )
             db.session.add(new_admin)
@@ -31,7 +73,8 @@ def register_routes(app):
             new_user = NormalUser(
                 name=data['name'],
                 email=data['email'],
-                password=data['password']
+                password=password_hasher.hash(data['password']),
+                phone=data.get('phone')
             )
             db.session.add(new_user)
             db.session.commit()
@@ -42,36 +85,77 @@ def register_routes(app):
         data = request.get_json()
         role = data.get('role', 'user')
 
-        if role == 'admin':
-            user = Administrator.query.filter_by(email=data['email'], password=data['password']).first()
-        else:
-            user = NormalUser.query.filter_by(email=data['email'], password=data['password']).first()
-
-        if not user:
+        model = Administrator if role == 'admin' else NormalUser
+        user = model.query.filter_by(email=data['email']).first()
+        if not password_hasher.verify(user.password if user else None, data['password']):
             return make_response({'error': 'Invalid credentials'}, 401)
 
+        if password_hasher.needs_rehash(user.password):
+            user.password = password_hasher.hash(data['password'])
+            db.session.commit()
+
         access_token = create_access_token(identity={'id': user.id, 'role': role})
         return make_response({'access_token': access_token}, 200)
 
     @app.route('/normal_users')
-    @jwt_required()
+    @role_required('admin')
+    @replica_router.read_only
     def list_normal_users():
-        identity = get_jwt_identity()
-        if identity['role'] != 'admin':
+        per_page = clamp_per_page(request.args.get('per_page', 50, type=int))
+        try:
+            after_id = int(request.args.get('cursor') or 0)
+        except ValueError:
+            return make_response({'error': 'Invalid cursor'}, 400)
+        users, next_cursor = user_directory_page(request.args.get('q', '').strip(), after_id, per_page)
+        counts = record_counts_by_user([u.id for u in users])
+        return make_response({
+            'users': [
+                {'id': u.id, 'name': u.name, 'email': u.email, 'phone': u.phone,
+                 'record_count': counts.get(u.id, 0)}
+                for u in users
+            ],
+            'next_cursor': next_cursor
+        }, 200)
+
+    @app.route('/normal_users/<int:id>/records')
+    @role_required('admin', 'user')
+    @replica_router.read_only
+    def list_user_records(id):
+        principal = current_principal()
+        if principal.role == 'user' and principal.id != id:
             return make_response({'error': 'Unauthorized'}, 403)
-        users = NormalUser.query.all()
-        return make_response([
-            {'id': u.id, 'name': u.name, 'email': u.email}
-            for u in users
-        ], 200)
+        owner = principal.user if principal.role == 'user' else account_cache.get('user', id)
+        if owner is None:
+            return make_response({'error': 'User not found'}, 404)
+        try:
+            filters = parse_record_filters(request.args)
+        except ValueError:
+            return make_response({'error': 'Invalid filter'}, 400)
+        try:
+            fields, include_media = parse_projection(request.args)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        filters['normal_user_id'] = id
+        include_archived = wants_archived(request.args)
+        per_page = clamp_per_page(request.args.get('per_page', 10, type=int))
+        cursor = request.args.get('cursor')
+        try:
+            source = record_source(include_archived, filters, cursor, per_page + 1)
+            records, next_cursor = keyset_page(projected_listing_query(fields, filters, source),
+                                               cursor, per_page, filters['sort'], source)
+        except ValueError:
+            return make_response({'error': 'Invalid cursor'}, 400)
+        return Response(json_body({
+            'records': serialize_records(records, fields, include_media, include_archived),
+            'next_cursor': next_cursor
+        }), mimetype='application/json')
 
     @app.route('/records', methods=['POST'])
-    @jwt_required()
+    @role_required('user', error='Only normal users can create records')
     def create_record():
-        identity = get_jwt_identity()
-        if identity['role'] != 'user':
-            return make_response({'error': 'Only normal users can create records'}, 403)
-
+        principal = current_principal()
+        if principal.user is None:
+            return make_response({'error': 'Account not found'}, 401)
         data = request.get_json()
         record = Record(
             type=data['type'],
@@ -79,99 +163,487 @@ def register_routes(app):
             description=data['description'],
             latitude=data.get('latitude'),
             longitude=data.get('longitude'),
-            normal_user_id=identity['id']
+            normal_user_id=principal.id
         )
         db.session.add(record)
+        db.session.flush()
+        stats.record_added(record)
+        dedupe.record_added(record)
         db.session.commit()
-        return make_response({'message': 'Record created'}, 201)
+        response_cache.invalidate('records')
+        live_events.publish('record-created', record_event_data(record))
+        return make_response({
+            'message': 'Record created',
+            'id': record.id,
+            'duplicate_of_id': record.duplicate_of_id
+        }, 201)
+
+    @app.route('/records/bulk', methods=['POST'])
+    @role_required('user', error='Only normal users can create records')
+    def bulk_create_records():
+        principal = current_principal()
+        if principal.user is None:
+            return make_response({'error': 'Account not found'}, 401)
+        try:
+            items = read_items(request)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+
+        errors = validate_items(items)
+        if errors:
+            return make_response({'error': 'Validation failed', 'errors': [
+                {'index': index, 'errors': item_errors} for index, item_errors in errors.items()
+            ]}, 400)
+
+        results = ingest_records(principal.id, items)
+        created = sum(1 for result in results if result['status'] == 'created')
+        if created:
+            response_cache.invalidate('records')
+            for result in results:
+                if result['status'] == 'created':
+                    item = items[result['index']]
+                    live_events.publish('record-created', {
+                        'record_id': result['id'],
+                        'title': item['title'],
+                        'type': item['type'],
+                        'status': 'draft',
+                        'latitude': item.get('latitude'),
+                        'longitude': item.get('longitude'),
+                        'geohash': record_geohash(item.get('latitude'), item.get('longitude')),
+                    })
+        return make_response({
+            'results': results,
+            'created': created,
+            'duplicates': len(results) - created
+        }, 201 if created else 200)
 
     @app.route('/records')
     @jwt_required()
+    @replica_router.read_only
+    @response_cache.cached('records')
     def list_records():
+        per_page = clamp_per_page(request.args.get('per_page', 10, type=int))
+        cursor_mode = 'cursor' in request.args
+        count_mode = request.args.get('count', 'none' if cursor_mode else 'exact')
+        if count_mode not in COUNT_MODES:
+            return make_response({'error': 'Invalid count mode'}, 400)
+        try:
+            filters = parse_record_filters(request.args)
+        except ValueError:
+            return make_response({'error': 'Invalid filter'}, 400)
+        try:
+            fields, include_media = parse_projection(request.args)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        include_archived = wants_archived(request.args)
+        # The planner estimate only describes the whole hot table.
+        if count_mode == 'estimate' and (len(filters) > 1 or include_archived):
+            count_mode = 'exact'
+
+        query = projected_listing_query(fields, filters, record_source(include_archived))
+        if cursor_mode:
+            cursor = request.args['cursor']
+            try:
+                source = record_source(include_archived, filters, cursor, per_page + 1)
+                records, next_cursor = keyset_page(projected_listing_query(fields, filters, source),
+                                                   cursor, per_page, filters['sort'], source)
+            except ValueError:
+                return make_response({'error': 'Invalid cursor'}, 400)
+            body = {
+                'records': serialize_records(records, fields, include_media, include_archived),
+                'next_cursor': next_cursor
+            }
+            if count_mode == 'exact':
+                body['total'] = query.order_by(None).count()
+            elif count_mode == 'estimate':
+                body['total'] = estimated_record_count()
+            return Response(json_body(body), mimetype='application/json')
+
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        records = Record.query.paginate(page=page, per_page=per_page, error_out=False)
-        return make_response({
-            'records': [rec.to_dict() for rec in records.items],
-            'total': records.total,
+        if include_archived:
+            # Each branch only needs to supply rows up to the end of this page.
+            source = record_source(include_archived, filters, limit=max(page, 1) * per_page)
+            records = projected_listing_query(fields, filters, source).paginate(
+                page=page, per_page=per_page, error_out=False, count=False)
+            records.total = query.order_by(None).count() if count_mode == 'exact' else None
+        else:
+            records = query.paginate(page=page, per_page=per_page, error_out=False,
+                                     count=count_mode == 'exact')
+        if count_mode == 'exact':
+            total, pages = records.total, records.pages
+        elif count_mode == 'estimate':
+            total = estimated_record_count()
+            pages = -(-total // per_page)
+        else:
+            total = pages = None
+        return Response(json_body({
+            'records': serialize_records(records.items, fields, include_media, include_archived),
+            'total': total,
             'page': records.page,
-            'pages': records.pages
+            'pages': pages
+        }), mimetype='application/json')
+
+    @app.route('/records/export')
+    @role_required('admin')
+    @replica_router.read_only
+    def export_records():
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return make_response({'error': 'format must be ndjson or csv'}, 400)
+        try:
+            filters = parse_record_filters(request.args)
+        except ValueError:
+            return make_response({'error': 'Invalid filter'}, 400)
+
+        include_archived = wants_archived(request.args)
+        if export_format == 'csv':
+            body, mimetype = csv_stream(filters, include_archived), 'text/csv'
+        else:
+            body, mimetype = ndjson_stream(filters, include_archived), 'application/x-ndjson'
+        return Response(stream_with_context(body), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename=records.{export_format}'
+        })
+
+    @app.route('/records/nearby')
+    @jwt_required()
+    @replica_router.read_only
+    @response_cache.cached('records')
+    def nearby_records():
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        radius_km = request.args.get('radius_km', 5.0, type=float)
+        if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return make_response({'error': 'lat and lng are required'}, 400)
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            return make_response({'error': f'radius_km must be between 0 and {MAX_RADIUS_KM:g}'}, 400)
+
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = clamp_per_page(request.args.get('per_page', 10, type=int))
+        results, total = nearest_records(radius_bbox(lat, lng, radius_km), lat, lng,
+                                         page, per_page, radius_km=radius_km)
+        return make_response({
+            'records': [dict(rec.to_dict(), distance_km=round(d, 3)) for d, rec in results],
+            'total': total,
+            'page': page,
+            'pages': -(-total // per_page)
         }, 200)
 
-    @app.route('/records/<int:id>', methods=['PATCH'])
+    @app.route('/records/bbox')
     @jwt_required()
-    def edit_record(id):
-        identity = get_jwt_identity()
-        if identity['role'] != 'user':
-            return make_response({'error': 'Unauthorized'}, 403)
+    @replica_router.read_only
+    @response_cache.cached('records')
+    def bbox_records():
+        try:
+            bbox = parse_bbox(request.args)
+        except (KeyError, ValueError):
+            return make_response({'error': 'Invalid bounding box'}, 400)
+        if bbox_span_km(*bbox) > MAX_BBOX_KM:
+            return make_response({'error': f'Bounding box must span at most {MAX_BBOX_KM:g} km'}, 400)
+
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = clamp_per_page(request.args.get('per_page', 10, type=int))
+        center_lat, center_lng = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+        results, total = nearest_records(bbox, center_lat, center_lng, page, per_page)
+        return make_response({
+            'records': [dict(rec.to_dict(), distance_km=round(d, 3)) for d, rec in results],
+            'total': total,
+            'page': page,
+            'pages': -(-total // per_page)
+        }, 200)
+
+    @app.route('/records/clusters')
+    @jwt_required()
+    @replica_router.read_only
+    @response_cache.cached('records')
+    def record_cluster_counts():
+        try:
+            bbox = parse_bbox(request.args)
+        except (KeyError, ValueError):
+            return make_response({'error': 'Invalid bounding box'}, 400)
+        precision = request.args.get('precision', type=int)
+        return make_response({'clusters': record_clusters(bbox, precision)}, 200)
+
+    @app.route('/records/search')
+    @jwt_required()
+    @replica_router.read_only
+    @response_cache.cached('records')
+    def search_record_text():
+        q = request.args.get('q', '').strip()
+        if not q:
+            return make_response({'error': 'q is required'}, 400)
 
-        record = Record.query.get_or_404(id)
-        if record.normal_user_id != identity['id']:
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = clamp_per_page(request.args.get('per_page', 10, type=int))
+        try:
+            hits, total = search_records(q, page, per_page)
+        except SearchUnavailable as e:
+            return make_response({'error': str(e)}, 501)
+        by_id = records_by_id([hit[0] for hit in hits])
+        return make_response({
+            'records': [
+                dict(by_id[record_id].to_dict(), rank=rank, highlight={'title': title, 'snippet': snippet})
+                for record_id, rank, title, snippet in hits if record_id in by_id
+            ],
+            'total': total,
+            'page': page,
+            'pages': -(-total // per_page)
+        }, 200)
+
+    @app.route('/records/duplicates')
+    @role_required('admin')
+    @replica_router.read_only
+    @response_cache.cached('records')
+    def list_duplicate_clusters():
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
+        clusters, total = dedupe.duplicate_clusters(page, per_page)
+        return make_response({
+            'clusters': clusters,
+            'total': total,
+            'page': page,
+            'pages': -(-total // per_page)
+        }, 200)
+
+    @app.route('/records/<int:id>')
+    @jwt_required()
+    @response_cache.cached('record:{id}')
+    def get_record(id):
+        record = record_listing_query().filter(Record.id == id).first()
+        if record is None and wants_archived(request.args):
+            record = db.session.get(ArchivedRecord, id)
+        if record is None:
+            abort(404)
+        return make_response(record.to_dict(), 200)
+
+    @app.route('/records/<int:id>', methods=['PATCH'])
+    @role_required('user')
+    def edit_record(id):
+        record = record_or_404(id)
+        if record.normal_user_id != current_principal().id:
             return make_response({'error': 'Unauthorized'}, 403)
         if record.status != 'draft':
             return make_response({'error': 'Cannot edit finalized record'}, 403)
 
         data = request.get_json()
+        old_bucket = stats.record_bucket(record)
         record.title = data.get('title', record.title)
         record.description = data.get('description', record.description)
         record.latitude = data.get('latitude', record.latitude)
         record.longitude = data.get('longitude', record.longitude)
+        db.session.flush()
+        stats.record_moved(old_bucket, record)
+        dedupe.record_changed(record)
         db.session.commit()
+        response_cache.invalidate('records', f'record:{id}')
+        live_events.publish('record-updated', record_event_data(record))
         return make_response({'message': 'Record updated'}, 200)
 
     @app.route('/records/<int:id>', methods=['DELETE'])
-    @jwt_required()
+    @role_required('user')
     def delete_record(id):
-        identity = get_jwt_identity()
-        if identity['role'] != 'user':
-            return make_response({'error': 'Unauthorized'}, 403)
-
-        record = Record.query.get_or_404(id)
-        if record.normal_user_id != identity['id']:
+        record = record_or_404(id)
+        if record.normal_user_id != current_principal().id:
             return make_response({'error': 'Unauthorized'}, 403)
         if record.status != 'draft':
             return make_response({'error': 'Cannot delete finalized record'}, 403)
 
+        event = record_event_data(record)
+        stats.record_removed(record)
+        dedupe.record_removed(record)
+        sync.record_deleted(record)
         db.session.delete(record)
         db.session.commit()
+        response_cache.invalidate('records', f'record:{id}')
+        live_events.publish('record-deleted', event)
         return make_response({'message': 'Record deleted'}, 200)
 
     @app.route('/records/<int:id>/status', methods=['PATCH'])
-    @jwt_required()
+    @role_required('admin', error='Only admins can change record status')
     def update_status(id):
-        identity = get_jwt_identity()
-        if identity['role'] != 'admin':
-            return make_response({'error': 'Only admins can change record status'}, 403)
-
-        record = Record.query.get_or_404(id)
+        record = record_or_404(id)
+        if isinstance(record, ArchivedRecord):
+            return make_response({'error': 'Archived records cannot change status'}, 409)
         data = request.get_json()
         new_status = data.get('status')
-        if new_status not in ['under investigation', 'rejected', 'resolved']:
+        if new_status not in RECORD_STATUSES:
             return make_response({'error': 'Invalid status'}, 400)
 
-        record.status = new_status
+        if not change_status(record, new_status, current_principal().id):
+            return make_response({'message': f'Status is already {new_status}'}, 200)
         db.session.commit()
+        response_cache.invalidate('records', f'record:{id}')
+        live_events.publish('status-changed', record_event_data(record))
         return make_response({'message': f'Status updated to {new_status}'}, 200)
 
-    @app.route('/records/<int:id>/media', methods=['POST'])
+    @app.route('/records/status', methods=['POST'])
+    @role_required('admin', error='Only admins can change record status')
+    def bulk_update_status():
+        data = request.get_json(silent=True) or {}
+        new_status = data.get('status')
+        if new_status not in RECORD_STATUSES:
+            return make_response({'error': 'Invalid status'}, 400)
+        ids, filters = data.get('ids'), data.get('filter')
+        if (ids is None) == (filters is None):
+            return make_response({'error': 'Provide either ids or filter'}, 400)
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                return make_response({'error': 'ids must be a list of integers'}, 400)
+            if len(ids) > BULK_MAX_IDS:
+                return make_response({'error': f'At most {BULK_MAX_IDS} ids per request'}, 413)
+        else:
+            try:
+                filters = parse_record_filters(filters if isinstance(filters, dict) else {})
+            except ValueError:
+                return make_response({'error': 'Invalid filter'}, 400)
+            # A bare sort order would match the whole table.
+            if len(filters) < 2:
+                return make_response({'error': 'filter must narrow the records'}, 400)
+
+        matched = updated = 0
+        for rows, changed in bulk_change_status(new_status, current_principal().id, ids=ids, filters=filters):
+            matched += len(rows)
+            updated += len(changed)
+            if changed:
+                response_cache.invalidate('records', *(f'record:{row.id}' for row in changed))
+                live_events.publish('statuses-changed', bulk_status_event_data(changed, new_status))
+        body = {'status': new_status, 'matched': matched, 'updated': updated, 'unchanged': matched - updated}
+        if ids is not None:
+            body['missing'] = len(set(ids)) - matched
+        return make_response(body, 200)
+
+    @app.route('/records/changes')
     @jwt_required()
-    def add_media(id):
-        identity = get_jwt_identity()
-        if identity['role'] != 'user':
+    def record_changes():
+        # Deliberately not routed to the replica: a lagging standby would hand
+        # out tokens that a client then carries back to the primary.
+        try:
+            fields, include_media = parse_projection(request.args)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        limit = request.args.get('limit', sync.SYNC_BATCH_SIZE, type=int)
+        limit = max(1, min(limit, sync.SYNC_MAX_BATCH_SIZE))
+        try:
+            body = sync.changes_since(request.args.get('since'), fields, include_media, limit,
+                                      request.args.get('normal_user_id', type=int))
+        except ValueError:
+            return make_response({'error': 'Invalid sync token'}, 400)
+        return Response(json_body(body), mimetype='application/json')
+
+    @app.route('/records/<int:id>/history')
+    @role_required('admin', 'user')
+    def record_status_history(id):
+        record = record_or_404(id)
+        principal = current_principal()
+        if principal.role == 'user' and record.normal_user_id != principal.id:
             return make_response({'error': 'Unauthorized'}, 403)
+        return make_response({'history': [entry.to_dict() for entry in record_history(id)]}, 200)
 
-        record = Record.query.get_or_404(id)
-        if record.normal_user_id != identity['id']:
+    @app.route('/records/<int:id>/media', methods=['POST'])
+    @role_required('user')
+    def add_media(id):
+        record = record_or_404(id)
+        if record.normal_user_id != current_principal().id:
             return make_response({'error': 'Unauthorized'}, 403)
         if record.status != 'draft':
             return make_response({'error': 'Cannot add media to finalized record'}, 403)
 
-        data = request.get_json()
-        new_media = Media(
-            image_url=data.get('image_url'),
-            video_url=data.get('video_url'),
-            record_id=id
-        )
-        db.session.add(new_media)
-        db.session.commit()
-        return make_response({'message': 'Media added'}, 201)
\ No newline at end of file
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if upload is None or not (upload.mimetype.startswith('image/') or
+                                      upload.mimetype in VIDEO_EXTENSIONS):
+                return make_response({'error': 'An image or video file is required'}, 400)
+            new_media = media_pipeline.attach(id, upload)
+        else:
+            data = request.get_json()
+            new_media = Media(
+                image_url=data.get('image_url'),
+                video_url=data.get('video_url'),
+                record_id=id
+            )
+            db.session.add(new_media)
+            db.session.commit()
+        response_cache.invalidate('records', f'record:{id}')
+        live_events.publish('media-added', record_event_data(record))
+        return make_response({'message': 'Media added', 'media': new_media.to_dict()}, 201)
+
+    @app.route('/media/<path:key>')
+    @jwt_required()
+    def serve_media(key):
+        if not key.startswith(PUBLIC_PREFIXES):
+            abort(404)
+        response = send_from_directory(media_pipeline.storage.root, key, max_age=31536000)
+        # Evidence is only for signed-in callers; keep it out of shared caches.
+        response.cache_control.public = False
+        response.cache_control.private = True
+        return response
+
+    @app.route('/stats')
+    @role_required('admin')
+    @replica_router.read_only
+    @response_cache.cached('records')
+    def record_stats():
+        try:
+            day_from = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+            day_to = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+        except ValueError:
+            return make_response({'error': 'from and to must be YYYY-MM-DD dates'}, 400)
+        return make_response(stats.summary(day_from, day_to), 200)
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return make_response({'error': 'Unauthorized'}, 401)
+        cache_counters = {
+            f'response_cache_{name}_total': (f'Response cache {name.replace("_", " ")}.', value)
+            for name, value in response_cache.stats.items()
+        }
+        response = make_response(metrics.render(cache_counters), 200)
+        response.mimetype = 'text/plain; version=0.0.4'
+        return response
+
+    @app.route('/outbox/stats')
+    @role_required('admin')
+    def notification_outbox_stats():
+        return make_response(outbox_stats(), 200)
+
+    @app.route('/reports', methods=['POST'])
+    @role_required('admin')
+    def create_report():
+        data = request.get_json() or {}
+        if data.get('record_id') is not None:
+            record_id = data['record_id']
+            if not isinstance(record_id, int) or isinstance(record_id, bool):
+                return make_response({'error': 'record_id must be an integer'}, 400)
+            job = report_jobs.submit(record=record_or_404(record_id))
+        else:
+            try:
+                filters = parse_record_filters(data.get('filters') or {})
+            except ValueError:
+                return make_response({'error': 'Invalid filter'}, 400)
+            job = report_jobs.submit(filters)
+        return make_response(report_job_body(job), 202)
+
+    @app.route('/reports/<job_id>')
+    @role_required('admin')
+    def report_status(job_id):
+        job = report_jobs.get(job_id)
+        if job is None:
+            abort(404)
+        return make_response(report_job_body(job), 200)
+
+    @app.route('/reports/<job_id>/pdf')
+    @role_required('admin')
+    def download_report(job_id):
+        job = report_jobs.get(job_id)
+        if job is None or job.status != 'done':
+            abort(404)
+        return send_file(report_jobs.path(job), mimetype='application/pdf',
+                         download_name=f"jiseti-report-{job.cache_key}.pdf")
+
+    def report_job_body(job):
+        body = {'id': job.id, 'status': job.status, 'error': job.error,
+                'status_url': f"/reports/{job.id}"}
+        if job.status == 'done':
+            body['download_url'] = f"/reports/{job.id}/pdf"
+        return body
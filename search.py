@@ -0,0 +1,149 @@
+import html
+import re
+from sqlalchemy import text
+from models import db, Record
+
+SNIPPET_WORDS = 24
+# Private-use characters mark the matches while the text is still raw; they
+# become <mark> tags only after the text has been HTML-escaped.
+MATCH_START, MATCH_STOP = '\ue000', '\ue001'
+
+# Postgres keeps a weighted tsvector as a generated column, so it can never
+# drift from title/description; SQLite uses an external-content FTS5 table
+# that triggers keep in step with every INSERT, UPDATE and DELETE.
+POSTGRES_DDL = [
+    """ALTER TABLE records ADD COLUMN IF NOT EXISTS search_vector tsvector
+       GENERATED ALWAYS AS (
+           setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+           setweight(to_tsvector('english', coalesce(description, '')), 'B')
+       ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_records_search_vector ON records USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+           title, description, content='records', content_rowid='id',
+           tokenize='porter unicode61'
+       )""",
+    """CREATE TRIGGER IF NOT EXISTS records_fts_ai AFTER INSERT ON records BEGIN
+           INSERT INTO records_fts(rowid, title, description)
+           VALUES (new.id, new.title, new.description);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS records_fts_ad AFTER DELETE ON records BEGIN
+           INSERT INTO records_fts(records_fts, rowid, title, description)
+           VALUES ('delete', old.id, old.title, old.description);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS records_fts_au AFTER UPDATE OF title, description ON records BEGIN
+           INSERT INTO records_fts(records_fts, rowid, title, description)
+           VALUES ('delete', old.id, old.title, old.description);
+           INSERT INTO records_fts(rowid, title, description)
+           VALUES (new.id, new.title, new.description);
+       END""",
+]
+
+SQLITE_DROP_DDL = [
+    "DROP TRIGGER IF EXISTS records_fts_au",
+    "DROP TRIGGER IF EXISTS records_fts_ad",
+    "DROP TRIGGER IF EXISTS records_fts_ai",
+    "DROP TABLE IF EXISTS records_fts",
+]
+
+POSTGRES_SEARCH = f"""
+    SELECT page.id, page.rank,
+           ts_headline('english', page.title, page.query,
+                       'HighlightAll=true, StartSel={MATCH_START}, StopSel={MATCH_STOP}') AS title,
+           ts_headline('english', page.description, page.query,
+                       'MaxWords={SNIPPET_WORDS}, MinWords=8, StartSel={MATCH_START}, StopSel={MATCH_STOP}') AS snippet
+    FROM (
+        SELECT r.id, r.title, r.description, q.query, ts_rank_cd(r.search_vector, q.query) AS rank
+        FROM records r, websearch_to_tsquery('english', :q) AS q(query)
+        WHERE r.search_vector @@ q.query
+        ORDER BY rank DESC, r.id DESC
+        LIMIT :limit OFFSET :offset
+    ) AS page
+    ORDER BY page.rank DESC, page.id DESC
+"""
+
+POSTGRES_COUNT = """
+    SELECT count(*) FROM records WHERE search_vector @@ websearch_to_tsquery('english', :q)
+"""
+
+SQLITE_SEARCH = """
+    SELECT rowid, -bm25(records_fts, 4.0, 1.0) AS rank,
+           highlight(records_fts, 0, :start, :stop) AS title,
+           snippet(records_fts, 1, :start, :stop, '…', :words) AS snippet
+    FROM records_fts WHERE records_fts MATCH :q
+    ORDER BY bm25(records_fts, 4.0, 1.0), rowid DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+SQLITE_COUNT = "SELECT count(*) FROM records_fts WHERE records_fts MATCH :q"
+
+
+def install_search_index(connection):
+    if connection.dialect.name == 'postgresql':
+        statements = POSTGRES_DDL
+    elif connection.dialect.name == 'sqlite':
+        statements = SQLITE_DDL
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def drop_search_index(connection):
+    if connection.dialect.name == 'sqlite':
+        for statement in SQLITE_DROP_DDL:
+            connection.execute(text(statement))
+
+
+@db.event.listens_for(Record.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    install_search_index(connection)
+
+
+@db.event.listens_for(Record.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    drop_search_index(connection)
+
+
+def _fts5_query(q):
+    # Quote every term so user input can never be parsed as FTS5 syntax;
+    # the terms are ANDed together like websearch_to_tsquery does.
+    terms = re.findall(r'\w+', q)
+    return ' '.join('"%s"' % term for term in terms)
+
+
+class SearchUnavailable(Exception):
+    """The database dialect has no full-text index this module can use."""
+
+
+def _highlighted(fragment):
+    escaped = html.escape(fragment or '')
+    return escaped.replace(MATCH_START, '<mark>').replace(MATCH_STOP, '</mark>')
+
+
+def search_records(q, page, per_page):
+    """Return (hits, total) where each hit is (record_id, rank, title, snippet).
+
+    ``title`` and ``snippet`` are HTML-escaped, with the matches wrapped in
+    ``<mark>``. Raises SearchUnavailable on dialects other than PostgreSQL
+    and SQLite.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        search_sql, count_sql = POSTGRES_SEARCH, POSTGRES_COUNT
+    elif dialect == 'sqlite':
+        search_sql, count_sql = SQLITE_SEARCH, SQLITE_COUNT
+        q = _fts5_query(q)
+        if not q:
+            return [], 0
+    else:
+        raise SearchUnavailable(f'Full-text search is not supported on {dialect}')
+
+    params = {'q': q, 'limit': per_page, 'offset': (page - 1) * per_page, 'words': SNIPPET_WORDS,
+              'start': MATCH_START, 'stop': MATCH_STOP}
+    hits = [(record_id, rank, _highlighted(title), _highlighted(snippet))
+            for record_id, rank, title, snippet in db.session.execute(text(search_sql), params)]
+    total = db.session.execute(text(count_sql), {'q': q}).scalar()
+    return hits, total
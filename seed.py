@@ -0,0 +1,156 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from faker import Faker
+from sqlalchemy import func, insert, text
+from app import app
+from geo import record_geohash
+from models import db, NormalUser, Administrator, Record, Media
+from passwords import password_hasher
+import stats
+
+# (latitude, longitude, spread in degrees, weight)
+CITIES = [
+    (-1.2921, 36.8219, 0.08, 40),   # Nairobi
+    (-4.0435, 39.6682, 0.05, 15),   # Mombasa
+    (-0.0917, 34.7680, 0.05, 10),   # Kisumu
+    (-0.3031, 36.0800, 0.05, 8),    # Nakuru
+    (0.5143, 35.2698, 0.05, 7),     # Eldoret
+    (0.0236, 37.9062, 2.0, 20),     # rural spread around the country centre
+]
+STATUSES = [('draft', 30), ('under investigation', 25), ('resolved', 30), ('rejected', 15)]
+TYPES = ['red-flag', 'intervention']
+TEXT_POOL_SIZE = 2000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fill the database with synthetic Jiseti data.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--admins", type=int, default=10)
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--media-per-record", type=float, default=1.5, help="average media rows per record")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--password", default="password123", help="password shared by every seeded account")
+    parser.add_argument("--days", type=int, default=730, help="spread created_at over this many days")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def insert_batches(model, rows, batch_size):
+    """Insert an iterator of row dicts with one multi-row INSERT per batch."""
+    started, count, batch = time.perf_counter(), 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(model), batch)
+            db.session.commit()
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(model), batch)
+        db.session.commit()
+        count += len(batch)
+    elapsed = time.perf_counter() - started
+    print(f"  - {model.__tablename__}: {count} rows in {elapsed:.1f}s "
+          f"({count / elapsed if elapsed else 0:,.0f} rows/s)")
+
+
+def user_rows(fake, start, count, password_hash):
+    for i in range(start, start + count):
+        yield {'id': i, 'name': fake.name(), 'email': f'user{i}@example.org', 'password': password_hash}
+
+
+def admin_rows(fake, start, count, password_hash):
+    for i in range(start, start + count):
+        yield {'id': i, 'name': fake.name(), 'email': f'admin{i}@example.org',
+               'password': password_hash, 'admin_number': f'ADM{i:06d}'}
+
+
+def random_location(rng):
+    lat, lng, spread, _ = rng.choices(CITIES, weights=[c[3] for c in CITIES])[0]
+    return round(rng.gauss(lat, spread), 6), round(rng.gauss(lng, spread), 6)
+
+
+def record_rows(rng, titles, descriptions, start, count, user_ids, days):
+    now = datetime.utcnow()
+    statuses, weights = zip(*STATUSES)
+    for i in range(start, start + count):
+        latitude, longitude = random_location(rng)
+        yield {
+            'id': i,
+            'type': rng.choice(TYPES),
+            'title': rng.choice(titles),
+            'description': rng.choice(descriptions),
+            'status': rng.choices(statuses, weights)[0],
+            'latitude': latitude,
+            'longitude': longitude,
+            'geohash': record_geohash(latitude, longitude),
+            'created_at': now - timedelta(seconds=rng.randrange(days * 86400)),
+            'normal_user_id': rng.choice(user_ids),
+        }
+
+
+def media_rows(rng, start, record_ids, average):
+    media_id = start
+    for record_id in record_ids:
+        for _ in range(int(average) + (rng.random() < average % 1)):
+            if rng.random() < 0.8:
+                row = {'image_url': f'https://cdn.example.org/evidence/{media_id}.jpg', 'video_url': None}
+            else:
+                row = {'image_url': None, 'video_url': f'https://cdn.example.org/evidence/{media_id}.mp4'}
+            yield dict(row, id=media_id, record_id=record_id)
+            media_id += 1
+
+
+def reset_sequences():
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for model in (NormalUser, Administrator, Record, Media):
+        table = model.__tablename__
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+        ))
+    db.session.commit()
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    fake = Faker()
+    Faker.seed(args.seed)
+    # Faker is far too slow to call per row at tens of millions of rows, so
+    # text comes from a pre-generated pool.
+    titles = [fake.sentence(nb_words=6)[:100] for _ in range(TEXT_POOL_SIZE)]
+    descriptions = [fake.paragraph(nb_sentences=5) for _ in range(TEXT_POOL_SIZE)]
+
+    with app.app_context():
+        db.create_all()
+        password_hash = password_hasher.hash(args.password)
+        print("Seeding...")
+
+        user_start = next_id(NormalUser)
+        insert_batches(NormalUser, user_rows(fake, user_start, args.users, password_hash), args.batch_size)
+        insert_batches(Administrator, admin_rows(fake, next_id(Administrator), args.admins, password_hash),
+                       args.batch_size)
+
+        user_ids = list(range(user_start, user_start + args.users)) or [
+            row[0] for row in db.session.query(NormalUser.id).limit(10000)
+        ]
+        record_start = next_id(Record)
+        insert_batches(Record, record_rows(rng, titles, descriptions, record_start, args.records,
+                                           user_ids, args.days), args.batch_size)
+        insert_batches(Media, media_rows(rng, next_id(Media),
+                                         range(record_start, record_start + args.records),
+                                         args.media_per_record), args.batch_size)
+        reset_sequences()
+        stats.rebuild()
+    print("✅ Done")
+
+
+if __name__ == "__main__":
+    main()
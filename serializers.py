@@ -0,0 +1,76 @@
+import json
+from collections import defaultdict
+from functools import lru_cache
+from sqlalchemy import select
+from models import db, ArchivedMedia, Media
+
+RECORD_FIELDS = ('id', 'type', 'title', 'description', 'status', 'latitude', 'longitude',
+                 'normal_user_id', 'created_at', 'updated_at', 'duplicate_of_id')
+TIMESTAMP_FIELDS = ('created_at', 'updated_at')
+MEDIA_FIELDS = ('id', 'image_url', 'video_url', 'thumbnail_url', 'size_bytes', 'width', 'height',
+                'record_id')
+INCLUDES = ('media',)
+
+
+def parse_projection(args):
+    """Return (fields, include_media) from ``fields=`` and ``include=``.
+
+    Without ``fields`` the full ``Record.to_dict()`` shape is produced,
+    media included; an explicit field list only carries media when
+    ``include=media`` asks for it. Raises ValueError on unknown names.
+    """
+    include = [name for name in args.get('include', '').split(',') if name]
+    if any(name not in INCLUDES for name in include):
+        raise ValueError('Unknown include')
+    if not args.get('fields'):
+        return RECORD_FIELDS, True
+    fields = tuple(dict.fromkeys(name.strip() for name in args['fields'].split(',') if name.strip()))
+    if not fields or any(name not in RECORD_FIELDS for name in fields):
+        raise ValueError('Unknown field')
+    return fields, 'media' in include
+
+
+@lru_cache(maxsize=128)
+def row_serializer(fields):
+    """Build the row-to-dict function for one field list.
+
+    Rows are SELECTed with the requested fields first, so zip() lines them up
+    without any per-column lookups; only the timestamps need converting.
+    """
+    timestamps = [name for name in TIMESTAMP_FIELDS if name in fields]
+
+    def serialize(row):
+        item = dict(zip(fields, row))
+        for name in timestamps:
+            if item[name] is not None:
+                item[name] = item[name].isoformat()
+        return item
+    return serialize
+
+
+def media_by_record(record_ids, include_archived=False):
+    """Media dicts for a page of records in one ``record_id IN (...)`` query."""
+    media = defaultdict(list)
+    if record_ids:
+        models = (Media, ArchivedMedia) if include_archived else (Media,)
+        rows = []
+        for model in models:
+            columns = [getattr(model, name) for name in MEDIA_FIELDS]
+            rows.extend(db.session.execute(select(*columns).where(model.record_id.in_(record_ids))))
+        for row in sorted(rows, key=lambda row: row.id):
+            media[row.record_id].append(dict(zip(MEDIA_FIELDS, row)))
+    return media
+
+
+def serialize_records(rows, fields, include_media, include_archived=False):
+    serialize = row_serializer(fields)
+    items = [serialize(row) for row in rows]
+    if include_media:
+        media = media_by_record([row.id for row in rows], include_archived)
+        for item, row in zip(items, rows):
+            item['media'] = media.get(row.id, [])
+    return items
+
+
+def json_body(body):
+    return json.dumps(body, separators=(',', ':'))
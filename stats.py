@@ -0,0 +1,99 @@
+from collections import Counter
+import click
+from sqlalchemy import func, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, ArchivedRecord, Record, RecordStat
+
+REGION_PRECISION = 3
+
+
+def bucket(created_at, status, type, geohash):
+    return (created_at.date(), status or '', type, (geohash or '')[:REGION_PRECISION])
+
+
+def record_bucket(record):
+    return bucket(record.created_at, record.status, record.type, record.geohash)
+
+
+def adjust(deltas):
+    """Apply {bucket: delta} to record_stats inside the caller's transaction.
+
+    One INSERT ... ON CONFLICT DO UPDATE per call, so the aggregates commit
+    or roll back together with the write that changed them.
+    """
+    rows = [
+        {'day': day, 'status': status, 'type': type, 'region': region, 'count': delta}
+        for (day, status, type, region), delta in deltas.items() if delta
+    ]
+    if not rows:
+        return
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    stmt = dialect.insert(RecordStat)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['day', 'status', 'type', 'region'],
+        set_={'count': RecordStat.count + stmt.excluded.count}
+    )
+    db.session.execute(stmt, rows)
+
+
+def record_added(*records):
+    adjust(Counter(record_bucket(r) for r in records))
+
+
+def record_removed(*records):
+    adjust({key: -n for key, n in Counter(record_bucket(r) for r in records).items()})
+
+
+def record_moved(old_bucket, record):
+    new_bucket = record_bucket(record)
+    if new_bucket != old_bucket:
+        adjust({old_bucket: -1, new_bucket: 1})
+
+
+def rebuild():
+    """Recompute record_stats from records and records_archive with one
+    set-based INSERT ... SELECT; archiving moves rows without touching the
+    aggregates, so both tables count."""
+    rows = db.union_all(
+        db.select(Record.created_at, Record.status, Record.type, Record.geohash),
+        db.select(ArchivedRecord.created_at, ArchivedRecord.status, ArchivedRecord.type, ArchivedRecord.geohash)
+    ).subquery()
+    region = func.coalesce(func.substr(rows.c.geohash, 1, REGION_PRECISION), literal(''))
+    day = func.date(rows.c.created_at)
+    status = func.coalesce(rows.c.status, literal(''))
+    select_buckets = db.select(day, status, rows.c.type, region, func.count()).group_by(
+        day, status, rows.c.type, region
+    )
+    db.session.query(RecordStat).delete()
+    db.session.execute(RecordStat.__table__.insert().from_select(
+        ['day', 'status', 'type', 'region', 'count'], select_buckets
+    ), execution_options={'statement_timeout': 0})
+    db.session.commit()
+
+
+def summary(day_from=None, day_to=None):
+    def grouped(column):
+        query = db.session.query(column, func.sum(RecordStat.count)).group_by(column)
+        if day_from:
+            query = query.filter(RecordStat.day >= day_from)
+        if day_to:
+            query = query.filter(RecordStat.day <= day_to)
+        return [(key, int(total)) for key, total in query if total]
+
+    by_status = dict(grouped(RecordStat.status))
+    return {
+        'total': sum(by_status.values()),
+        'by_status': by_status,
+        'by_type': dict(grouped(RecordStat.type)),
+        'by_region': dict(grouped(RecordStat.region)),
+        'by_day': [{'day': day.isoformat() if hasattr(day, 'isoformat') else day, 'count': n}
+                   for day, n in sorted(grouped(RecordStat.day))],
+    }
+
+
+def init_app(app):
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats():
+        """Recompute the dashboard aggregates from the live and archived records."""
+        rebuild()
+        click.echo(f"Rebuilt {RecordStat.query.count()} stat buckets")
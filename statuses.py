@@ -0,0 +1,103 @@
+from datetime import datetime
+from sqlalchemy import insert, select, update
+from models import db, Record, RecordStatusHistory
+from notifications import enqueue_status_change, enqueue_status_changes
+from queries import apply_record_filters
+import stats
+
+RECORD_STATUSES = ('under investigation', 'rejected', 'resolved')
+BULK_MAX_IDS = 100000
+BULK_CHUNK_SIZE = 1000
+_CHUNK_COLUMNS = (Record.id, Record.title, Record.type, Record.status, Record.latitude, Record.longitude,
+                  Record.geohash, Record.created_at, Record.normal_user_id)
+
+
+def record_history(record_id):
+    return RecordStatusHistory.query.filter_by(record_id=record_id) \
+        .order_by(RecordStatusHistory.changed_at, RecordStatusHistory.id).all()
+
+
+def record_histories(record_ids):
+    """``record_history`` for a batch of records in one query, keyed by record id."""
+    histories = {record_id: [] for record_id in record_ids}
+    if record_ids:
+        for entry in RecordStatusHistory.query.filter(RecordStatusHistory.record_id.in_(record_ids)) \
+                .order_by(RecordStatusHistory.changed_at, RecordStatusHistory.id):
+            histories[entry.record_id].append(entry)
+    return histories
+
+
+def change_status(record, new_status, admin_id):
+    """Move one record to ``new_status`` inside the caller's transaction,
+    keeping the stats, the history log and the SMS outbox in step.
+
+    Returns False, writing nothing, when the record already has that status.
+    """
+    if record.status == new_status:
+        return False
+    old_bucket = stats.record_bucket(record)
+    old_status = record.status
+    record.status = new_status
+    stats.record_moved(old_bucket, record)
+    db.session.add(RecordStatusHistory(record_id=record.id, old_status=old_status,
+                                       new_status=new_status, changed_by=admin_id))
+    enqueue_status_change(record, new_status)
+    return True
+
+
+def _apply_chunk(rows, new_status, admin_id):
+    changed = [row for row in rows if row.status != new_status]
+    if not changed:
+        return changed
+    ids = [row.id for row in changed]
+    db.session.execute(
+        update(Record).where(Record.id.in_(ids)).values(status=new_status)
+        .execution_options(synchronize_session=False)
+    )
+    now = datetime.utcnow()
+    db.session.execute(insert(RecordStatusHistory), [
+        {'record_id': row.id, 'old_status': row.status, 'new_status': new_status,
+         'changed_by': admin_id, 'changed_at': now}
+        for row in changed
+    ])
+    deltas = {}
+    for row in changed:
+        old = stats.bucket(row.created_at, row.status, row.type, row.geohash)
+        new = stats.bucket(row.created_at, new_status, row.type, row.geohash)
+        deltas[old] = deltas.get(old, 0) - 1
+        deltas[new] = deltas.get(new, 0) + 1
+    stats.adjust(deltas)
+    enqueue_status_changes(changed, new_status)
+    return changed
+
+
+def bulk_change_status(new_status, admin_id, ids=None, filters=None, chunk_size=BULK_CHUNK_SIZE):
+    """Apply ``new_status`` to ``ids`` or to every record matching ``filters``.
+
+    Yields (matched rows, changed rows) once per committed chunk. Each chunk
+    is its own short transaction: one SELECT ... FOR UPDATE of at most
+    ``chunk_size`` rows, one set-based UPDATE and one multi-row history
+    INSERT, so no lock is held across chunks. Rows already in
+    ``new_status`` are left alone and get no history entry.
+    """
+    stmt = select(*_CHUNK_COLUMNS).order_by(Record.id).limit(chunk_size).with_for_update()
+    if ids is not None:
+        ids = sorted(set(ids))
+        batches = (ids[start:start + chunk_size] for start in range(0, len(ids), chunk_size))
+        for batch in batches:
+            rows = db.session.execute(stmt.where(Record.id.in_(batch))).all()
+            changed = _apply_chunk(rows, new_status, admin_id)
+            db.session.commit()
+            yield rows, changed
+        return
+
+    stmt = apply_record_filters(stmt, dict(filters, sort='created_at')).order_by(None).order_by(Record.id)
+    last_id = 0
+    while True:
+        rows = db.session.execute(stmt.where(Record.id > last_id)).all()
+        if not rows:
+            return
+        changed = _apply_chunk(rows, new_status, admin_id)
+        db.session.commit()
+        yield rows, changed
+        last_id = rows[-1].id
@@ -0,0 +1,99 @@
+import base64
+import binascii
+from sqlalchemy import literal, select, text, tuple_, union_all
+from models import db, Record, RecordTombstone
+from queries import projected_listing_query
+from serializers import serialize_records
+
+SYNC_BATCH_SIZE = 500
+SYNC_MAX_BATCH_SIZE = 1000
+
+
+def encode_token(sync_seq, record_id):
+    raw = f"{sync_seq}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Return (sync_seq, record_id); raises ValueError on anything else."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        sync_seq, record_id = raw.split('|')
+        return int(sync_seq), int(record_id)
+    except (binascii.Error, UnicodeDecodeError) as exc:
+        raise ValueError('Malformed sync token') from exc
+
+
+def safe_horizon():
+    """Smallest ``sync_seq`` that may still belong to an uncommitted write.
+
+    On Postgres that is the oldest transaction id still running: every row
+    numbered below it is committed, and no later commit can add one. A
+    long transaction holds the feed back until it ends rather than letting
+    clients skip past its rows. SQLite hands numbers out under its single
+    write lock, so everything visible is already final and there is no
+    horizon (None).
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return None
+    return db.session.execute(text('SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint')).scalar()
+
+
+def _changed_keys(since, horizon, limit, normal_user_id):
+    """(sync_seq, id, deleted) for the next ``limit`` changes after ``since``.
+
+    Both branches seek on their (sync_seq, id) index and stop at ``limit``,
+    so a batch never reads more than twice its size whatever the table holds.
+    """
+    live = select(Record.sync_seq.label('sync_seq'), Record.id.label('record_id'),
+                  literal(False).label('deleted'))
+    gone = select(RecordTombstone.sync_seq.label('sync_seq'), RecordTombstone.record_id.label('record_id'),
+                  literal(True).label('deleted'))
+    if horizon is not None:
+        live = live.where(Record.sync_seq < horizon)
+        gone = gone.where(RecordTombstone.sync_seq < horizon)
+    if since is not None:
+        live = live.where(tuple_(Record.sync_seq, Record.id) > since)
+        gone = gone.where(tuple_(RecordTombstone.sync_seq, RecordTombstone.record_id) > since)
+    if normal_user_id is not None:
+        live = live.where(Record.normal_user_id == normal_user_id)
+        gone = gone.where(RecordTombstone.normal_user_id == normal_user_id)
+    live = live.order_by(Record.sync_seq, Record.id).limit(limit).subquery()
+    gone = gone.order_by(RecordTombstone.sync_seq, RecordTombstone.record_id).limit(limit).subquery()
+    combined = union_all(select(*live.c), select(*gone.c)).subquery()
+    return db.session.execute(
+        select(*combined.c).order_by(combined.c.sync_seq, combined.c.record_id).limit(limit)
+    ).all()
+
+
+def changes_since(token, fields, include_media, limit=SYNC_BATCH_SIZE, normal_user_id=None):
+    """One batch of the record change feed after sync ``token``.
+
+    Returns a body with the upserted records, the deleted ids, the token to
+    send next time and whether more changes are already waiting. Only
+    changes below ``safe_horizon()`` are served, so a token never moves
+    past a write that has yet to commit.
+
+    Raises ValueError on a malformed token.
+    """
+    since = decode_token(token) if token else None
+    horizon = safe_horizon()
+    keys = _changed_keys(since, horizon, limit + 1, normal_user_id)
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+
+    live_ids = [key.record_id for key in keys if not key.deleted]
+    rows = projected_listing_query(fields, {'ids': live_ids}).all() if live_ids else []
+    order = {record_id: position for position, record_id in enumerate(live_ids)}
+    rows.sort(key=lambda row: order[row.id])
+    return {
+        'changes': serialize_records(rows, fields, include_media),
+        'deleted': [key.record_id for key in keys if key.deleted],
+        'next_token': encode_token(keys[-1].sync_seq, keys[-1].record_id) if keys else token,
+        'has_more': has_more,
+    }
+
+
+def record_deleted(record):
+    """Leave a tombstone for ``record`` inside the caller's transaction."""
+    db.session.add(RecordTombstone(record_id=record.id, normal_user_id=record.normal_user_id))
@@ -0,0 +1,130 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+_tmp = tempfile.mkdtemp(prefix='jiseti-tests-')
+os.environ['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(_tmp, "test.db")}'
+os.environ['JWT_SECRET_KEY'] = 'test-secret-key-with-enough-bytes-for-hs256'
+os.environ['BCRYPT_LOG_ROUNDS'] = '4'
+os.environ['MEDIA_STORAGE_ROOT'] = os.path.join(_tmp, 'media')
+os.environ['REPORT_STORAGE_ROOT'] = os.path.join(_tmp, 'reports')
+os.environ['METRICS_ENABLED'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import g  # noqa: E402
+from flask.testing import FlaskClient  # noqa: E402
+from flask_jwt_extended import create_access_token  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import app as flask_app  # noqa: E402
+from auth import account_cache  # noqa: E402
+from cache import LRUBackend, response_cache  # noqa: E402
+from models import db, Administrator, NormalUser, Record  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    with flask_app.app_context():
+        db.create_all()
+    return flask_app
+
+
+@pytest.fixture(autouse=True)
+def clean_state(app):
+    response_cache.backend = LRUBackend()
+    # Row ids are reused once the tables are emptied.
+    account_cache.backend = LRUBackend()
+    with app.app_context():
+        yield
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+
+
+class RequestClient(FlaskClient):
+    """Test client that gives every request a fresh ``g``.
+
+    Tests hold an app context open for database access, and requests made
+    inside it would otherwise share ``g`` (and the cached principal).
+    """
+
+    def open(self, *args, **kwargs):
+        for name in list(g):
+            g.pop(name)
+        return super().open(*args, **kwargs)
+
+
+@pytest.fixture
+def client(app):
+    app.test_client_class = RequestClient
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user():
+    def make(email='user@example.com', phone=None):
+        user = NormalUser(name='User', email=email, password='x', phone=phone)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
+
+
+def auth_header(role, id):
+    token = create_access_token(identity={'id': id, 'role': role})
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def user_headers(make_user):
+    return auth_header('user', make_user().id)
+
+
+@pytest.fixture
+def admin_headers():
+    admin = Administrator(name='Admin', email='admin@example.com', password='x', admin_number='A1')
+    db.session.add(admin)
+    db.session.commit()
+    return auth_header('admin', admin.id)
+
+
+@pytest.fixture
+def make_records():
+    def make(count, user=None, **values):
+        if user is None:
+            user = NormalUser.query.first() or NormalUser(name='Owner', email='owner@example.com', password='x')
+        records = [Record(type='red-flag', title=f'Record {i}', description=f'Description number {i}',
+                          normal_user=user, **values) for i in range(count)]
+        db.session.add_all(records)
+        db.session.commit()
+        return records
+    return make
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __len__(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager collecting every SQL statement run inside it."""
+    @contextmanager
+    def counting():
+        counter = QueryCounter()
+        event.listen(db.engine, 'before_cursor_execute', counter)
+        try:
+            yield counter
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', counter)
+    return counting
@@ -0,0 +1,102 @@
+import json
+from datetime import datetime, timedelta
+
+import archive
+from models import db, ArchivedMedia, ArchivedRecord, Media, Record, RecordStatusHistory
+
+LONG_AGO = datetime(2024, 1, 1)
+
+
+def _cutoff():
+    return datetime.utcnow() - timedelta(days=archive.ARCHIVE_AFTER_DAYS)
+
+
+def test_only_old_settled_records_are_moved_with_their_media(make_records):
+    settled = make_records(3, status='resolved', created_at=LONG_AGO)
+    draft, = make_records(1, created_at=LONG_AGO)
+    recent, = make_records(1, status='rejected')
+    reopened, = make_records(1, status='resolved', created_at=LONG_AGO)
+    db.session.add(RecordStatusHistory(record_id=reopened.id, old_status='draft', new_status='resolved'))
+    db.session.add(Media(record_id=settled[0].id, image_url='evidence.jpg'))
+    db.session.commit()
+    settled_ids = {r.id for r in settled}
+    kept_ids = {draft.id, recent.id, reopened.id}
+
+    assert archive.archive(_cutoff(), batch_size=2) == 3
+    assert {r.id for r in Record.query} == kept_ids
+    assert {r.id for r in ArchivedRecord.query} == settled_ids
+    assert [m.image_url for m in ArchivedMedia.query] == ['evidence.jpg']
+    assert Media.query.count() == 0
+    assert archive.archive(_cutoff()) == 0
+
+
+def test_archived_listing_keysets_across_both_tables(client, user_headers, make_records):
+    records = make_records(4, status='resolved', created_at=LONG_AGO) + make_records(3)
+    for offset, record in enumerate(records):
+        record.created_at = LONG_AGO + timedelta(days=offset * 90)
+    db.session.commit()
+    newest_first = [record.id for record in reversed(records)]
+    assert archive.archive(_cutoff()) > 0
+
+    seen, cursor = [], ''
+    while cursor is not None:
+        body = client.get('/records', query_string={'include_archived': 1, 'per_page': 2, 'cursor': cursor},
+                          headers=user_headers).get_json()
+        seen += [record['id'] for record in body['records']]
+        cursor = body['next_cursor']
+    assert seen == newest_first
+
+    body = client.get('/records', query_string={'include_archived': 1, 'per_page': 3, 'page': 2},
+                      headers=user_headers).get_json()
+    assert [record['id'] for record in body['records']] == newest_first[3:6]
+    assert (body['total'], body['pages']) == (7, 3)
+    assert client.get('/records', headers=user_headers).get_json()['total'] < 7
+
+
+def test_archived_listing_limits_each_branch(client, user_headers, make_records, count_queries):
+    make_records(2)
+    with count_queries() as queries:
+        client.get('/records', query_string={'include_archived': 1, 'per_page': 5, 'cursor': ''},
+                   headers=user_headers)
+    listing = next(s for s in queries.statements if 'records_archive' in s)
+    assert listing.count('LIMIT') == 3
+
+
+def test_archived_record_endpoints_fall_back_to_the_archive(client, user_headers, admin_headers, make_user):
+    owner = make_user('owner@example.com')
+    record = Record(type='red-flag', title='Old', description='Old case', normal_user=owner,
+                    status='resolved', created_at=LONG_AGO)
+    db.session.add(record)
+    db.session.commit()
+    db.session.add(RecordStatusHistory(record_id=record.id, old_status='draft', new_status='resolved',
+                                       changed_at=LONG_AGO))
+    db.session.commit()
+    url = f'/records/{record.id}'
+    assert archive.archive(_cutoff()) == 1
+
+    history = client.get(f'{url}/history', headers=admin_headers)
+    assert history.status_code == 200
+    assert [entry['new_status'] for entry in history.get_json()['history']] == ['resolved']
+    assert client.get(url, headers=admin_headers).status_code == 404
+    assert client.get(url, query_string={'include_archived': 1}, headers=admin_headers).status_code == 200
+    assert client.patch(f'{url}/status', json={'status': 'draft'}, headers=admin_headers).status_code == 409
+    assert client.get('/records/999999/history', headers=admin_headers).status_code == 404
+
+
+def test_export_includes_archived_records_on_request(client, admin_headers, make_records):
+    settled = make_records(2, status='resolved', created_at=LONG_AGO)
+    kept, = make_records(1)
+    db.session.add(Media(record_id=settled[0].id, image_url='evidence.jpg'))
+    db.session.commit()
+    settled_ids = {r.id for r in settled}
+    assert archive.archive(_cutoff()) == 2
+
+    hot = client.get('/records/export', headers=admin_headers).get_data(as_text=True).splitlines()
+    assert [json.loads(line)['id'] for line in hot] == [kept.id]
+    rows = [json.loads(line) for line in client.get('/records/export', query_string={'include_archived': 1},
+                                                    headers=admin_headers).get_data(as_text=True).splitlines()]
+    assert {row['id'] for row in rows} == settled_ids | {kept.id}
+    assert [m['image_url'] for row in rows for m in row['media']] == ['evidence.jpg']
+    csv_body = client.get('/records/export', query_string={'include_archived': 1, 'format': 'csv'},
+                          headers=admin_headers).get_data(as_text=True)
+    assert len(csv_body.splitlines()) == 4
@@ -0,0 +1,51 @@
+from auth import account_cache
+from models import db, NormalUser, OutboxMessage
+
+RECORD = {'type': 'red-flag', 'title': 'Bribe', 'description': 'Asked for a bribe at the counter'}
+
+
+def _account_selects(statements):
+    return [s for s in statements if 'FROM normal_users' in s]
+
+
+def test_write_endpoints_resolve_the_account_from_the_cache(client, user_headers, count_queries):
+    assert client.post('/records', json=RECORD, headers=user_headers).status_code == 201
+    with count_queries() as queries:
+        assert client.post('/records', json=RECORD, headers=user_headers).status_code == 201
+        assert client.post('/records/bulk', json=[RECORD], headers=user_headers).status_code == 201
+    assert _account_selects(queries.statements) == []
+
+
+def test_deleted_account_cannot_create_records(client, user_headers):
+    db.session.delete(NormalUser.query.one())
+    db.session.commit()
+    assert client.post('/records', json=RECORD, headers=user_headers).status_code == 401
+    assert client.post('/records/bulk', json=[RECORD], headers=user_headers).status_code == 401
+
+
+def test_status_sms_uses_the_current_phone_after_an_account_update(client, admin_headers, make_user,
+                                                                   make_records):
+    user = make_user(phone='+254700000001')
+    first, second = make_records(2, user=user)
+    assert client.patch(f'/records/{first.id}/status', json={'status': 'resolved'},
+                        headers=admin_headers).status_code == 200
+    user.phone = '+254700000002'
+    db.session.commit()
+    assert client.patch(f'/records/{second.id}/status', json={'status': 'resolved'},
+                        headers=admin_headers).status_code == 200
+    assert [m.recipient for m in OutboxMessage.query.order_by(OutboxMessage.id)] == \
+        ['+254700000001', '+254700000002']
+
+
+def test_accounts_read_between_flush_and_commit_are_evicted_on_commit(app, make_user):
+    user = make_user()
+    user.name = 'Renamed'
+    db.session.flush()
+    with app.app_context():
+        # Another request reads the account before the rename commits.
+        assert account_cache.get('user', user.id).name == 'User'
+        db.session.remove()
+    db.session.commit()
+    with app.app_context():
+        assert account_cache.get('user', user.id).name == 'Renamed'
+        db.session.remove()
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import dedupe
+from models import db, Record
+
+REPORT = ('Burst water pipe flooding the main road next to the county market since this morning, '
+          'traders cannot reach their stalls')
+
+
+def _create(client, headers, description, lat=-1.2921, lng=36.8219):
+    response = client.post('/records', json={'type': 'intervention', 'title': 'Burst pipe',
+                                             'description': description, 'latitude': lat, 'longitude': lng},
+                           headers=headers)
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def test_near_duplicate_is_linked_to_the_first_report(client, user_headers):
+    first = _create(client, user_headers, REPORT)
+    second = _create(client, user_headers, REPORT + ' today')
+    assert first['duplicate_of_id'] is None
+    assert second['duplicate_of_id'] == first['id']
+
+
+def test_unrelated_or_distant_reports_are_not_linked(client, user_headers):
+    _create(client, user_headers, REPORT)
+    other = _create(client, user_headers, 'Officials demanded a bribe before issuing a land title deed')
+    far = _create(client, user_headers, REPORT, lat=-4.05, lng=39.66)
+    assert other['duplicate_of_id'] is None
+    assert far['duplicate_of_id'] is None
+
+
+def test_duplicate_clusters_lists_canonical_with_members(client, user_headers, admin_headers):
+    first = _create(client, user_headers, REPORT)
+    copies = [_create(client, user_headers, REPORT + suffix)['id'] for suffix in (' again', ' still')]
+    body = client.get('/records/duplicates', headers=admin_headers).get_json()
+    assert body['total'] == 1
+    assert body['clusters'][0]['canonical']['id'] == first['id']
+    assert body['clusters'][0]['duplicate_ids'] == copies
+
+
+def test_rebuild_relinks_without_touching_unchanged_records(client, user_headers):
+    first = _create(client, user_headers, REPORT)
+    second = _create(client, user_headers, REPORT + ' today')
+    _create(client, user_headers, 'Officials demanded a bribe before issuing a land title deed')
+    stale = datetime(2024, 1, 1)
+    db.session.query(Record).update({'updated_at': stale})
+    # A stale link the rebuild has to correct.
+    db.session.query(Record).filter(Record.id == first['id']).update({'duplicate_of_id': second['id']})
+    db.session.commit()
+
+    assert dedupe.rebuild(chunk_size=2) == (3, 1)
+    db.session.expire_all()
+    records = {r.id: r for r in Record.query}
+    assert records[second['id']].duplicate_of_id == first['id']
+    assert records[first['id']].duplicate_of_id is None
+    assert records[first['id']].updated_at > stale + timedelta(days=1)
+    assert records[second['id']].updated_at == stale
+    assert sum(r.updated_at == stale for r in records.values()) == 2
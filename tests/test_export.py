@@ -0,0 +1,28 @@
+import time
+import types
+
+from sqlalchemy import event
+
+import database
+from models import db
+
+
+def test_export_streams_past_the_request_deadline(app, client, admin_headers, make_records, monkeypatch):
+    make_records(3000)
+    # Every media lookup between chunks "takes" longer than the request
+    # default, so the stream only survives if it keeps its own deadline.
+    skew = [0]
+    monkeypatch.setattr(database, 'time', types.SimpleNamespace(monotonic=lambda: time.monotonic() + skew[0]))
+
+    def slow_media(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM media' in statement:
+            skew[0] += app.config['DB_STATEMENT_TIMEOUT_MS'] / 1000 + 1
+    event.listen(db.engine, 'after_cursor_execute', slow_media)
+    try:
+        response = client.get('/records/export', headers=admin_headers)
+        lines = response.get_data(as_text=True).splitlines()
+    finally:
+        event.remove(db.engine, 'after_cursor_execute', slow_media)
+    assert response.status_code == 200
+    assert len(lines) == 3000
+    assert skew[0] > 0
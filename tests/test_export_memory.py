@@ -0,0 +1,51 @@
+import os
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from export import record_chunks
+from models import db, Media, NormalUser, Record
+
+EXPORT_TEST_ROWS = int(os.getenv('EXPORT_TEST_ROWS', 500_000))
+SMALL_EXPORT_ROWS = 10_000
+
+
+def _insert_records(user_id, start, count):
+    created = datetime(2024, 1, 1)
+    for offset in range(start, start + count, 10_000):
+        size = min(10_000, start + count - offset)
+        db.session.execute(insert(Record), [
+            {'type': 'red-flag', 'title': f'Record {i}', 'description': f'Exported record number {i} ' * 4,
+             'status': 'draft', 'created_at': created + timedelta(seconds=i), 'normal_user_id': user_id}
+            for i in range(offset, offset + size)
+        ])
+    db.session.execute(insert(Media), [
+        {'record_id': i + 1, 'image_url': f'http://media/{i}.jpg'} for i in range(start, start + count, 100)
+    ])
+    db.session.commit()
+
+
+def _export_peak():
+    tracemalloc.start()
+    try:
+        exported = sum(len(rows) for rows in record_chunks({}))
+        return exported, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_export_peak_memory_does_not_grow_with_table_size():
+    user = NormalUser(name='Owner', email='owner@example.com', password='x')
+    db.session.add(user)
+    db.session.commit()
+
+    _insert_records(user.id, 0, SMALL_EXPORT_ROWS)
+    small_count, small_peak = _export_peak()
+    _insert_records(user.id, SMALL_EXPORT_ROWS, EXPORT_TEST_ROWS - SMALL_EXPORT_ROWS)
+    large_count, large_peak = _export_peak()
+
+    assert (small_count, large_count) == (SMALL_EXPORT_ROWS, EXPORT_TEST_ROWS)
+    # Memory is bounded by the chunk size: 50x the rows may not cost even 1.5x the peak.
+    assert large_peak < small_peak * 1.5
+    assert large_peak < 16 * 1024 * 1024
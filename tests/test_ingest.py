@@ -0,0 +1,37 @@
+from models import Media, Record
+
+RECORD = {'type': 'red-flag', 'title': 'Bribe', 'description': 'Asked for a bribe at the counter'}
+
+
+def test_bulk_ingest_is_idempotent_on_client_keys(client, user_headers):
+    items = [dict(RECORD, client_key=f'k{i}', media=[{'image_url': f'https://cdn.example.org/{i}.jpg'}])
+             for i in range(3)]
+    first = client.post('/records/bulk', json=items, headers=user_headers)
+    assert first.status_code == 201
+    assert first.get_json()['created'] == 3
+    retry = client.post('/records/bulk', json=items, headers=user_headers)
+    assert retry.status_code == 200
+    assert retry.get_json()['duplicates'] == 3
+    assert (Record.query.count(), Media.query.count()) == (3, 3)
+
+
+def test_media_fields_are_validated_before_anything_is_written(client, user_headers):
+    items = [
+        dict(RECORD, media=[{'image_url': 'https://cdn.example.org/ok.jpg'}]),
+        dict(RECORD, media=[{'image_url': 42}]),
+        dict(RECORD, media=[{'video_url': 'https://cdn.example.org/' + 'x' * 3000}]),
+        dict(RECORD, media=[{'thumbnail_url': 'https://cdn.example.org/t.jpg'}]),
+        dict(RECORD, media=[{'image_url': ''}]),
+        dict(RECORD, media=[{'image_url': 'https://cdn.example.org/a.jpg'}] * 21),
+    ]
+    response = client.post('/records/bulk', json=items, headers=user_headers)
+    assert response.status_code == 400
+    errors = {entry['index']: entry['errors'] for entry in response.get_json()['errors']}
+    assert errors == {
+        1: ['media[0].image_url must be a non-empty string'],
+        2: ['media[0].video_url must be at most 2048 characters'],
+        3: ['media[0].image_url or video_url is required'],
+        4: ['media[0].image_url must be a non-empty string'],
+        5: ['at most 20 media per record'],
+    }
+    assert Record.query.count() == 0
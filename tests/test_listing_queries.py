@@ -0,0 +1,46 @@
+import pytest
+
+from models import db, Media
+
+
+def _with_media(records):
+    for record in records:
+        db.session.add(Media(record_id=record.id, image_url=f'http://media/{record.id}.jpg'))
+        db.session.add(Media(record_id=record.id, video_url=f'http://media/{record.id}.mp4'))
+    db.session.commit()
+
+
+LISTING_PATHS = [
+    '/records?per_page=100',
+    '/records?per_page=100&count=none',
+    '/records?cursor=&per_page=100',
+    '/records?per_page=100&status=draft&sort=created_at',
+    '/records?per_page=100&fields=id,title&include=media',
+]
+
+
+@pytest.mark.parametrize('path', LISTING_PATHS)
+def test_listing_statement_count_does_not_grow_with_page_size(client, user_headers, make_records,
+                                                              count_queries, path):
+    counts = []
+    for total in (3, 40):
+        _with_media(make_records(total))
+        with count_queries() as statements:
+            response = client.get(f'{path}&nonce={total}', headers=user_headers)
+        assert response.status_code == 200
+        assert all(item['media'] for item in response.get_json()['records'])
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+    assert counts[1] <= 4
+
+
+def test_user_records_listing_is_batched(client, user_headers, make_records, count_queries):
+    records = make_records(30)
+    _with_media(records)
+    user_id = records[0].normal_user_id
+    with count_queries() as statements:
+        response = client.get(f'/normal_users/{user_id}/records?per_page=50', headers=user_headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['records']) == 30
+    # Owner lookup, the page and one media batch.
+    assert len(statements) <= 3
@@ -0,0 +1,65 @@
+import asyncio
+import socket
+
+import pytest
+from aiohttp.test_utils import make_mocked_request
+
+from live import LiveEvents, _matches, _valid_event_id
+
+
+@pytest.mark.parametrize('event_id, valid', [
+    ('12', True), ('1718035200000-3', True), ('', False), ('abc', False), ('1-2-3', False), ('5-', False),
+])
+def test_event_id_validation(event_id, valid):
+    assert _valid_event_id(event_id) is valid
+
+
+def test_init_app_does_not_bind_the_port(app):
+    assert 'serve-events' in app.cli.commands
+    assert app.extensions['live_events'].loop is None
+
+
+def test_start_raises_when_the_port_is_taken():
+    with socket.socket() as taken:
+        taken.bind(('127.0.0.1', 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        with pytest.raises(OSError):
+            LiveEvents().start('127.0.0.1', port, timeout=5)
+
+
+class _Writer:
+    def __init__(self):
+        self.chunks = []
+
+    async def write(self, chunk):
+        self.chunks.append(chunk)
+        if len(self.chunks) == 1:
+            raise ConnectionResetError
+
+
+def test_malformed_last_event_id_gets_a_reset(monkeypatch):
+    events = LiveEvents()
+    events._authorize = lambda request: None
+    events.log.append('record-created', {'record_id': 1})
+    writer = _Writer()
+
+    async def prepare(self, request):
+        return None
+    monkeypatch.setattr('aiohttp.web.StreamResponse.prepare', prepare)
+    monkeypatch.setattr('aiohttp.web.StreamResponse.write', lambda self, chunk: writer.write(chunk))
+
+    async def run():
+        events._tick = asyncio.Event()
+        request = make_mocked_request('GET', '/records/events', headers={'Last-Event-ID': 'not-an-id'})
+        await events.stream(request)
+    asyncio.run(run())
+    assert writer.chunks[0] == b'id: 1\nevent: reset\ndata: {}\n\n'
+
+
+def test_bulk_summaries_match_on_status_and_type():
+    summary = {'record_ids': [1, 2], 'status': 'resolved', 'types': ['red-flag']}
+    assert _matches(summary, {'status': 'resolved', 'type': 'red-flag'})
+    assert _matches(summary, {'region': 'kzf'})
+    assert not _matches(summary, {'status': 'rejected'})
+    assert not _matches(summary, {'type': 'intervention'})
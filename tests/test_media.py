@@ -0,0 +1,18 @@
+import os
+
+from media import media_pipeline
+
+
+def test_media_files_require_a_token(client, user_headers):
+    path = os.path.join(media_pipeline.storage.root, 'images', 'evidence.jpg')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\xff\xd8\xff')
+
+    assert client.get('/media/images/evidence.jpg').status_code == 401
+    response = client.get('/media/images/evidence.jpg', headers=user_headers)
+    assert response.status_code == 200
+    assert response.data == b'\xff\xd8\xff'
+    assert 'private' in response.headers['Cache-Control']
+    assert 'public' not in response.headers['Cache-Control']
+    assert client.get('/media/originals/evidence.jpg', headers=user_headers).status_code == 404
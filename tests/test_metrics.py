@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from metrics import Metrics
+
+
+@pytest.fixture
+def instrumented():
+    metrics = Metrics()
+    metrics.slow_query_seconds = 3600
+    engine = create_engine('sqlite://')
+    metrics.instrument_engine(engine)
+    return metrics, engine
+
+
+def test_failed_statements_are_timed_and_leave_nothing_behind(instrumented):
+    metrics, engine = instrumented
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        for _ in range(3):
+            with pytest.raises(exc.OperationalError):
+                conn.execute(text('SELECT * FROM missing_table'))
+        conn.execute(text('SELECT 2'))
+        assert not any(key.startswith('metrics') for key in conn.info)
+    rendered = metrics.render()
+    assert 'db_query_duration_seconds_count 5' in rendered
+
+
+def test_pool_metrics_survive_dispose(instrumented):
+    metrics, engine = instrumented
+    for _ in range(2):
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+        engine.dispose()
+    rendered = metrics.render()
+    assert 'db_pool_connect_seconds_count 2' in rendered
+    assert 'db_pool_checkout_seconds_count 2' in rendered
@@ -0,0 +1,52 @@
+import random
+
+import geo
+from models import db, Record, NormalUser
+
+NAIROBI = (-1.2921, 36.8219)
+
+
+def _scatter(count, spread=0.5, seed=4):
+    rng = random.Random(seed)
+    owner = NormalUser(name='Owner', email='owner@example.com', password='x')
+    records = [Record(type='red-flag', title=f'Record {i}', description='Somewhere', normal_user=owner,
+                      latitude=NAIROBI[0] + rng.uniform(-spread, spread),
+                      longitude=NAIROBI[1] + rng.uniform(-spread, spread)) for i in range(count)]
+    db.session.add_all(records)
+    db.session.commit()
+    return [(geo.haversine_km(*NAIROBI, r.latitude, r.longitude), r.id) for r in records]
+
+
+def _nearby(client, headers, **params):
+    response = client.get('/records/nearby', query_string=dict(lat=NAIROBI[0], lng=NAIROBI[1], **params),
+                          headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_nearby_pages_in_distance_order_within_the_radius(client, user_headers):
+    expected = sorted(item for item in _scatter(300) if item[0] <= 25)
+    seen = []
+    for page in (1, 2, 3):
+        body = _nearby(client, user_headers, radius_km=25, per_page=20, page=page)
+        assert body['total'] == len(expected)
+        seen += [(record['distance_km'], record['id']) for record in body['records']]
+    assert [record_id for _, record_id in seen] == [record_id for _, record_id in expected[:60]]
+    assert all(distance <= 25 for distance, _ in seen)
+
+
+def test_nearby_reads_only_the_requested_page(client, user_headers, count_queries):
+    _scatter(200)
+    with count_queries() as queries:
+        _nearby(client, user_headers, radius_km=50, per_page=5)
+    candidate = next(s for s in queries.statements if 'ORDER BY' in s and 'geohash' in s)
+    assert 'LIMIT' in candidate
+
+
+def test_bbox_rejects_boxes_wider_than_the_cap(client, user_headers):
+    _scatter(50)
+    small = {'min_lat': -1.5, 'min_lng': 36.6, 'max_lat': -1.1, 'max_lng': 37.0}
+    huge = {'min_lat': -5.0, 'min_lng': 33.0, 'max_lat': 5.0, 'max_lng': 42.0}
+    body = client.get('/records/bbox', query_string=small, headers=user_headers).get_json()
+    assert body['total'] > 0
+    assert client.get('/records/bbox', query_string=huge, headers=user_headers).status_code == 400
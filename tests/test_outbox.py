@@ -0,0 +1,21 @@
+import asyncio
+
+from models import db, OutboxMessage
+from notifications import FakeSMSProvider, OutboxDispatcher
+
+
+def test_stats_report_delivery_latency_retries_and_dead_letters(app, client, admin_headers):
+    db.session.add_all([OutboxMessage(recipient=recipient, body='Hello', attempts=attempts)
+                        for recipient, attempts in (('+254700000001', 0), ('+254700000002', 2),
+                                                    ('+254700000003', 0))])
+    db.session.commit()
+    dispatcher = OutboxDispatcher(app, FakeSMSProvider(fail={'+254700000003'}), max_attempts=1)
+    assert asyncio.run(dispatcher.run_once()) == 3
+    db.session.expire_all()
+
+    body = client.get('/outbox/stats', headers=admin_headers).get_json()
+    assert body['depth'] == 0
+    assert body['dead'] == 1
+    delivery = body['delivery']
+    assert (delivery['sent'], delivery['retried']) == (2, 1)
+    assert 0 <= delivery['latency_avg_seconds'] <= delivery['latency_max_seconds'] < 60
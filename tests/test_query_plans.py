@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from models import db
+from queries import parse_record_filters, projected_listing_query
+
+
+def query_plan(query):
+    """The detail column of each EXPLAIN QUERY PLAN step."""
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    return [row[3] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+
+@pytest.mark.parametrize('args, index', [
+    ({}, 'ix_records_created_at'),
+    ({'sort': 'created_at'}, 'ix_records_created_at'),
+    ({'status': 'draft'}, 'ix_records_status_created_at'),
+    ({'type': 'red-flag'}, 'ix_records_type_created_at'),
+    ({'normal_user_id': '1'}, 'ix_records_normal_user_id_created_at'),
+    ({'created_from': '2024-01-01', 'created_to': '2024-02-01'}, 'ix_records_created_at'),
+    ({'status': 'draft', 'created_from': '2024-01-01'}, 'ix_records_status_created_at'),
+])
+def test_listing_filters_use_an_index(args, index):
+    plan = query_plan(projected_listing_query(('id', 'title'), parse_record_filters(args)).limit(20))
+    assert any(f'INDEX {index}' in step for step in plan), plan
+    assert 'SCAN records' not in plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+
+def test_created_range_filter_parses_iso_dates():
+    filters = parse_record_filters({'created_from': '2024-01-01T10:00:00'})
+    assert filters['created_from'] == datetime(2024, 1, 1, 10)
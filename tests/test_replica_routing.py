@@ -0,0 +1,34 @@
+import pytest
+
+from cache import LRUBackend, response_cache
+from database import replica_router
+from tests.conftest import auth_header
+
+
+@pytest.fixture
+def routing(monkeypatch):
+    monkeypatch.setattr(replica_router, 'enabled', True)
+    monkeypatch.setattr(replica_router, 'store', LRUBackend())
+    return replica_router
+
+
+def test_sticky_writer_never_reads_a_replica_filled_cache_entry(client, routing, make_user, make_records):
+    writer, reader = make_user('writer@example.com'), make_user('reader@example.com')
+    make_records(2, user=writer)
+    response_cache.invalidate('records')
+    routing.store.set(f'replica-sticky:user:{writer.id}', 1, 10)
+
+    first = client.get('/records', headers=auth_header('user', reader.id))
+    assert first.headers['X-Cache'] == 'MISS'
+    assert client.get('/records', headers=auth_header('user', reader.id)).headers['X-Cache'] == 'HIT'
+
+    own = client.get('/records', headers=auth_header('user', writer.id))
+    assert own.headers['X-Cache'] == 'MISS'
+    assert own.get_etag() != first.get_etag()
+
+
+def test_sticky_marks_survive_a_full_response_cache(client, routing, make_user):
+    routing.store.set('replica-sticky:user:1', 1, 10)
+    for i in range(response_cache.backend.maxsize + 10):
+        response_cache.backend.set(f'response:filler:{i}', b'{}', 30)
+    assert routing.store.get('replica-sticky:user:1') == 1
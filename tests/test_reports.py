@@ -0,0 +1,95 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Table
+
+from models import db, Record, RecordStatusHistory, ReportJob
+from reports import JOB_TTL, _record_flowables, report_jobs
+
+
+def _wait(client, headers, status_url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        body = client.get(status_url, headers=headers).get_json()
+        if body['status'] in ('done', 'failed'):
+            return body
+        db.session.rollback()
+        time.sleep(0.05)
+    raise AssertionError('report did not finish')
+
+
+def test_record_report_renders_and_is_served_from_the_table(client, admin_headers, make_records):
+    record, = make_records(1)
+    response = client.post('/reports', json={'record_id': record.id}, headers=admin_headers)
+    assert response.status_code == 202
+    body = _wait(client, admin_headers, response.get_json()['status_url'])
+    assert body['status'] == 'done'
+
+    # State comes from the database, so any worker can answer for the job.
+    assert db.session.get(ReportJob, body['id']).status == 'done'
+    pdf = client.get(body['download_url'], headers=admin_headers)
+    assert pdf.status_code == 200
+    assert pdf.data.startswith(b'%PDF')
+    assert client.get('/reports/unknown', headers=admin_headers).status_code == 404
+
+
+def _report(client, headers, **body):
+    response = client.post('/reports', json=body, headers=headers)
+    assert response.status_code == 202
+    return _wait(client, headers, response.get_json()['status_url'])
+
+
+def test_reports_rerender_after_writes_from_another_worker(client, admin_headers, make_records):
+    record, = make_records(1)
+    single = _report(client, admin_headers, record_id=record.id)
+    listing = _report(client, admin_headers, filters={'type': 'red-flag'})
+    unchanged = _report(client, admin_headers, record_id=record.id)
+    assert db.session.get(ReportJob, unchanged['id']).cache_key == db.session.get(ReportJob, single['id']).cache_key
+
+    # A plain UPDATE moves no response-cache counter in this process, the
+    # way a write handled by another worker would not.
+    db.session.query(Record).filter(Record.id == record.id).update({'title': 'Changed elsewhere'})
+    db.session.commit()
+
+    for earlier, body in ((single, {'record_id': record.id}), (listing, {'filters': {'type': 'red-flag'}})):
+        again = _report(client, admin_headers, **body)
+        assert db.session.get(ReportJob, again['id']).cache_key != \
+            db.session.get(ReportJob, earlier['id']).cache_key
+
+
+def test_expired_jobs_take_their_files_with_them(client, admin_headers, make_records):
+    record, = make_records(1)
+    body = _report(client, admin_headers, record_id=record.id)
+    job = db.session.get(ReportJob, body['id'])
+    path = report_jobs.path(job)
+    assert os.path.exists(path)
+
+    job.created_at = datetime.utcnow() - timedelta(seconds=JOB_TTL + 1)
+    db.session.commit()
+    report_jobs._expire()
+    db.session.commit()
+    assert db.session.get(ReportJob, body['id']) is None
+    assert not os.path.exists(path)
+
+
+def test_record_id_must_be_an_integer(client, admin_headers):
+    for record_id in ('1', 1.5, True, [1]):
+        response = client.post('/reports', json={'record_id': record_id}, headers=admin_headers)
+        assert response.status_code == 400
+
+
+def test_record_section_lists_status_history():
+    history = [RecordStatusHistory(record_id=1, old_status='draft', new_status='under investigation',
+                                   changed_by=7, changed_at=datetime(2026, 3, 1, 9, 30)),
+               RecordStatusHistory(record_id=1, old_status='under investigation', new_status='resolved',
+                                   changed_by=7, changed_at=datetime(2026, 4, 2, 14, 0))]
+    row = {'id': 1, 'title': 'Bribe', 'type': 'red-flag', 'status': 'resolved', 'created_at': '2026-02-01',
+           'normal_user_id': 3, 'latitude': None, 'longitude': None, 'description': 'Details', 'media': []}
+
+    tables = [f for f in _record_flowables(row, getSampleStyleSheet(), history) if isinstance(f, Table)]
+    assert len(tables) == 1
+    assert tables[0]._cellvalues[1:] == [['2026-03-01 09:30', 'draft', 'under investigation', 7],
+                                         ['2026-04-02 14:00', 'under investigation', 'resolved', 7]]
+    assert not any(isinstance(f, Table) for f in _record_flowables(row, getSampleStyleSheet()))
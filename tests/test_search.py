@@ -0,0 +1,27 @@
+import search
+from models import db
+
+
+def _search(client, headers, q):
+    return client.get('/records/search', query_string={'q': q}, headers=headers)
+
+
+def test_highlights_escape_the_record_text(client, user_headers, make_records):
+    record, = make_records(1)
+    record.title = 'Bribe <script>alert(1)</script> at the market'
+    record.description = 'Officer took money & "gifts" <img src=x onerror=alert(1)> near the market gate'
+    db.session.commit()
+
+    hit, = _search(client, user_headers, 'market').get_json()['records']
+    assert hit['highlight']['title'] == \
+        'Bribe &lt;script&gt;alert(1)&lt;/script&gt; at the <mark>market</mark>'
+    assert '<img' not in hit['highlight']['snippet']
+    assert '&lt;img src=x onerror=alert(1)&gt; near the <mark>market</mark>' in hit['highlight']['snippet']
+    assert search.MATCH_START not in hit['highlight']['snippet']
+
+
+def test_unsupported_dialect_is_a_501(client, user_headers, monkeypatch):
+    monkeypatch.setattr(db.engine.dialect, 'name', 'mysql')
+    response = _search(client, user_headers, 'market')
+    assert response.status_code == 501
+    assert 'not supported' in response.get_json()['error']
@@ -0,0 +1,60 @@
+import json
+from datetime import date
+
+from sqlalchemy import create_engine, func, insert, select
+
+from migrate_sqlite_to_postgres import Checkpoint, copy_table
+from models import RecordLSHBucket, RecordStat
+
+
+def _engines(tmp_path):
+    source = create_engine(f'sqlite:///{tmp_path / "source.db"}')
+    target = create_engine(f'sqlite:///{tmp_path / "target.db"}')
+    for engine in (source, target):
+        RecordStat.__table__.create(engine)
+        RecordLSHBucket.__table__.create(engine)
+    return source, target
+
+
+def _count(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table)).scalar()
+
+
+def test_composite_keys_are_copied_completely(tmp_path):
+    source, target = _engines(tmp_path)
+    with source.begin() as conn:
+        conn.execute(insert(RecordStat), [
+            {'day': date(2024, 1, day), 'status': status, 'type': 'red-flag', 'region': 'kzf', 'count': day}
+            for day in range(1, 11) for status in ('draft', 'resolved')
+        ])
+        # Many rows share each leading key column value.
+        conn.execute(insert(RecordLSHBucket), [
+            {'bucket': bucket, 'band': band, 'record_id': record_id}
+            for bucket in range(4) for band in range(4) for record_id in range(6)
+        ])
+
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'))
+    for table in (RecordStat.__table__, RecordLSHBucket.__table__):
+        assert copy_table(table, source, target, checkpoint, chunk_size=5) == _count(source, table)
+        assert _count(target, table) == _count(source, table)
+
+    with open(tmp_path / 'checkpoint.json') as f:
+        saved = json.load(f)
+    assert saved['record_stats']['last_key'] == ['2024-01-10', 'resolved', 'red-flag', 'kzf']
+
+
+def test_resume_continues_after_the_saved_composite_key(tmp_path):
+    source, target = _engines(tmp_path)
+    with source.begin() as conn:
+        conn.execute(insert(RecordStat), [
+            {'day': date(2024, 2, day), 'status': 'draft', 'type': 'red-flag', 'region': '', 'count': 1}
+            for day in range(1, 8)
+        ])
+    path = str(tmp_path / 'checkpoint.json')
+    Checkpoint(path).save(RecordStat.__table__, (date(2024, 2, 4), 'draft', 'red-flag', ''), 4)
+
+    assert copy_table(RecordStat.__table__, source, target, Checkpoint(path), chunk_size=2) == 3
+    with target.connect() as conn:
+        days = conn.execute(select(RecordStat.day).order_by(RecordStat.day)).scalars().all()
+    assert days == [date(2024, 2, 5), date(2024, 2, 6), date(2024, 2, 7)]
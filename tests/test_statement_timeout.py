@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from database import install_statement_timeout
+
+SLOW_QUERY = text('WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 3000000) '
+                  'SELECT count(*) FROM n')
+SLOW_ROWS = text('WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 3000000) '
+                 'SELECT x FROM n')
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    install_statement_timeout(engine, 20)
+    yield engine
+    engine.dispose()
+
+
+def test_default_timeout_applies_to_requests(app, engine):
+    with app.test_request_context('/records'), engine.connect() as conn:
+        with pytest.raises(OperationalError, match='interrupted'):
+            conn.execute(SLOW_QUERY)
+
+
+def test_no_default_timeout_outside_requests(engine):
+    with engine.connect() as conn:
+        assert conn.execute(SLOW_QUERY).scalar() == 3000000
+
+
+def test_execution_option_overrides_the_default(app, engine):
+    with app.test_request_context('/records/export'), engine.connect() as conn:
+        assert conn.execute(SLOW_QUERY, execution_options={'statement_timeout': 0}).scalar() == 3000000
+
+
+def test_statements_inside_a_stream_keep_its_deadline(app, engine):
+    with app.test_request_context('/records/export'), engine.connect() as conn:
+        rows = conn.execute(SLOW_ROWS, execution_options={'stream_results': True, 'statement_timeout': 0})
+        total = 0
+        for partition in rows.partitions(100000):
+            total += len(partition)
+            # Runs under the 20 ms request default, then hands the stream back its own.
+            assert conn.execute(text('SELECT 1')).scalar() == 1
+        assert total == 3000000
+        with pytest.raises(OperationalError, match='interrupted'):
+            conn.execute(SLOW_QUERY)
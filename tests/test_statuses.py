@@ -0,0 +1,50 @@
+from live import live_events
+from models import OutboxMessage, Record, RecordStat, RecordStatusHistory
+import stats
+
+
+def test_repeated_status_patch_writes_history_and_sms_once(client, admin_headers, make_user, make_records):
+    record = make_records(1, user=make_user(phone='+254700000001'))[0]
+    for _ in range(3):
+        response = client.patch(f'/records/{record.id}/status', json={'status': 'resolved'},
+                                headers=admin_headers)
+        assert response.status_code == 200
+    assert RecordStatusHistory.query.filter_by(record_id=record.id).count() == 1
+    assert OutboxMessage.query.count() == 1
+
+
+def test_bulk_status_by_ids_reports_counts_and_logs_changes(client, admin_headers, make_user, make_records):
+    records = make_records(5, user=make_user(phone='+254700000001'))
+    stats.rebuild()
+    ids = [r.id for r in records]
+    client.patch(f'/records/{ids[0]}/status', json={'status': 'rejected'}, headers=admin_headers)
+    last_event = live_events.log.last_id()
+
+    response = client.post('/records/status', json={'status': 'rejected', 'ids': ids + [999999]},
+                           headers=admin_headers)
+    assert response.get_json() == {'status': 'rejected', 'matched': 5, 'updated': 4, 'unchanged': 1,
+                                   'missing': 1}
+    assert Record.query.filter_by(status='rejected').count() == 5
+    assert RecordStatusHistory.query.count() == 5
+    assert OutboxMessage.query.count() == 5
+    assert sum(s.count for s in RecordStat.query.filter_by(status='rejected')) == 5
+    assert sum(s.count for s in RecordStat.query.filter_by(status='draft')) == 0
+    # One summary event per chunk, not one per record.
+    events, _ = live_events.log.after(last_event)
+    assert [(e['type'], e['data']) for e in events] == [
+        ('statuses-changed', {'record_ids': ids[1:], 'status': 'rejected', 'types': ['red-flag']})
+    ]
+
+
+def test_bulk_status_by_filter_requires_a_narrowing_filter(client, admin_headers, make_records):
+    make_records(3)
+    assert client.post('/records/status', json={'status': 'resolved', 'filter': {}},
+                       headers=admin_headers).status_code == 400
+    response = client.post('/records/status', json={'status': 'resolved', 'filter': {'status': 'draft'}},
+                           headers=admin_headers)
+    assert response.get_json()['updated'] == 3
+
+
+def test_bulk_status_is_admin_only(client, user_headers):
+    assert client.post('/records/status', json={'status': 'resolved', 'ids': [1]},
+                       headers=user_headers).status_code == 403
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import archive
+import dedupe
+import sync
+from models import db, Media, Record
+
+
+def _sync(client, headers, token=None, **params):
+    if token is not None:
+        params['since'] = token
+    response = client.get('/records/changes', query_string=params, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def _drain(client, headers, token=None, **params):
+    changed, deleted = [], []
+    while True:
+        body = _sync(client, headers, token, **params)
+        changed += [record['id'] for record in body['changes']]
+        deleted += body['deleted']
+        token = body['next_token']
+        if not body['has_more']:
+            return changed, deleted, token
+
+
+def test_initial_sync_pages_through_every_record_once(client, user_headers, make_records):
+    records = make_records(7)
+    changed, deleted, token = _drain(client, user_headers, limit=3)
+    assert changed == [record.id for record in records]
+    assert deleted == []
+    assert _sync(client, user_headers, token)['changes'] == []
+
+
+def test_edits_status_changes_media_and_deletes_follow_the_token(client, user_headers, admin_headers,
+                                                                 make_records):
+    edited, moved, pictured, draft, untouched = make_records(5)
+    *_, token = _drain(client, user_headers)
+
+    assert client.patch(f'/records/{edited.id}', json={'title': 'Renamed'},
+                        headers=user_headers).status_code == 200
+    assert client.patch(f'/records/{moved.id}/status', json={'status': 'under investigation'},
+                        headers=admin_headers).status_code == 200
+    db.session.add(Media(record_id=pictured.id, image_url='a.jpg'))
+    db.session.commit()
+    assert client.delete(f'/records/{draft.id}', headers=user_headers).status_code == 200
+
+    changed, deleted, token = _drain(client, user_headers, token)
+    assert changed == [edited.id, moved.id, pictured.id]
+    assert deleted == [draft.id]
+    assert untouched.id not in changed
+    assert _drain(client, user_headers, token)[:2] == ([], [])
+
+
+def test_change_numbers_keep_rising_when_the_newest_record_is_archived(make_records):
+    old, = make_records(1)
+    newest, = make_records(1, status='resolved')
+    highest = db.session.query(db.func.max(Record.sync_seq)).scalar()
+    assert newest.sync_seq == highest
+    assert archive.archive(datetime.utcnow() + timedelta(seconds=1)) == 1
+
+    db.session.query(Record).filter(Record.id == old.id).update({'title': 'Edited after archive'})
+    db.session.commit()
+    assert db.session.get(Record, old.id).sync_seq > highest
+
+
+def test_archiving_leaves_no_tombstone(client, user_headers, make_records):
+    kept, settled = make_records(2)
+    settled.status = 'resolved'
+    db.session.commit()
+    *_, token = _drain(client, user_headers)
+
+    assert archive.archive(datetime.utcnow() + timedelta(seconds=1)) == 1
+    assert _drain(client, user_headers, token)[:2] == ([], [])
+    assert db.session.get(Record, kept.id) is not None
+
+
+def test_rebuilding_duplicate_links_does_not_resend_records(client, user_headers, make_records):
+    make_records(3)
+    *_, token = _drain(client, user_headers)
+    dedupe.rebuild()
+    assert _drain(client, user_headers, token)[:2] == ([], [])
+
+
+def test_malformed_token_is_rejected(client, user_headers):
+    for token in ('not-a-token', sync.encode_token('x', 1), 'MjAyNC0wMS0wMVQwMDowMDowMHwx'):
+        response = client.get('/records/changes', query_string={'since': token}, headers=user_headers)
+        assert response.status_code == 400
+
+
+def test_sqlite_has_no_horizon(app):
+    assert sync.safe_horizon() is None